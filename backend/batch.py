@@ -0,0 +1,36 @@
+"""Scheduling for /api/ai/batch.
+
+Operations are split into stages that run one after another; the
+operations inside a stage run concurrently. An operation that writes a
+dataset waits for every earlier operation on that dataset, and an operation
+that reads a dataset waits only for earlier writes to it, so reads of the
+same data share a stage and the dataset is loaded once for all of them.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+WRITE_OPS = ("create-sales-data", "upload-csv")
+READ_OPS = ("generate-chart", "query")
+OPERATIONS = WRITE_OPS + READ_OPS
+
+
+def dataset_key(name: str) -> str:
+    """File stem a dataset name is stored under"""
+    return name.replace(" ", "_").lower()
+
+
+def plan_stages(operations: Sequence[Tuple[str, str]]) -> List[List[int]]:
+    """Group (op, dataset) pairs into stages of operation indices"""
+    last_write: Dict[str, int] = {}
+    last_read: Dict[str, int] = {}
+    stages: List[List[int]] = []
+    for index, (op, dataset) in enumerate(operations):
+        if op in WRITE_OPS:
+            stage = max(last_write.get(dataset, -1), last_read.get(dataset, -1)) + 1
+            last_write[dataset] = stage
+        else:
+            stage = last_write.get(dataset, -1) + 1
+            last_read[dataset] = max(last_read.get(dataset, -1), stage)
+        while len(stages) <= stage:
+            stages.append([])
+        stages[stage].append(index)
+    return stages
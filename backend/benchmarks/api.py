@@ -0,0 +1,289 @@
+"""Benchmark the dataset, chart and upload endpoints on synthetic datasets.
+
+By default the app runs in-process on a private copy of backend/, so the
+sample and synthetic datasets never touch the real data/ directory. Pass
+--url to drive a running server instead; the datasets are then uploaded
+through /api/ai/upload-csv first. Run from backend/:
+
+    python benchmarks/api.py --rows 1000,100000,1000000 --output run.json
+    python benchmarks/api.py --url http://localhost:8001 --server-pid 1234
+    python benchmarks/api.py --baseline before.json --output after.json
+
+For every endpoint and dataset size the JSON output records p50/p99/mean/max
+latency, throughput, peak RSS of the server process sampled while the
+scenario ran, and the mean number of bytes per response as sent on the
+wire. Results from two runs are matched on (scenario, rows) by --baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_ROWS = "1000,100000,1000000"
+PAGE_SIZE = 100
+RSS_INTERVAL_SECONDS = 0.01
+
+
+def synthetic_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Daily time series with a categorical column, shaped like the sample datasets"""
+    rng = np.random.default_rng(seed)
+    sales = rng.gamma(4.0, 5000.0, rows).round(2)
+    expenses = (sales * rng.uniform(0.4, 0.9, rows)).round(2)
+    return pd.DataFrame({
+        "date": pd.date_range("2000-01-01", periods=rows, freq="min").strftime("%Y-%m-%dT%H:%M:%S"),
+        "category": np.array(["Technology", "Healthcare", "Finance", "Education", "Retail"])[rng.integers(0, 5, rows)],
+        "sales": sales,
+        "expenses": expenses,
+        "profit": (sales - expenses).round(2),
+        "units": rng.integers(1, 500, rows),
+    })
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class RSSSampler:
+    """Track the peak resident set size of a process from /proc while a scenario runs"""
+
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def read(self) -> int:
+        with open(f"/proc/{self.pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    def __enter__(self) -> "RSSSampler":
+        if self.pid is None or not os.path.exists(f"/proc/{self.pid}/statm"):
+            self.pid = None
+            return self
+        self.peak = self.read()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(RSS_INTERVAL_SECONDS):
+            self.peak = max(self.peak, self.read())
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, make_request: Callable[[int], Dict[str, Any]],
+    requests: int, concurrency: int, warmup: int, pid: Optional[int],
+) -> Dict[str, Any]:
+    """Send requests built by make_request(i) from concurrency workers and summarize them"""
+    for i in range(warmup):
+        (await client.request(**make_request(-1 - i))).raise_for_status()
+
+    latencies: List[float] = []
+    sizes: List[int] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            response = await client.request(**make_request(i))
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            sizes.append(response.num_bytes_downloaded)
+            errors += response.status_code >= 400
+
+    with RSSSampler(pid) as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 0.50) * 1000, 3),
+            "p99": round(percentile(ordered, 0.99) * 1000, 3),
+            "mean": round(statistics.fmean(ordered) * 1000, 3),
+            "max": round(ordered[-1] * 1000, 3),
+        },
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "peak_rss_mb": round(rss.peak / 2 ** 20, 1) if rss.pid is not None else None,
+        "bytes_per_response": int(statistics.fmean(sizes)),
+    }
+
+
+def scenarios(name: str, csv_body: bytes, chart_id: str, headers: Dict[str, str]):
+    """(scenario, request factory, uses the upload request count) for one dataset"""
+    return [
+        ("get_dataset", lambda i: {
+            "method": "GET", "url": f"/api/data/{name}", "headers": headers,
+        }, False),
+        ("get_dataset_page", lambda i: {
+            "method": "GET", "url": f"/api/data/{name}", "headers": headers,
+            "params": {"offset": (i % 10) * PAGE_SIZE, "limit": PAGE_SIZE, "where": "category:eq:Finance"},
+        }, False),
+        # A distinct title gives every request its own chart id, so each one builds a chart
+        ("generate_chart", lambda i: {
+            "method": "POST", "url": "/api/ai/generate-chart", "headers": headers,
+            "json": {"chart_type": "line", "dataset_name": name, "title": f"bench {i}", "width": 800, "height": 400},
+        }, False),
+        ("get_chart", lambda i: {
+            "method": "GET", "url": f"/api/charts/{chart_id}", "headers": headers,
+        }, False),
+        ("upload_csv_data", lambda i: {
+            "method": "POST", "url": "/api/ai/upload-csv", "headers": headers,
+            "files": {"file": (f"{name}.csv", csv_body, "text/csv")}, "data": {"dataset_name": f"{name}_upload"},
+        }, True),
+    ]
+
+
+async def run_suite(client: httpx.AsyncClient, args, pid: Optional[int], data_dir: Optional[Path]):
+    results = []
+    headers = {"Accept-Encoding": args.accept_encoding}
+    for rows in [int(value) for value in args.rows.split(",")]:
+        name = f"bench_{rows}"
+        csv_body = synthetic_frame(rows).to_csv(index=False).encode()
+        if data_dir is not None:
+            (data_dir / f"{name}.csv").write_bytes(csv_body)
+        else:
+            response = await client.post(
+                "/api/ai/upload-csv", files={"file": (f"{name}.csv", csv_body, "text/csv")}, data={"dataset_name": name}
+            )
+            response.raise_for_status()
+        chart = await client.post("/api/ai/generate-chart", json={"chart_type": "line", "dataset_name": name})
+        chart.raise_for_status()
+        chart_id = chart.json()["chart_url"].rsplit("/", 1)[1]
+
+        for scenario, make_request, is_upload in scenarios(name, csv_body, chart_id, headers):
+            if args.only and scenario not in args.only.split(","):
+                continue
+            requests = args.upload_requests if is_upload else args.requests
+            summary = await run_scenario(
+                client, make_request, requests, 1 if is_upload else args.concurrency, args.warmup, pid
+            )
+            result = {"scenario": scenario, "rows": rows, "csv_bytes": len(csv_body), **summary}
+            results.append(result)
+            print(
+                f"{scenario:<18} {rows:>10,} rows  p50 {summary['latency_ms']['p50']:>9.2f} ms"
+                f"  p99 {summary['latency_ms']['p99']:>9.2f} ms  {summary['throughput_rps']:>8.1f} req/s"
+                f"  {summary['bytes_per_response']:>12,} B  rss {summary['peak_rss_mb']} MB",
+                file=sys.stderr,
+            )
+    return results
+
+
+def metadata(args) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "target": args.url or "in-process",
+        "dataset_storage": os.environ.get("DATASET_STORAGE", "arrow"),
+        "args": vars(args),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_file: Path) -> None:
+    """Print p50/p99/throughput ratios against a previous run (below 1.0 is faster for latency)"""
+    baseline = {(r["scenario"], r["rows"]): r for r in json.loads(baseline_file.read_text())["results"]}
+    print(f"\n{'scenario':<18} {'rows':>10} {'p50':>7} {'p99':>7} {'req/s':>7}", file=sys.stderr)
+    for result in results:
+        before = baseline.get((result["scenario"], result["rows"]))
+        if before is None:
+            continue
+        ratios = [
+            result["latency_ms"]["p50"] / before["latency_ms"]["p50"],
+            result["latency_ms"]["p99"] / before["latency_ms"]["p99"],
+            result["throughput_rps"] / before["throughput_rps"],
+        ]
+        print(f"{result['scenario']:<18} {result['rows']:>10,} " + " ".join(f"{r:>6.2f}x" for r in ratios), file=sys.stderr)
+
+
+async def main_async(args) -> Dict[str, Any]:
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+            results = await run_suite(client, args, args.server_pid, data_dir=None)
+        return {"meta": metadata(args), "results": results}
+
+    # The server keeps its data, uploads and exports next to it, so run a private copy
+    workdir = Path(tempfile.mkdtemp(prefix="d3tool-bench-"))
+    try:
+        app_dir = workdir / "backend"
+        shutil.copytree(BACKEND_DIR, app_dir, ignore=shutil.ignore_patterns(
+            "data", "uploads", "exports", "__pycache__", "benchmarks", "external_integrations"
+        ))
+        sys.path.insert(0, str(app_dir))
+        import server
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            results = await run_suite(client, args, os.getpid(), data_dir=server.csv_dir)
+        server.blocking.shutdown()
+        meta = metadata(args)
+        meta["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        return {"meta": meta, "results": results}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default=DEFAULT_ROWS, help="comma-separated dataset sizes, up to 10000000")
+    parser.add_argument("--requests", type=int, default=50, help="measured requests per read/chart scenario")
+    parser.add_argument("--upload-requests", type=int, default=3, help="measured requests per upload scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent clients for read/chart scenarios")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured requests before each scenario")
+    parser.add_argument("--only", help="comma-separated scenarios to run")
+    parser.add_argument("--accept-encoding", default="identity", help="Accept-Encoding sent with every request")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--server-pid", type=int, help="pid of the --url server, for peak RSS")
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", type=Path, help="JSON report of an earlier run to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    if args.baseline:
+        compare(report["results"], args.baseline)
+    body = json.dumps(report, indent=2, default=str)
+    if args.output:
+        args.output.write_text(body + "\n")
+    else:
+        print(body)
+
+
+if __name__ == "__main__":
+    main()
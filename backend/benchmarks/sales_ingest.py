@@ -0,0 +1,90 @@
+"""Benchmark sales ingest: per-point Pydantic models vs. the columnar bulk path.
+
+Each variant starts from the request body bytes and ends with the
+month/sales/expenses/profit DataFrame that is written to disk, so JSON
+parsing is included everywhere. Run from backend/:
+
+    python benchmarks/sales_ingest.py [--rows 100000] [--repeat 5]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from encoding import dumps  # noqa: E402
+from sales_ingest import parse_columnar, parse_ndjson  # noqa: E402
+# Importing server only defines the app; sample datasets are seeded at startup
+from server import SalesDataset  # noqa: E402
+
+
+def per_point(body: bytes) -> pd.DataFrame:
+    """The create-sales-data path: validate each point, then derive profit per row"""
+    dataset = SalesDataset.model_validate(json.loads(body))
+    data_records = []
+    for point in dataset.data:
+        record = {'month': point.month, 'sales': point.sales, 'expenses': point.expenses or 0}
+        if point.profit is not None:
+            record['profit'] = point.profit
+        else:
+            record['profit'] = point.sales - (point.expenses or 0)
+        data_records.append(record)
+    return pd.DataFrame(data_records)
+
+
+def make_payloads(rows: int):
+    rng = np.random.default_rng(0)
+    months = np.array(["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])
+    columns = {
+        "month": months[np.arange(rows) % 12].tolist(),
+        "sales": rng.uniform(1000, 50000, rows).round(2).tolist(),
+        "expenses": rng.uniform(500, 30000, rows).round(2).tolist(),
+    }
+    points = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    return {
+        "per_point": dumps({"name": "bench", "data": points}),
+        "columnar": dumps({"name": "bench", "data": columns}),
+        "ndjson": b"".join(dumps(point) + b"\n" for point in points),
+    }
+
+
+def best_of(fn, body: bytes, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(body)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.rows)
+    variants = {
+        "per_point": per_point,
+        "columnar": lambda body: parse_columnar(body)["data"],
+        "ndjson": parse_ndjson,
+    }
+    frames = {name: fn(payloads[name]) for name, fn in variants.items()}
+    for name, frame in frames.items():
+        pd.testing.assert_frame_equal(frame, frames["per_point"], check_dtype=False, obj=name)
+
+    baseline = None
+    print(f"{'variant':<10} {'body MB':>8} {'best s':>8} {'rows/s':>12} {'speedup':>8}")
+    for name, fn in variants.items():
+        seconds = best_of(fn, payloads[name], args.repeat)
+        baseline = baseline or seconds
+        print(f"{name:<10} {len(payloads[name]) / 1e6:>8.1f} {seconds:>8.3f} {args.rows / seconds:>12,.0f} {baseline / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Persistent index of dataset metadata so listings never parse CSV bodies"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from dataset_cache import file_signature
+from dataset_profile import profile_frame, recommend_charts
+
+CATALOG_VERSION = 2
+SAMPLE_ROWS = 3
+
+
+class DatasetCatalog:
+    """JSON manifest of row counts, schema, samples, column profiles and chart recommendations.
+
+    Entries carry the signature of the dataset they describe (by default
+    the CSV's mtime/size); refresh() only re-parses datasets whose signature
+    no longer matches. Recommendations are derived from the stored profile,
+    so serving them never touches the data.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        loader: Callable[[Path], pd.DataFrame],
+        recommend: Callable[[Dict[str, Dict[str, Any]]], List[str]] = recommend_charts,
+        index_file: Optional[Path] = None,
+        signature: Callable[[Path], Any] = lambda path: list(file_signature(path)),
+    ):
+        self.data_dir = data_dir
+        self.index_file = index_file or data_dir / ".catalog.json"
+        self._loader = loader
+        self._recommend = recommend
+        self._signature = signature
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._read_index()
+
+    def refresh(self) -> int:
+        """Sync the index with data_dir, returning the number of re-parsed files.
+
+        Profiling every stale file can take a while; datasets recorded in
+        the meantime are neither overwritten nor dropped.
+        """
+        changed = 0
+        seen = set()
+        for csv_file in self.data_dir.glob("*.csv"):
+            seen.add(csv_file.stem)
+            try:
+                signature = self._signature(csv_file)
+            except FileNotFoundError:
+                continue
+            entry = self._entries.get(csv_file.stem)
+            if entry is not None and entry["signature"] == signature:
+                continue
+            df = self._loader(csv_file)
+            fresh = self._build_entry(csv_file, profile_frame(df), len(df), df.head(SAMPLE_ROWS), signature)
+            with self._lock:
+                if self._entries.get(csv_file.stem) is entry:
+                    self._entries[csv_file.stem] = fresh
+                    changed += 1
+
+        with self._lock:
+            removed = [
+                name for name, entry in self._entries.items()
+                if name not in seen and not (self.data_dir / entry["filename"]).exists()
+            ]
+            for name in removed:
+                del self._entries[name]
+        if changed or removed:
+            self._write_index()
+        return changed + len(removed)
+
+    def update(self, csv_file: Path, df: pd.DataFrame) -> Dict[str, Any]:
+        """Record a dataset that was just written to csv_file"""
+        return self.record(csv_file, profile_frame(df), len(df), df.head(SAMPLE_ROWS))
+
+    def record(
+        self, csv_file: Path, profile: Dict[str, Dict[str, Any]], rows: int, sample: pd.DataFrame
+    ) -> Dict[str, Any]:
+        """Record a dataset from its column profile, row count and leading rows.
+
+        Used by streaming writers that never hold the whole frame in memory.
+        """
+        entry = self._set_entry(csv_file, profile, rows, sample, self._signature(csv_file))
+        self._write_index()
+        return entry
+
+    def current(self, csv_file: Path, df: pd.DataFrame, signature: Any) -> Dict[str, Any]:
+        """Entry for the version of csv_file that df was loaded at, profiling df if it is not indexed yet"""
+        entry = self._entries.get(csv_file.stem)
+        if entry is not None and entry["signature"] == signature:
+            return entry
+        entry = self._set_entry(csv_file, profile_frame(df), len(df), df.head(SAMPLE_ROWS), signature)
+        self._write_index()
+        return entry
+
+    def reload(self, names: Optional[Iterable[str]] = None) -> None:
+        """Adopt the index file's entries for names (default: all) after another process wrote them.
+
+        Entries whose signature no longer matches their dataset are dropped
+        rather than kept stale; refresh() or current() profiles them again.
+        """
+        index = self._read_index()
+        names = set(self._entries) | set(index) if names is None else set(names)
+        for name in names:
+            entry = index.get(name)
+            try:
+                fresh = entry is not None and entry["signature"] == self._signature(self.data_dir / entry["filename"])
+            except FileNotFoundError:
+                fresh = False
+            with self._lock:
+                if fresh:
+                    self._entries[name] = entry
+                else:
+                    self._entries.pop(name, None)
+
+    def remove(self, name: str) -> None:
+        with self._lock:
+            self._entries.pop(name, None)
+        self._write_index()
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(name)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._entries[name] for name in sorted(self._entries)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _set_entry(
+        self, csv_file: Path, profile: Dict[str, Dict[str, Any]], rows: int, sample: pd.DataFrame, signature: Any
+    ) -> Dict[str, Any]:
+        entry = self._build_entry(csv_file, profile, rows, sample, signature)
+        with self._lock:
+            self._entries[csv_file.stem] = entry
+        return entry
+
+    def _build_entry(
+        self, csv_file: Path, profile: Dict[str, Dict[str, Any]], rows: int, sample: pd.DataFrame, signature: Any
+    ) -> Dict[str, Any]:
+        return {
+            "name": csv_file.stem,
+            "filename": csv_file.name,
+            "rows": rows,
+            "columns": list(profile),
+            "dtypes": {col: column["dtype"] for col, column in profile.items()},
+            "sample": json.loads(sample.head(SAMPLE_ROWS).to_json(orient="records")),
+            "profile": profile,
+            "chart_types": self._recommend(profile),
+            "signature": signature,
+        }
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_file, "r") as f:
+                index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        if index.get("version") != CATALOG_VERSION:
+            return {}
+        return index.get("datasets", {})
+
+    def _write_index(self) -> None:
+        with self._lock:
+            payload = {"version": CATALOG_VERSION, "datasets": dict(self._entries)}
+            tmp_file = self.index_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, "w") as f:
+                json.dump(payload, f)
+            os.replace(tmp_file, self.index_file)
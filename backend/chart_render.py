@@ -0,0 +1,644 @@
+"""Server-side SVG and PNG rendering of generated charts.
+
+Each chart type is laid out once into a Scene of rectangles, paths,
+circles and text, which is then written either as SVG markup or rasterized
+with NumPy into a PNG, so no browser, Cairo or imaging library is
+involved. PNG text is drawn with a small built-in stroke font (lowercase
+letters come out as small capitals).
+
+Rendering runs on a process pool (ChartRenderer) so that it never holds the
+GIL against request handling. Output is stored next to the chart as
+exports/chart_<id>.svg / .png; the chart id already hashes the chart config
+and dataset version, so a stored image is reused until the chart is evicted.
+"""
+import asyncio
+import math
+import multiprocessing
+import os
+import re
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from downsample import resolve_fields
+
+FORMATS = ("svg", "png")
+MEDIA_TYPES = {"svg": "image/svg+xml", "png": "image/png"}
+# d3.schemeCategory10, as used by the React charts
+PALETTE = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf")
+PRIMARY = "#4F46E5"
+TEXT = "#374151"
+AXIS = "#6B7280"
+GRID = "#E5E7EB"
+FONT_SIZE = 11
+TITLE_SIZE = 15
+SUPERSAMPLE = 3
+Y_TICKS = 5
+# Colours taken from datasets must be #rgb, #rrggbb or a CSS colour name
+COLOR_PATTERN = re.compile(r"#[0-9a-fA-F]{3}|#[0-9a-fA-F]{6}|[a-zA-Z]{3,20}")
+
+Point = Tuple[float, float]
+
+
+# Stroke font on a 4 x 6 grid (y down, baseline at 6). Each glyph is a list
+# of polylines written as "xy" digit pairs, polylines separated by "|".
+GLYPHS = {
+    "0": "00 40 46 06 00|40 06", "1": "11 20 26|06 46", "2": "00 40 43 03 06 46", "3": "00 40 46 06|03 43",
+    "4": "00 03 43|40 46", "5": "40 00 03 43 46 06", "6": "40 00 06 46 43 03", "7": "00 40 16",
+    "8": "00 40 46 06 00|03 43", "9": "43 03 00 40 46 06",
+    "A": "06 02 20 42 46|04 44", "B": "00 30 41 42 33 03|33 44 45 36 06 00", "C": "40 00 06 46",
+    "D": "00 30 42 44 36 06 00", "E": "40 00 06 46|03 33", "F": "40 00 06|03 33", "G": "40 00 06 46 43 23",
+    "H": "00 06|40 46|03 43", "I": "00 40|20 26|06 46", "J": "40 45 36 16 05", "K": "00 06|40 03 46",
+    "L": "00 06 46", "M": "06 00 23 40 46", "N": "06 00 46 40", "O": "10 30 41 45 36 16 05 01 10",
+    "P": "06 00 40 43 03", "Q": "10 30 41 45 36 16 05 01 10|24 46", "R": "06 00 40 43 03|13 46",
+    "S": "41 30 10 01 02 13 33 44 45 36 16 05", "T": "00 40|20 26", "U": "00 06 46 40", "V": "00 26 40",
+    "W": "00 06 23 46 40", "X": "00 46|40 06", "Y": "00 23 40|23 26", "Z": "00 40 06 46",
+    ".": "25 26", ",": "25 17", "-": "03 43", "+": "03 43|21 25", ":": "22 23|25 26", "/": "06 40",
+    "%": "06 40|00 11|35 46", "$": "41 30 10 01 02 13 33 44 45 36 16 05|20 26", "(": "30 12 14 36",
+    ")": "10 32 34 16", "_": "06 46", "'": "20 21", "#": "10 16|30 36|02 42|04 44", "=": "02 42|04 44",
+    "<": "40 03 46", ">": "00 43 06", "[": "30 10 16 36", "]": "10 30 36 16", "!": "20 23|25 26",
+    "?": "01 10 30 41 42 23 24|25 26", "*": "03 43|11 35|31 15", "&": "46 01 10 20 31 04 15 35 43",
+    " ": "",
+}
+GLYPH_ADVANCE = 6.0
+CAP_HEIGHT = 0.72  # of the font size
+SMALL_CAPS = 0.75
+
+
+def text_width(text: str, size: float) -> float:
+    return len(text) * GLYPH_ADVANCE * size * CAP_HEIGHT / 6
+
+
+class Scene:
+    """Drawing primitives in pixel coordinates, shared by the SVG and PNG writers"""
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.items: List[Tuple[Any, ...]] = []
+
+    def rect(self, x: float, y: float, w: float, h: float, fill: str, opacity: float = 1.0) -> None:
+        self.items.append(("rect", x, y, max(0.0, w), max(0.0, h), fill, opacity))
+
+    def polygon(self, points: Sequence[Point], fill: str, opacity: float = 1.0, stroke: Optional[str] = None) -> None:
+        self.items.append(("polygon", list(points), fill, opacity, stroke))
+
+    def polyline(self, points: Sequence[Point], stroke: str, width: float = 1.0, opacity: float = 1.0) -> None:
+        self.items.append(("polyline", list(points), stroke, width, opacity))
+
+    def circle(self, cx: float, cy: float, r: float, fill: str, stroke: Optional[str] = None, opacity: float = 1.0) -> None:
+        self.items.append(("circle", cx, cy, r, fill, stroke, opacity))
+
+    def text(self, x: float, y: float, text: str, size: float = FONT_SIZE, anchor: str = "start",
+             fill: str = TEXT, weight: str = "normal") -> None:
+        """Text with its baseline at y; anchor is start, middle or end"""
+        self.items.append(("text", x, y, str(text), size, anchor, fill, weight))
+
+    def to_svg(self) -> bytes:
+        out = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{self.height}" '
+            f'viewBox="0 0 {self.width} {self.height}" font-family="Helvetica, Arial, sans-serif">',
+            f'<rect width="{self.width}" height="{self.height}" fill="#ffffff"/>',
+        ]
+        for item in self.items:
+            kind = item[0]
+            if kind == "rect":
+                _, x, y, w, h, fill, opacity = item
+                out.append(f'<rect x="{x:.2f}" y="{y:.2f}" width="{w:.2f}" height="{h:.2f}" fill="{_attr(fill)}"{_opacity(opacity)}/>')
+            elif kind == "polygon":
+                _, points, fill, opacity, stroke = item
+                stroke_attr = f' stroke="{_attr(stroke)}" stroke-width="2"' if stroke else ""
+                out.append(f'<polygon points="{_points(points)}" fill="{_attr(fill)}"{stroke_attr}{_opacity(opacity)}/>')
+            elif kind == "polyline":
+                _, points, stroke, width, opacity = item
+                out.append(
+                    f'<polyline points="{_points(points)}" fill="none" stroke="{_attr(stroke)}" stroke-width="{width:g}" '
+                    f'stroke-linejoin="round" stroke-linecap="round"{_opacity(opacity)}/>'
+                )
+            elif kind == "circle":
+                _, cx, cy, r, fill, stroke, opacity = item
+                stroke_attr = f' stroke="{_attr(stroke)}" stroke-width="1.5"' if stroke else ""
+                out.append(f'<circle cx="{cx:.2f}" cy="{cy:.2f}" r="{r:.2f}" fill="{_attr(fill)}"{stroke_attr}{_opacity(opacity)}/>')
+            else:
+                _, x, y, text, size, anchor, fill, weight = item
+                out.append(
+                    f'<text x="{x:.2f}" y="{y:.2f}" font-size="{size:g}" text-anchor="{_attr(anchor)}" '
+                    f'font-weight="{_attr(weight)}" fill="{_attr(fill)}">{escape(text)}</text>'
+                )
+        out.append("</svg>")
+        return "\n".join(out).encode("utf-8")
+
+    def to_png(self, supersample: int = SUPERSAMPLE) -> bytes:
+        raster = Raster(self.width, self.height, supersample)
+        for item in self.items:
+            kind = item[0]
+            if kind == "rect":
+                _, x, y, w, h, fill, opacity = item
+                raster.polygon([(x, y), (x + w, y), (x + w, y + h), (x, y + h)], fill, opacity)
+            elif kind == "polygon":
+                _, points, fill, opacity, stroke = item
+                raster.polygon(points, fill, opacity)
+                if stroke:
+                    raster.polyline(points + points[:1], stroke, 2.0, opacity)
+            elif kind == "polyline":
+                _, points, stroke, width, opacity = item
+                raster.polyline(points, stroke, width, opacity)
+            elif kind == "circle":
+                _, cx, cy, r, fill, stroke, opacity = item
+                if stroke:
+                    raster.circle(cx, cy, r + 0.75, stroke, opacity)
+                raster.circle(cx, cy, r - (0.75 if stroke else 0), fill, opacity)
+            else:
+                _, x, y, text, size, anchor, fill, weight = item
+                raster.text(x, y, text, size, anchor, fill, 1.6 if weight == "bold" else 1.0)
+        return encode_png(raster.pixels())
+
+
+def _opacity(opacity: float) -> str:
+    return f' opacity="{opacity:g}"' if opacity < 1 else ""
+
+
+def _attr(value: Any) -> str:
+    return escape(str(value), quote=True)
+
+
+def _color(value: Any, fallback: str) -> str:
+    """value if it is a plain colour, else fallback"""
+    if isinstance(value, str) and COLOR_PATTERN.fullmatch(value.strip()):
+        return value.strip()
+    return fallback
+
+
+def _points(points: Sequence[Point]) -> str:
+    return " ".join(f"{x:.2f},{y:.2f}" for x, y in points)
+
+
+def _rgb(color: str) -> np.ndarray:
+    color = color.lstrip("#")
+    if len(color) == 3:
+        color = "".join(c * 2 for c in color)
+    try:
+        return np.array([int(color[i:i + 2], 16) for i in (0, 2, 4)], dtype=np.float32) / 255
+    except ValueError:
+        return _rgb(AXIS)
+
+
+class Raster:
+    """RGB canvas drawn at supersample x resolution and box-filtered down for anti-aliasing"""
+
+    def __init__(self, width: int, height: int, supersample: int, channels: int = 3):
+        self.scale = supersample
+        self.width = width * supersample
+        self.height = height * supersample
+        # A single-channel raster is a coverage mask that drawing sets to 1
+        self.buffer = np.full((self.height, self.width, channels), 1.0 if channels == 3 else 0.0, dtype=np.float32)
+
+    def polygon(self, points: Sequence[Point], color: str, opacity: float = 1.0) -> None:
+        """Fill a polygon with the even-odd rule, in one vectorized span pass over all edges"""
+        if len(points) < 3:
+            return
+        pts = np.asarray(points, dtype=np.float64) * self.scale
+        x0, y0 = pts[:, 0], pts[:, 1]
+        x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+        top = max(0, int(math.floor(y0.min())))
+        bottom = min(self.height, int(math.ceil(y0.max())) + 1)
+        left = max(0, int(math.floor(x0.min())))
+        right = min(self.width, int(math.ceil(x0.max())) + 1)
+        if top >= bottom or left >= right:
+            return
+        rows = np.arange(top, bottom) + 0.5
+        # Crossing of every scanline with every non-horizontal edge, half-open in y
+        lo, hi = np.minimum(y0, y1), np.maximum(y0, y1)
+        crosses = (rows[:, None] >= lo[None, :]) & (rows[:, None] < hi[None, :])
+        row_index, edge_index = np.nonzero(crosses)
+        if not len(row_index):
+            return
+        ys = rows[row_index]
+        xa, ya, xb, yb = x0[edge_index], y0[edge_index], x1[edge_index], y1[edge_index]
+        xs = xa + (ys - ya) * (xb - xa) / (yb - ya)
+        order = np.lexsort((xs, row_index))
+        span_rows, xs = row_index[order][0::2], xs[order]
+        columns = right - left
+        first = np.clip(np.ceil(xs[0::2] - 0.5).astype(int) - left, 0, columns)
+        last = np.clip(np.ceil(xs[1::2] - 0.5).astype(int) - left, 0, columns)
+        coverage = np.zeros((bottom - top, columns + 1), dtype=np.int32)
+        np.add.at(coverage, (span_rows, first), 1)
+        np.add.at(coverage, (span_rows, last), -1)
+        self._blend(top, left, np.cumsum(coverage[:, :-1], axis=1) > 0, color, opacity)
+
+    def circle(self, cx: float, cy: float, r: float, color: str, opacity: float = 1.0) -> None:
+        cx, cy, r = cx * self.scale, cy * self.scale, max(r, 0.5) * self.scale
+        top, bottom = max(0, int(cy - r)), min(self.height, int(cy + r) + 2)
+        left, right = max(0, int(cx - r)), min(self.width, int(cx + r) + 2)
+        if top >= bottom or left >= right:
+            return
+        ys = np.arange(top, bottom)[:, None] + 0.5
+        xs = np.arange(left, right)[None, :] + 0.5
+        self._blend(top, left, (xs - cx) ** 2 + (ys - cy) ** 2 <= r * r, color, opacity)
+
+    def polyline(self, points: Sequence[Point], color: str, width: float = 1.0, opacity: float = 1.0) -> None:
+        """Stroke a polyline as one quad per segment plus round joins"""
+        if not points:
+            return
+        half = max(width, 0.75) / 2
+        xs, ys = [x for x, _ in points], [y for _, y in points]
+        left = max(0, int((min(xs) - half) * self.scale) - 1)
+        top = max(0, int((min(ys) - half) * self.scale) - 1)
+        right = min(self.width, int(math.ceil((max(xs) + half) * self.scale)) + 2)
+        bottom = min(self.height, int(math.ceil((max(ys) + half) * self.scale)) + 2)
+        if left >= right or top >= bottom:
+            return
+        # Coverage is collected on a mask over the stroke's bounding box first,
+        # so overlapping segments and joins are not blended twice
+        mask = Raster(0, 0, self.scale, channels=1)
+        mask.width, mask.height = right - left, bottom - top
+        mask.buffer = np.zeros((mask.height, mask.width, 1), dtype=np.float32)
+        dx, dy = left / self.scale, top / self.scale
+        local = [(x - dx, y - dy) for x, y in points]
+        for (xa, ya), (xb, yb) in zip(local, local[1:]):
+            length = math.hypot(xb - xa, yb - ya)
+            if length == 0:
+                continue
+            nx, ny = -(yb - ya) / length * half, (xb - xa) / length * half
+            mask.polygon([(xa + nx, ya + ny), (xb + nx, yb + ny), (xb - nx, yb - ny), (xa - nx, ya - ny)], "#000")
+        if width >= 1.5:
+            for x, y in local:
+                mask.circle(x, y, half, "#000")
+        self._blend(top, left, mask.buffer[:, :, 0] > 0, color, opacity)
+
+    def text(self, x: float, y: float, text: str, size: float, anchor: str, color: str, weight: float = 1.0) -> None:
+        unit = size * CAP_HEIGHT / 6
+        x -= {"middle": text_width(text, size) / 2, "end": text_width(text, size)}.get(anchor, 0.0)
+        pen = max(1.0, size / 11) * weight
+        for index, char in enumerate(text):
+            glyph = GLYPHS.get(char.upper(), GLYPHS["?"])
+            scale = SMALL_CAPS if char.islower() else 1.0
+            origin_x = x + index * GLYPH_ADVANCE * unit
+            for stroke in filter(None, glyph.split("|")):
+                points = [
+                    (origin_x + int(pair[0]) * unit * scale, y - (6 - int(pair[1])) * unit * scale)
+                    for pair in stroke.split()
+                ]
+                self.polyline(points, color, pen)
+
+    def pixels(self) -> np.ndarray:
+        h, w, s = self.height // self.scale, self.width // self.scale, self.scale
+        averaged = self.buffer.reshape(h, s, w, s, 3).mean(axis=(1, 3))
+        return (np.clip(averaged, 0, 1) * 255 + 0.5).astype(np.uint8)
+
+    def _blend(self, top: int, left: int, mask: np.ndarray, color: str, opacity: float) -> None:
+        region = self.buffer[top:top + mask.shape[0], left:left + mask.shape[1]]
+        mask = mask[:region.shape[0], :region.shape[1]]
+        if region.shape[2] == 1:
+            region[mask] = 1.0
+            return
+        region[mask] = region[mask] * (1 - opacity) + _rgb(color) * opacity
+
+
+def encode_png(pixels: np.ndarray) -> bytes:
+    """Encode an RGB uint8 array as PNG (filter type 0 on every row)"""
+    height, width, _ = pixels.shape
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, width * 3)], axis=1)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def nice_ticks(low: float, high: float, count: int = Y_TICKS) -> List[float]:
+    """Round tick values covering [low, high], like d3.scaleLinear().nice().ticks()"""
+    if not (math.isfinite(low) and math.isfinite(high)):
+        return [0.0, 1.0]
+    if high == low:
+        high = low + (abs(low) or 1.0)
+    raw_step = (high - low) / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw_step)
+    start = math.floor(low / step) * step
+    stop = math.ceil(high / step) * step
+    return [round(start + i * step, 10) for i in range(int(round((stop - start) / step)) + 1)]
+
+
+def format_number(value: float) -> str:
+    magnitude = abs(value)
+    for threshold, suffix in ((1e9, "G"), (1e6, "M"), (1e3, "k")):
+        if magnitude >= threshold:
+            return f"{value / threshold:.3g}{suffix}"
+    return f"{value:.3g}" if not float(value).is_integer() else str(int(value))
+
+
+def _label(value: Any, limit: int = 14) -> str:
+    text = str(value)
+    return text if len(text) <= limit else text[:limit - 1] + "."
+
+
+def _title(scene: Scene, title: str) -> float:
+    """Draw the title and return the top of the space left below it"""
+    if not title:
+        return 20
+    scene.text(scene.width / 2, 20 + TITLE_SIZE * 0.8, title, TITLE_SIZE, "middle", weight="bold")
+    return 20 + TITLE_SIZE + 10
+
+
+class Frame:
+    """Plot area inside the chart's margins with the axes drawn around it"""
+
+    def __init__(self, scene: Scene, title: str, legend: Sequence[str] = (), colors: Sequence[str] = PALETTE,
+                 left: float = 60, right: float = 30, bottom: float = 40):
+        self.scene = scene
+        self.top = _title(scene, title)
+        self.left, self.right = left, scene.width - right
+        self.bottom = scene.height - bottom
+        if len(legend) > 1:
+            _legend(scene, legend, colors, self.top - 10, self.right)
+            self.top += 16
+
+    def y_axis(self, low: float, high: float) -> Tuple[float, float]:
+        ticks = nice_ticks(min(low, 0.0), max(high, 0.0))
+        low, high = ticks[0], ticks[-1]
+        for tick in ticks:
+            y = self.y(tick, low, high)
+            self.scene.polyline([(self.left, y), (self.right, y)], GRID, 1)
+            self.scene.text(self.left - 6, y + FONT_SIZE * 0.35, format_number(tick), anchor="end")
+        self.scene.polyline([(self.left, self.top), (self.left, self.bottom)], AXIS, 1)
+        return low, high
+
+    def x_labels(self, labels: Sequence[Any], positions: Sequence[float]) -> None:
+        self.scene.polyline([(self.left, self.bottom), (self.right, self.bottom)], AXIS, 1)
+        if not len(labels):
+            return
+        width = max(text_width(_label(label), FONT_SIZE) for label in labels) + 8
+        every = max(1, math.ceil(len(labels) * width / max(1.0, self.right - self.left)))
+        for label, x in list(zip(labels, positions))[::every]:
+            label = _label(label)
+            # Keep the first and last labels inside the image
+            half = text_width(label, FONT_SIZE) / 2
+            x = min(max(x, half + 2), self.scene.width - half - 2)
+            self.scene.text(x, self.bottom + FONT_SIZE + 6, label, anchor="middle")
+
+    def y(self, value: float, low: float, high: float) -> float:
+        return self.bottom - (value - low) / ((high - low) or 1.0) * (self.bottom - self.top)
+
+
+def _legend(scene: Scene, names: Sequence[str], colors: Sequence[str], top: float, right: float) -> None:
+    """One right-aligned row of colour swatches and series names"""
+    x = right
+    for name, color in reversed(list(zip(names, colors))):
+        label = _label(name, 18)
+        x -= text_width(label, FONT_SIZE) + 14
+        scene.rect(x, top, 10, 10, color)
+        scene.text(x + 14, top + 9, label)
+        x -= 10
+
+
+def _bar(scene: Scene, df: pd.DataFrame, x_field: str, y_fields: List[str], title: str) -> None:
+    frame = Frame(scene, title, y_fields)
+    values = df[y_fields].to_numpy(dtype=np.float64)
+    low, high = frame.y_axis(np.nanmin(values, initial=0.0), np.nanmax(values, initial=0.0))
+    band = (frame.right - frame.left) / max(1, len(df))
+    inner = band * 0.8 / len(y_fields)
+    centers = [frame.left + band * (i + 0.5) for i in range(len(df))]
+    zero = frame.y(0.0, low, high)
+    for row, center in enumerate(centers):
+        for k in range(len(y_fields)):
+            value = values[row, k]
+            if np.isnan(value):
+                continue
+            y = frame.y(value, low, high)
+            scene.rect(center - band * 0.4 + k * inner, min(y, zero), inner * 0.92, abs(zero - y), PALETTE[k % len(PALETTE)])
+    frame.x_labels(df[x_field].tolist(), centers)
+
+
+def _series_x(df: pd.DataFrame, x_field: str, frame: Frame) -> Tuple[np.ndarray, List[Any], List[float]]:
+    """Pixel x of every row plus the tick labels and their positions"""
+    column = df[x_field]
+    if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        values = column.to_numpy(dtype=np.float64)
+        ticks = nice_ticks(np.nanmin(values), np.nanmax(values), 6)
+        low, span = ticks[0], (ticks[-1] - ticks[0]) or 1.0
+        width = frame.right - frame.left
+        return (
+            frame.left + (values - low) / span * width,
+            [format_number(t) for t in ticks],
+            [frame.left + (t - low) / span * width for t in ticks],
+        )
+    n = len(df)
+    if n > 1:
+        xs = frame.left + np.arange(n) * (frame.right - frame.left) / (n - 1)
+    else:
+        xs = np.array([(frame.left + frame.right) / 2])
+    return xs, column.tolist(), xs.tolist()
+
+
+def _line(scene: Scene, df: pd.DataFrame, x_field: str, y_fields: List[str], title: str, area: bool = False) -> None:
+    colors = [PRIMARY] if len(y_fields) == 1 and not area else list(PALETTE)
+    frame = Frame(scene, title, y_fields, colors)
+    values = df[y_fields].to_numpy(dtype=np.float64)
+    low, high = frame.y_axis(np.nanmin(values, initial=0.0), np.nanmax(values, initial=0.0))
+    xs, labels, positions = _series_x(df, x_field, frame)
+    baseline = frame.y(max(low, 0.0), low, high)
+    for k in range(len(y_fields)):
+        color = colors[k % len(colors)]
+        valid = ~np.isnan(values[:, k])
+        points = [(float(x), frame.y(v, low, high)) for x, v in zip(xs[valid], values[valid, k])]
+        if not points:
+            continue
+        if area:
+            scene.polygon([(points[0][0], baseline)] + points + [(points[-1][0], baseline)], color, 0.35)
+        scene.polyline(points, color, 2 if area else 3)
+        if not area and len(points) <= 60:
+            for x, y in points:
+                scene.circle(x, y, 3.5, color, "#ffffff")
+    frame.x_labels(labels, positions)
+
+
+def _scatter(scene: Scene, df: pd.DataFrame, x_field: str, y_fields: List[str], title: str) -> None:
+    frame = Frame(scene, title)
+    column = df[x_field]
+    if not (pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column)) and len(y_fields) >= 2:
+        # Like ScatterPlot.js, plot two numeric columns against each other
+        x_field, y_fields = y_fields[0], y_fields[1:]
+    y_field = y_fields[0]
+    values = df[y_field].to_numpy(dtype=np.float64)
+    low, high = frame.y_axis(np.nanmin(values, initial=0.0), np.nanmax(values, initial=0.0))
+    xs, labels, positions = _series_x(df, x_field, frame)
+    for x, v in zip(xs, values):
+        if not np.isnan(v):
+            scene.circle(float(x), frame.y(v, low, high), 5, PALETTE[0], "#ffffff", 0.8)
+    frame.x_labels(labels, positions)
+    scene.text(frame.right, frame.bottom + FONT_SIZE * 2 + 10, x_field, anchor="end")
+    scene.text(frame.left, frame.top - 6, y_field)
+
+
+def _pie(scene: Scene, df: pd.DataFrame, x_field: str, y_fields: List[str], title: str) -> None:
+    top = _title(scene, title)
+    values = np.clip(np.nan_to_num(df[y_fields[0]].to_numpy(dtype=np.float64)), 0, None)
+    total = values.sum()
+    if total <= 0:
+        return
+    cx, cy = scene.width / 2, top + (scene.height - top) / 2
+    radius = max(10.0, min(scene.width / 2 - 90, (scene.height - top) / 2 - 20))
+    palette = [PALETTE[i % len(PALETTE)] for i in range(len(df))]
+    colors = [_color(c, p) for c, p in zip(df["color"].tolist(), palette)] if "color" in df.columns else palette
+    angle = -math.pi / 2
+    for label, value, color in zip(df[x_field].tolist(), values, colors):
+        sweep = value / total * 2 * math.pi
+        if sweep <= 0:
+            continue
+        steps = max(2, int(sweep / (math.pi / 90)))
+        arc = [
+            (cx + radius * math.cos(angle + sweep * i / steps), cy + radius * math.sin(angle + sweep * i / steps))
+            for i in range(steps + 1)
+        ]
+        scene.polygon([(cx, cy)] + arc, color, 1.0, "#ffffff")
+        middle = angle + sweep / 2
+        if sweep > 0.15:
+            lx, ly = cx + (radius + 12) * math.cos(middle), cy + (radius + 12) * math.sin(middle)
+            scene.text(lx, ly + 4, _label(label), anchor="start" if math.cos(middle) >= 0 else "end")
+        angle += sweep
+
+
+def _network(scene: Scene, df: pd.DataFrame, title: str, layout: Optional[Dict[str, Sequence[float]]]) -> None:
+    top = _title(scene, title)
+    if {"source", "target"} <= set(df.columns):
+        links = df
+        nodes = [str(node) for node in pd.unique(pd.concat([df["source"], df["target"]]).astype(str))]
+        groups = {node: 0 for node in nodes}
+    else:
+        links = df.iloc[0:0]
+        id_field = "id" if "id" in df.columns else df.columns[0]
+        nodes = df[id_field].astype(str).tolist()
+        groups = dict(zip(nodes, df["group"].tolist() if "group" in df.columns else [0] * len(nodes)))
+    if not nodes:
+        return
+    cx, cy = scene.width / 2, top + (scene.height - top) / 2
+    radius = max(10.0, min(scene.width, scene.height - top) / 2 - 30)
+    if layout:
+        # Precomputed positions, centred and scaled into the drawing area
+        coords = np.array([layout.get(node, (0.0, 0.0)) for node in nodes], dtype=np.float64)
+        coords -= coords.mean(axis=0)
+        coords = coords / (np.abs(coords).max() or 1.0) * radius
+    else:
+        angles = np.arange(len(nodes)) / len(nodes) * 2 * math.pi - math.pi / 2
+        coords = np.stack([np.cos(angles), np.sin(angles)], axis=1) * radius
+    position = {node: (cx + x, cy + y) for node, (x, y) in zip(nodes, coords)}
+    weights = links["value"].tolist() if "value" in links.columns else [1] * len(links)
+    for source, target, value in zip(links.get("source", []), links.get("target", []), weights):
+        a, b = position.get(str(source)), position.get(str(target))
+        if a is not None and b is not None:
+            scene.polyline([a, b], "#999999", min(8.0, math.sqrt(max(float(value), 0.0)) * 2) or 1.0, 0.6)
+    group_colors = {group: PALETTE[i % len(PALETTE)] for i, group in enumerate(dict.fromkeys(groups.values()))}
+    for node in nodes:
+        x, y = position[node]
+        scene.circle(x, y, 8, group_colors[groups[node]], "#ffffff")
+        scene.text(x + 12, y + 4, _label(node))
+
+
+def render_scene(chart_config: Dict[str, Any]) -> Scene:
+    """Lay out an inline chart config (type, title, width, height and data rows)"""
+    scene = Scene(int(chart_config.get("width") or 500), int(chart_config.get("height") or 300))
+    df = pd.DataFrame.from_records(chart_config.get("data") or [])
+    title = chart_config.get("title") or ""
+    chart_type = chart_config.get("type", "bar")
+    if df.empty:
+        _title(scene, title)
+        return scene
+    if chart_type == "network":
+        _network(scene, df, title, chart_config.get("layout"))
+        return scene
+    params = chart_config.get("params") or {}
+    x_field, y_fields = resolve_fields(df, params.get("x_field"), params.get("y_fields"))
+    if not y_fields:
+        raise ValueError("Chart needs at least one numeric column to render")
+    if chart_type == "pie":
+        _pie(scene, df, x_field, y_fields, title)
+    elif chart_type == "scatter":
+        _scatter(scene, df, x_field, y_fields, title)
+    elif chart_type in ("line", "area"):
+        _line(scene, df, x_field, y_fields, title, area=chart_type == "area")
+    else:
+        _bar(scene, df, x_field, y_fields, title)
+    return scene
+
+
+def render(chart_config: Dict[str, Any], fmt: str) -> bytes:
+    scene = render_scene(chart_config)
+    return scene.to_svg() if fmt == "svg" else scene.to_png()
+
+
+def render_file(target: str, chart_config: Dict[str, Any], fmt: str) -> int:
+    """Process pool entry point: render and atomically write target, returning its size"""
+    body = render(chart_config, fmt)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".render_", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(body)
+
+
+class ChartRenderer:
+    """Renders chart images on a lazily started process pool, once per chart id and format"""
+
+    def __init__(self, exports_dir: Path, max_workers: int):
+        self.exports_dir = exports_dir
+        self.max_workers = max_workers
+        self.rendered = 0
+        self.reused = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[Path, "asyncio.Future[int]"] = {}
+
+    def path(self, chart_id: str, fmt: str) -> Path:
+        return self.exports_dir / f"chart_{chart_id}.{fmt}"
+
+    async def render(self, chart_id: str, chart_config: Dict[str, Any], fmt: str) -> Path:
+        """Path of the chart's rendered image, rendering it first unless it is already stored"""
+        if fmt not in FORMATS:
+            raise ValueError(f"Invalid export format '{fmt}', expected json, {' or '.join(FORMATS)}")
+        target = self.path(chart_id, fmt)
+        if target.exists():
+            self.reused += 1
+            return target
+        pending = self._pending.get(target)
+        if pending is None:
+            if self._pool is None:
+                # Spawned rather than forked, so workers never inherit the server's threads
+                self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            pending = asyncio.wrap_future(self._pool.submit(render_file, str(target), chart_config, fmt))
+            self._pending[target] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(target, None))
+            self.rendered += 1
+        else:
+            self.reused += 1
+        await asyncio.shield(pending)
+        return target
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "rendered": self.rendered,
+            "reused": self.reused,
+            "pending": len(self._pending),
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
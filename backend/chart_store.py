@@ -0,0 +1,191 @@
+"""Content-addressed storage for generated charts in exports/.
+
+A chart's id is a hash of its ChartConfig and the version of the dataset it
+was built from, so repeating an identical request against an unchanged
+dataset finds the existing file instead of writing a new one. Files are
+evicted once they have not been used for ttl_seconds, or oldest-first when
+the directory grows beyond max_bytes.
+
+Charts come in two forms. Inline charts embed their rows under "data".
+Reference charts store only the chart config and a "source" naming the
+dataset and the immutable version they were built from; their rows are
+resolved from that dataset snapshot when the chart is served.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from chart_render import FORMATS as RENDER_FORMATS
+from encoding import dumps, loads
+from metrics import phase
+from precompress import variant_paths
+
+# Reference charts are written with "source" as their first key and stay
+# small, so they can be recognised and collected without parsing every file
+REFERENCE_PREFIX = b'{"source"'
+REFERENCE_MAX_BYTES = 64 * 1024
+
+
+class ChartStore:
+    def __init__(
+        self,
+        exports_dir: Path,
+        max_bytes: int,
+        ttl_seconds: float,
+        sweep_interval: float = 60.0,
+        on_sweep: Optional[Callable[[Set[Tuple[str, str]]], Any]] = None,
+    ):
+        self.exports_dir = exports_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        # Called after each sweep with the (dataset, version) pairs still referenced
+        self.on_sweep = on_sweep
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def chart_id(config: Dict[str, Any], dataset_version: str) -> str:
+        """Stable id for a chart built from config against one dataset version"""
+        key = json.dumps({"config": config, "dataset_version": dataset_version}, sort_keys=True, default=str)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+    @staticmethod
+    def reference(chart_config: Dict[str, Any], dataset: str, version: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Reference form of an inline chart config: its rows are replaced by a dataset version"""
+        chart = {"source": {"dataset": dataset, "version": version}}
+        chart.update((key, value) for key, value in chart_config.items() if key not in ("data", "reduction"))
+        # Kept so a chart whose rows are cached resolves without reducing them again
+        chart["reduction"] = chart_config.get("reduction")
+        chart["params"] = params
+        return chart
+
+    @staticmethod
+    def is_reference(content: bytes) -> bool:
+        return content.startswith(REFERENCE_PREFIX)
+
+    def path(self, chart_id: str) -> Path:
+        return self.exports_dir / f"chart_{chart_id}.json"
+
+    def read(self, chart_id: str) -> bytes:
+        """Raw JSON of a stored chart, marking it as recently used"""
+        chart_file = self.path(chart_id)
+        content = chart_file.read_bytes()
+        self.touch(chart_file)
+        return content
+
+    def load(self, chart_id: str) -> Optional[Dict[str, Any]]:
+        """Return a stored chart and mark it as recently used, or None on a miss"""
+        try:
+            content = self.read(chart_id)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return loads(content)
+
+    def save(self, chart_id: str, chart_config: Dict[str, Any]) -> Path:
+        """Write a chart atomically; concurrent identical requests write identical bytes"""
+        chart_file = self.path(chart_id)
+        with phase("serialize"):
+            content = dumps(chart_config)
+        fd, tmp_path = tempfile.mkstemp(dir=self.exports_dir, prefix=".chart_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f, phase("write"):
+                f.write(content)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, chart_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.maybe_sweep()
+        return chart_file
+
+    def touch(self, chart_file: Path) -> None:
+        # Recency is tracked in atime so that mtime keeps the creation time,
+        # which is served as the chart's Last-Modified
+        try:
+            os.utime(chart_file, ns=(time.time_ns(), chart_file.stat().st_mtime_ns))
+        except FileNotFoundError:
+            pass
+
+    def maybe_sweep(self) -> None:
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Delete expired charts, then the least recently used ones over max_bytes.
+
+        A chart's precompressed variants and rendered SVG/PNG exports count
+        towards its size and are removed together with it.
+        """
+        with self._lock:
+            self._last_sweep = time.monotonic()
+            now = time.time()
+            files = []
+            for chart_file in self.exports_dir.glob("chart_*.json"):
+                try:
+                    stat = chart_file.stat()
+                except FileNotFoundError:
+                    continue
+                size = stat.st_size
+                for variant in self.artifacts(chart_file):
+                    try:
+                        size += variant.stat().st_size
+                    except FileNotFoundError:
+                        pass
+                files.append((max(stat.st_atime, stat.st_mtime), size, chart_file))
+            files.sort()
+
+            removed = 0
+            total = sum(size for _, size, _ in files)
+            for used, size, chart_file in files:
+                if now - used <= self.ttl_seconds and total <= self.max_bytes:
+                    break
+                chart_file.unlink(missing_ok=True)
+                for variant in self.artifacts(chart_file):
+                    variant.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+            self.evicted += removed
+        if self.on_sweep is not None:
+            self.on_sweep(self.references())
+        return removed
+
+    @staticmethod
+    def artifacts(chart_file: Path):
+        """Files derived from a chart: precompressed variants and rendered images"""
+        return variant_paths(chart_file) + [chart_file.with_suffix(f".{fmt}") for fmt in RENDER_FORMATS]
+
+    def references(self) -> Set[Tuple[str, str]]:
+        """(dataset, version) pairs referenced by the stored reference charts"""
+        referenced = set()
+        for chart_file in self.exports_dir.glob("chart_*.json"):
+            try:
+                if chart_file.stat().st_size > REFERENCE_MAX_BYTES:
+                    continue
+                content = chart_file.read_bytes()
+            except FileNotFoundError:
+                continue
+            if self.is_reference(content):
+                source = loads(content)["source"]
+                referenced.add((source["dataset"], source["version"]))
+        return referenced
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
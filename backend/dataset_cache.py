@@ -0,0 +1,123 @@
+"""In-process cache of parsed datasets keyed by file path"""
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+
+def file_signature(path: Path) -> Tuple[int, int]:
+    """Return the (mtime_ns, size) pair used to detect changes to a file"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """Approximate in-memory size of a DataFrame, including object columns"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class DatasetCache:
+    """LRU cache of DataFrames bounded by an approximate memory budget.
+
+    Entries are validated against signature(path) on every lookup (by
+    default the file's mtime/size), so a file rewritten behind our back is
+    re-read on the next access. Cached frames are shared between requests
+    and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int, signature: Callable[[Path], Any] = file_signature):
+        self.max_bytes = max_bytes
+        self.signature = signature
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[Any, pd.DataFrame, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, loader: Callable[[Path], pd.DataFrame] = pd.read_csv) -> pd.DataFrame:
+        """Return the cached frame for path, loading it on a miss or when the file changed"""
+        return self.get_versioned(path, loader)[1]
+
+    def get_versioned(self, path: Path, loader: Callable[[Path], pd.DataFrame] = pd.read_csv) -> Tuple[Any, pd.DataFrame]:
+        """Like get(), but also return the signature the frame corresponds to"""
+        signature = self.signature(path)
+        return signature, self.fetch(str(path), signature, lambda: loader(path))
+
+    def fetch(self, key: str, signature: Any, compute: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """Return the frame cached under key for signature, computing and storing it on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        df = compute()
+        self._store(key, signature, df)
+        return df
+
+    def contains(self, path: Path) -> bool:
+        """Whether a fresh frame for path is cached, without counting a lookup"""
+        try:
+            signature = self.signature(path)
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            entry = self._entries.get(str(path))
+            return entry is not None and entry[0] == signature
+
+    def peek(self, key: str) -> Optional[Tuple[Any, pd.DataFrame]]:
+        """The (signature, frame) cached under key whatever its signature, without counting a lookup"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else (entry[0], entry[1])
+
+    def put(self, path: Path, df: pd.DataFrame) -> None:
+        """Record a frame that was just written to path"""
+        self._store(str(path), self.signature(path), df)
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            self._drop(str(path))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _store(self, key: str, signature: Any, df: pd.DataFrame) -> None:
+        nbytes = frame_nbytes(df)
+        with self._lock:
+            self._drop(key)
+            # Frames larger than the whole budget are served but never cached
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (signature, df, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, _, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
@@ -0,0 +1,200 @@
+"""Column profiles and the chart recommendations derived from them.
+
+A profile is computed once per dataset version and stored in the catalog:
+
+    {"sales": {"dtype": "int64", "kind": "numeric", "nulls": 0, "distinct": 12,
+               "min": 12000, "max": 40000,
+               "histogram": {"edges": [...], "counts": [...]}},
+     "month": {"dtype": "object", "kind": "temporal", "nulls": 0, "distinct": 12,
+               "top": {"values": ["Jan", ...], "counts": [1, ...]}}}
+
+kind is one of numeric, temporal, categorical, boolean or text. Every value
+is plain JSON so the catalog can be written as-is.
+
+ColumnProfiler builds the same profile from a column read in chunks, so
+uploads are profiled while they are parsed. Its value counts are exact up
+to PROFILE_TRACKED_VALUES distinct values; past that the profile is marked
+"approximate": distinct is a lower bound, top values come from the most
+frequent values kept and the histogram is merged from per-chunk ones.
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+HISTOGRAM_BINS = 10
+TOP_VALUES = 10
+CATEGORICAL_MAX_DISTINCT = 50
+DATE_PROBE_ROWS = 100
+PROFILE_TRACKED_VALUES = 100_000
+# Resolution of the per-chunk histograms merged for columns with too many distinct values to count
+CHUNK_HISTOGRAM_BINS = 1024
+# Names that mark a column as a time axis even when its values are labels such as "Jan" or "Q1 2024"
+TEMPORAL_NAMES = ("date", "time", "timestamp", "day", "week", "month", "quarter", "year")
+CHART_ORDER = ("bar", "line", "area", "pie", "scatter")
+
+
+def _scalar(value: Any) -> Any:
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _looks_temporal(name: str, values: pd.Series) -> bool:
+    if str(name).lower() in TEMPORAL_NAMES:
+        return True
+    probe = values.head(DATE_PROBE_ROWS)
+    if probe.empty or not pd.api.types.is_string_dtype(probe):
+        return False
+    try:
+        pd.to_datetime(probe, format="ISO8601")
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def column_kind(name: str, series: pd.Series, distinct: int) -> str:
+    return _kind(name, series.dtype, series.dropna(), distinct)
+
+
+def _kind(name: str, dtype, probe: pd.Series, distinct: int) -> str:
+    if pd.api.types.is_bool_dtype(dtype):
+        return "boolean"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "temporal"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "numeric"
+    if _looks_temporal(name, probe):
+        return "temporal"
+    return "categorical" if distinct <= CATEGORICAL_MAX_DISTINCT else "text"
+
+
+def profile_column(name: str, series: pd.Series) -> Dict[str, Any]:
+    """Profile one column; cost is a few vectorized passes over its values"""
+    values = series.dropna()
+    distinct = int(values.nunique())
+    kind = column_kind(name, series, distinct)
+    profile = {"dtype": str(series.dtype), "kind": kind, "nulls": int(len(series) - len(values)), "distinct": distinct}
+    if values.empty:
+        return profile
+
+    if kind == "numeric":
+        numbers = values.to_numpy(dtype=np.float64)
+        profile["min"], profile["max"] = _scalar(values.min()), _scalar(values.max())
+        counts, edges = np.histogram(numbers, bins=min(HISTOGRAM_BINS, distinct))
+        profile["histogram"] = {"edges": edges.tolist(), "counts": counts.tolist()}
+        return profile
+
+    if kind == "temporal":
+        try:
+            dates = pd.to_datetime(values, format="ISO8601")
+        except (TypeError, ValueError):
+            dates = None
+        if dates is not None:
+            profile["min"], profile["max"] = _scalar(dates.min()), _scalar(dates.max())
+    top = values.value_counts().head(TOP_VALUES)
+    profile["top"] = {"values": [_scalar(v) for v in top.index], "counts": top.tolist()}
+    return profile
+
+
+class ColumnProfiler:
+    """Accumulates the profile of one column from its chunks in bounded memory"""
+
+    def __init__(self, name: str, tracked_values: int = PROFILE_TRACKED_VALUES):
+        self.name = name
+        self.tracked_values = tracked_values
+        self.nulls = 0
+        self.counts = pd.Series(dtype=np.int64)
+        self.distinct_floor = 0
+        self.exact = True
+        self.probe: Optional[pd.Series] = None
+        self.low = self.high = None
+        self.chunk_histograms: List[Any] = []
+        self.date_low = self.date_high = None
+        self.dates_valid = True
+
+    def add(self, series: pd.Series) -> None:
+        values = series.dropna()
+        self.nulls += len(series) - len(values)
+        if values.empty:
+            return
+        if self.probe is None or len(self.probe) < DATE_PROBE_ROWS:
+            probe = values if self.probe is None else pd.concat([self.probe, values])
+            self.probe = probe.head(DATE_PROBE_ROWS)
+
+        chunk_counts = values.value_counts(sort=False)
+        merged = pd.concat([self.counts, chunk_counts]).groupby(level=0, sort=False).sum()
+        if len(merged) > self.tracked_values:
+            # Keep the most frequent half, so top values stay meaningful
+            self.distinct_floor = max(self.distinct_floor, len(merged))
+            self.exact = False
+            merged = merged.nlargest(self.tracked_values // 2)
+        self.counts = merged
+
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            numbers = values.to_numpy(dtype=np.float64)
+            low, high = values.min(), values.max()
+            self.low = low if self.low is None else min(self.low, low)
+            self.high = high if self.high is None else max(self.high, high)
+            self.chunk_histograms.append(np.histogram(numbers, bins=CHUNK_HISTOGRAM_BINS))
+        elif self.dates_valid and _looks_temporal(self.name, self.probe):
+            try:
+                dates = pd.to_datetime(values, format="ISO8601")
+            except (TypeError, ValueError):
+                self.dates_valid = False
+            else:
+                low, high = dates.min(), dates.max()
+                self.date_low = low if self.date_low is None else min(self.date_low, low)
+                self.date_high = high if self.date_high is None else max(self.date_high, high)
+
+    def result(self, dtype) -> Dict[str, Any]:
+        """The column's profile, given the dtype the whole column parses as"""
+        distinct = max(self.distinct_floor, len(self.counts))
+        probe = self.probe if self.probe is not None else pd.Series(dtype=object)
+        kind = _kind(self.name, dtype, probe, distinct)
+        profile = {"dtype": str(dtype), "kind": kind, "nulls": self.nulls, "distinct": distinct}
+        if not self.exact:
+            profile["approximate"] = True
+        if self.counts.empty:
+            return profile
+
+        if kind == "numeric" and self.low is not None:
+            profile["min"], profile["max"] = _scalar(self.low), _scalar(self.high)
+            bins = min(HISTOGRAM_BINS, distinct)
+            if self.exact:
+                counts, edges = np.histogram(
+                    self.counts.index.to_numpy(dtype=np.float64), bins=bins, weights=self.counts.to_numpy()
+                )
+            else:
+                edges = np.histogram_bin_edges([float(self.low), float(self.high)], bins=bins)
+                counts = np.zeros(bins)
+                for chunk_counts, chunk_edges in self.chunk_histograms:
+                    middles = (chunk_edges[:-1] + chunk_edges[1:]) / 2
+                    counts += np.histogram(np.clip(middles, edges[0], edges[-1]), bins=edges, weights=chunk_counts)[0]
+            profile["histogram"] = {"edges": edges.tolist(), "counts": counts.astype(np.int64).tolist()}
+            return profile
+
+        if kind == "temporal" and self.dates_valid and self.date_low is not None:
+            profile["min"], profile["max"] = _scalar(self.date_low), _scalar(self.date_high)
+        top = self.counts.sort_values(ascending=False, kind="stable").head(TOP_VALUES)
+        profile["top"] = {"values": [_scalar(v) for v in top.index], "counts": top.tolist()}
+        return profile
+
+
+def profile_frame(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    return {str(col): profile_column(col, df[col]) for col in df.columns}
+
+
+def recommend_charts(profile: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Chart types suited to a dataset, judged from its column profile alone"""
+    kinds = [column["kind"] for column in profile.values()]
+    recommendations = set()
+    if "temporal" in kinds:
+        recommendations.update(("line", "area", "bar"))
+    if "categorical" in kinds or "boolean" in kinds:
+        recommendations.update(("pie", "bar"))
+    if kinds.count("numeric") >= 2:
+        recommendations.add("scatter")
+    return [chart for chart in CHART_ORDER if chart in recommendations] or ["bar"]
@@ -0,0 +1,110 @@
+"""Row filters, column projection and paging over datasets"""
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+OPERATORS = ("eq", "ne", "gt", "ge", "lt", "le", "in", "contains")
+
+
+class QueryError(ValueError):
+    """Raised for malformed filters, unknown columns or bad cursors"""
+
+
+@dataclass(frozen=True)
+class Predicate:
+    column: str
+    op: str
+    value: str
+
+    @classmethod
+    def parse(cls, spec: str) -> "Predicate":
+        """Parse "column:op:value", e.g. "sales:gt:20000" or "month:in:Jan|Feb" """
+        column, sep, rest = spec.partition(":")
+        op, sep2, value = rest.partition(":")
+        if not (sep and sep2 and column):
+            raise QueryError(f"Invalid filter '{spec}', expected column:op:value")
+        if op not in OPERATORS:
+            raise QueryError(f"Invalid filter operator '{op}', expected one of {', '.join(OPERATORS)}")
+        return cls(column, op, value)
+
+    def values(self, numeric: bool, integer: bool = False) -> List[Any]:
+        raw = self.value.split("|") if self.op == "in" else [self.value]
+        if not numeric or self.op == "contains":
+            return raw
+        try:
+            parsed = [float(v) for v in raw]
+        except ValueError:
+            raise QueryError(f"Filter value '{self.value}' is not numeric for column '{self.column}'")
+        if integer and all(v.is_integer() for v in parsed):
+            return [int(v) for v in parsed]
+        return parsed
+
+    def mask(self, series: pd.Series) -> pd.Series:
+        """Boolean mask selecting the rows of series that satisfy this predicate"""
+        values = self.values(pd.api.types.is_numeric_dtype(series))
+        if self.op == "in":
+            return series.isin(values)
+        if self.op == "contains":
+            return series.astype(str).str.contains(values[0], regex=False, na=False)
+        value = values[0]
+        return {
+            "eq": series.__eq__, "ne": series.__ne__,
+            "gt": series.__gt__, "ge": series.__ge__,
+            "lt": series.__lt__, "le": series.__le__,
+        }[self.op](value)
+
+
+def parse_predicates(specs: Optional[Sequence[str]]) -> List[Predicate]:
+    return [Predicate.parse(spec) for spec in specs or []]
+
+
+def parse_columns(spec: Optional[str]) -> Optional[List[str]]:
+    if not spec:
+        return None
+    return [col.strip() for col in spec.split(",") if col.strip()]
+
+
+def check_columns(available: Sequence[str], columns: Optional[List[str]], predicates: List[Predicate]) -> None:
+    requested = list(columns or []) + [p.column for p in predicates]
+    unknown = [col for col in requested if col not in available]
+    if unknown:
+        raise QueryError(f"Unknown columns: {', '.join(dict.fromkeys(unknown))}")
+
+
+def apply_window(
+    df: pd.DataFrame,
+    columns: Optional[List[str]] = None,
+    predicates: Sequence[Predicate] = (),
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> Tuple[pd.DataFrame, int]:
+    """Filter, project and slice df, returning the window and the matching row count"""
+    check_columns(df.columns, columns, list(predicates))
+    if predicates:
+        mask = pd.Series(True, index=df.index)
+        for predicate in predicates:
+            mask &= predicate.mask(df[predicate.column])
+        df = df[mask]
+    total = len(df)
+    if columns:
+        df = df[columns]
+    stop = None if limit is None else offset + limit
+    return df.iloc[offset:stop], total
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise QueryError("Invalid cursor")
+    if not isinstance(state, dict) or not isinstance(state.get("offset"), int):
+        raise QueryError("Invalid cursor")
+    return state
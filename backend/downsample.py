@@ -0,0 +1,198 @@
+"""Server-side reduction of chart data so payloads scale with pixels, not rows.
+
+Each chart type has a default strategy, chosen by reduce_for_chart():
+
+- line / area: LTTB (largest triangle three buckets) or min/max bucketing,
+  about one bucket per horizontal pixel
+- bar / pie:   group-by sum over the x column, folding the smallest
+  categories into "Other" when there are more than fit
+- scatter:     deterministic random sampling, or 2D binning into
+  SCATTER_CELL_PX cells with a count column
+
+Reduced line, area, bar, pie and sampled scatter data keep the original
+record shape, so the React chart components draw it unchanged.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+METHODS = ("auto", "none", "lttb", "minmax", "sum", "sample", "bin")
+DEFAULT_METHODS = {"line": "lttb", "area": "lttb", "bar": "sum", "pie": "sum", "scatter": "sample"}
+X_CANDIDATES = ("date", "month", "quarter", "category", "product", "type")
+
+BAR_MIN_PX = 4
+PIE_MAX_SLICES = 24
+SCATTER_CELL_PX = 4
+OTHER_LABEL = "Other"
+
+
+def resolve_fields(
+    df: pd.DataFrame, x_field: Optional[str] = None, y_fields: Optional[List[str]] = None
+) -> Tuple[str, List[str]]:
+    """Pick the x column and numeric y columns a chart is drawn from"""
+    columns = list(df.columns)
+    for col in [x_field] + list(y_fields or []):
+        if col is not None and col not in columns:
+            raise ValueError(f"Unknown column '{col}'")
+    if x_field is None:
+        named = [col for col in columns if col in X_CANDIDATES]
+        non_numeric = [col for col in columns if not pd.api.types.is_numeric_dtype(df[col])]
+        x_field = (named or non_numeric or columns)[0]
+    if not y_fields:
+        y_fields = [
+            col for col in columns
+            if col != x_field and pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+        ]
+    return x_field, list(y_fields)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Row indices chosen by Largest-Triangle-Three-Buckets.
+
+    Bucket averages are computed with cumulative sums; the remaining loop
+    runs once per bucket (bounded by the chart width), not once per row.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+
+    edges = np.unique(np.linspace(1, n - 1, threshold - 1).astype(np.int64))
+    starts, ends = edges[:-1], edges[1:]
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = ends - starts
+    avg_x = (cum_x[ends] - cum_x[starts]) / sizes
+    avg_y = (cum_y[ends] - cum_y[starts]) / sizes
+
+    selected = np.empty(len(starts) + 2, dtype=np.int64)
+    selected[0] = a = 0
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        if i + 1 < len(starts):
+            next_x, next_y = avg_x[i + 1], avg_y[i + 1]
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def minmax_indices(y: np.ndarray, buckets: int) -> np.ndarray:
+    """Row indices of the first, last, minimum and maximum point of each bucket"""
+    n = len(y)
+    if buckets * 2 >= n:
+        return np.arange(n)
+    series = pd.Series(np.asarray(y, dtype=float))
+    bucket = (np.arange(n) * buckets) // n
+    grouped = series.groupby(bucket)
+    picked = np.concatenate((
+        grouped.idxmin().dropna().to_numpy(dtype=np.int64),
+        grouped.idxmax().dropna().to_numpy(dtype=np.int64),
+        [0, n - 1],
+    ))
+    return np.unique(picked)
+
+
+def _series_positions(df: pd.DataFrame, x_field: str) -> np.ndarray:
+    if pd.api.types.is_numeric_dtype(df[x_field]):
+        return df[x_field].to_numpy(dtype=float)
+    return np.arange(len(df), dtype=float)
+
+
+def _reduce_series(df: pd.DataFrame, x_field: str, y_fields: List[str], method: str, width: int) -> pd.DataFrame:
+    if method == "minmax":
+        indices = [minmax_indices(df[col].to_numpy(), width) for col in y_fields]
+    else:
+        x = _series_positions(df, x_field)
+        indices = [lttb_indices(x, df[col].to_numpy(), width) for col in y_fields]
+    if not indices:
+        return df
+    keep = np.unique(np.concatenate(indices))
+    return df if len(keep) == len(df) else df.iloc[keep]
+
+
+def _reduce_categories(df: pd.DataFrame, x_field: str, y_fields: List[str], max_groups: int) -> pd.DataFrame:
+    if not df[x_field].duplicated().any() and len(df) <= max_groups:
+        return df
+    # Non-numeric companions such as a category's color keep their first value
+    agg = {col: ("sum" if col in y_fields else "first") for col in df.columns if col != x_field}
+    grouped = df.groupby(x_field, sort=False, as_index=False).agg(agg)[list(df.columns)]
+    if len(grouped) <= max_groups or not y_fields:
+        return grouped
+
+    order = grouped[y_fields[0]].abs().sort_values(ascending=False, kind="stable").index
+    keep = grouped.loc[order[:max_groups - 1]]
+    rest = grouped.loc[order[max_groups - 1:]]
+    other = {col: (rest[col].sum() if col in y_fields else None) for col in grouped.columns}
+    other[x_field] = OTHER_LABEL
+    return pd.concat([keep.sort_index(), pd.DataFrame([other])], ignore_index=True)
+
+
+def _reduce_scatter(
+    df: pd.DataFrame, x_field: str, y_fields: List[str], method: str, width: int, height: int
+) -> pd.DataFrame:
+    max_points = max(1, (width // SCATTER_CELL_PX) * (height // SCATTER_CELL_PX))
+    if method == "bin":
+        # Bin on the first two numeric columns, which is what ScatterPlot plots
+        numeric = [col for col in [x_field] + y_fields if pd.api.types.is_numeric_dtype(df[col])]
+        if len(numeric) < 2:
+            raise ValueError("Scatter binning needs two numeric columns")
+        bx, by = numeric[0], numeric[1]
+        x_bins = pd.cut(df[bx], bins=max(1, width // SCATTER_CELL_PX))
+        y_bins = pd.cut(df[by], bins=max(1, height // SCATTER_CELL_PX))
+        counts = df.groupby([x_bins, y_bins], observed=True).size().rename("count").reset_index()
+        counts[bx] = counts[bx].map(lambda interval: interval.mid).astype(float)
+        counts[by] = counts[by].map(lambda interval: interval.mid).astype(float)
+        return counts
+    if len(df) <= max_points:
+        return df
+    # A fixed seed keeps the sample stable for identical requests
+    rng = np.random.default_rng(0)
+    return df.iloc[np.sort(rng.choice(len(df), size=max_points, replace=False))]
+
+
+def reduce_for_chart(
+    df: pd.DataFrame,
+    chart_type: str,
+    width: int,
+    height: int,
+    method: str = "auto",
+    x_field: Optional[str] = None,
+    y_fields: Optional[List[str]] = None,
+) -> Tuple[pd.DataFrame, Optional[Dict[str, Any]]]:
+    """Reduce df for drawing at width x height pixels.
+
+    Returns the reduced frame and a summary of the reduction, or None when
+    the data was returned untouched.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Invalid downsample method '{method}', expected one of {', '.join(METHODS)}")
+    if method == "auto":
+        method = DEFAULT_METHODS.get(chart_type, "none")
+    if method == "none" or df.empty:
+        return df, None
+
+    width = max(1, int(width or 500))
+    height = max(1, int(height or 300))
+    x_field, y_fields = resolve_fields(df, x_field, y_fields)
+    if method in ("lttb", "minmax"):
+        reduced = _reduce_series(df, x_field, y_fields, method, width)
+    elif method == "sum":
+        max_groups = min(PIE_MAX_SLICES, width // BAR_MIN_PX) if chart_type == "pie" else width // BAR_MIN_PX
+        reduced = _reduce_categories(df, x_field, y_fields, max(2, max_groups))
+    else:
+        reduced = _reduce_scatter(df, x_field, y_fields, method, width, height)
+
+    if reduced is df:
+        return df, None
+    return reduced, {
+        "method": method,
+        "x_field": x_field,
+        "y_fields": y_fields,
+        "source_rows": len(df),
+        "rows": len(reduced),
+    }
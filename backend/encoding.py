@@ -0,0 +1,135 @@
+"""Response encodings for dataset and chart payloads.
+
+Three shapes are supported:
+
+- records:  {"data": [{col: value, ...}, ...], ...}  (the default)
+- columnar: {"data": {"columns": [...], "values": {col: [...]}}, ...}
+- ndjson:   the envelope on the first line, then one JSON object per row
+
+Payloads are encoded with orjson when it is installed; numeric columns are
+then handed over as NumPy arrays instead of being boxed row by row.
+"""
+import json
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import Response, StreamingResponse
+
+from dataset_query import QueryError
+from metrics import phase
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+FORMATS = ("records", "columnar", "ndjson")
+MEDIA_TYPES = {
+    "records": "application/json",
+    "columnar": "application/vnd.d3tool.columnar+json",
+    "ndjson": "application/x-ndjson",
+}
+NDJSON_CHUNK_ROWS = 10000
+
+
+def negotiate_format(requested: Optional[str], accept: Optional[str]) -> str:
+    """Pick the response format from a format= parameter, falling back to Accept"""
+    if requested:
+        if requested not in FORMATS:
+            raise QueryError(f"Invalid format '{requested}', expected one of {', '.join(FORMATS)}")
+        return requested
+    for media_range in (accept or "").split(","):
+        media_type = media_range.split(";")[0].strip()
+        for fmt, candidate in MEDIA_TYPES.items():
+            if media_type == candidate:
+                return fmt
+    return "records"
+
+
+def dumps(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_json_default).encode("utf-8")
+
+
+def loads(content: bytes) -> Any:
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def column_values(series: pd.Series):
+    """Values of one column in a form dumps() can encode, with missing values as null"""
+    if orjson is not None and isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufM":
+        return np.ascontiguousarray(series.to_numpy())
+    if series.hasnans:
+        return series.astype(object).where(series.notna(), None).tolist()
+    return series.tolist()
+
+
+def frame_to_columnar(df: pd.DataFrame) -> Dict[str, Any]:
+    return {
+        "columns": [str(col) for col in df.columns],
+        "values": {str(col): column_values(df[col]) for col in df.columns},
+    }
+
+
+def frame_to_records(df: pd.DataFrame):
+    if df.isna().values.any():
+        df = df.astype(object).where(df.notna(), None)
+    return df.to_dict("records")
+
+
+def iter_ndjson(df: pd.DataFrame, header: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+    """Yield newline-delimited JSON rows, encoding NDJSON_CHUNK_ROWS rows at a time"""
+    if header is not None:
+        yield dumps(header) + b"\n"
+    for start in range(0, len(df), NDJSON_CHUNK_ROWS):
+        records = frame_to_records(df.iloc[start:start + NDJSON_CHUNK_ROWS])
+        yield b"".join(dumps(record) + b"\n" for record in records)
+
+
+def frame_response(
+    df: pd.DataFrame, fmt: str, envelope: Dict[str, Any], data_path: Tuple[str, ...] = ("data",)
+) -> Response:
+    """Encode df in the negotiated format and place it at data_path inside envelope.
+
+    Put a None placeholder at data_path in envelope to control key order.
+    For ndjson the envelope without the data is sent as the first line,
+    followed by one line per row.
+    """
+    if fmt == "ndjson":
+        return StreamingResponse(
+            iter_ndjson(df, header=_replace_at(envelope, data_path, None, drop=True)),
+            media_type=MEDIA_TYPES["ndjson"],
+            headers={"X-Row-Count": str(len(df))},
+        )
+    with phase("serialize"):
+        data = frame_to_columnar(df) if fmt == "columnar" else frame_to_records(df)
+        return FastJSONResponse(_replace_at(envelope, data_path, data), media_type=MEDIA_TYPES[fmt])
+
+
+def _replace_at(envelope: Dict[str, Any], path: Tuple[str, ...], value: Any, drop: bool = False) -> Dict[str, Any]:
+    head, rest = path[0], path[1:]
+    out = dict(envelope)
+    if rest:
+        out[head] = _replace_at(envelope.get(head) or {}, rest, value, drop)
+    elif drop:
+        out.pop(head, None)
+    else:
+        out[head] = value
+    return out
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,120 @@
+"""Bounded thread pool for blocking pandas and file I/O work.
+
+Endpoints hand their CSV parsing, serialization and disk writes to
+BlockingExecutor.run() instead of calling them on the event loop. Each
+endpoint also gets its own concurrency limit so one slow route cannot take
+every pool thread; callers beyond the limit wait on the loop, and that
+queue depth is reported by stats(). Jobs run in a copy of the caller's
+context, so phase timings and profiling follow the request onto the pool.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from metrics import blocking_job
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """Parse "endpoint=N,endpoint=N" into a dict of per-endpoint limits"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        limits[name.strip()] = int(value)
+    return limits
+
+
+class EndpointStats:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queued = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "max_queued": self.max_queued,
+        }
+
+
+class BlockingExecutor:
+    def __init__(self, max_workers: int, default_limit: int, limits: Optional[Dict[str, int]] = None):
+        self.max_workers = max_workers
+        self.default_limit = default_limit
+        self.limits = limits or {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="blocking")
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    async def run(self, endpoint: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool under endpoint's concurrency limit"""
+        stats = self._stats_for(endpoint)
+        if stats.semaphore.locked():
+            stats.queued += 1
+            stats.max_queued = max(stats.max_queued, stats.queued)
+            try:
+                await stats.semaphore.acquire()
+            finally:
+                stats.queued -= 1
+        else:
+            await stats.semaphore.acquire()
+
+        stats.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            result = await loop.run_in_executor(self._pool, context.run, _run_job, endpoint, fn, args, kwargs)
+        except BaseException:
+            stats.failed += 1
+            raise
+        else:
+            stats.completed += 1
+            return result
+        finally:
+            stats.running -= 1
+            stats.semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = {name: stats.as_dict() for name, stats in sorted(self._endpoints.items())}
+        return {
+            "max_workers": self.max_workers,
+            "queued": sum(stats["queued"] for stats in endpoints.values()),
+            "running": sum(stats["running"] for stats in endpoints.values()),
+            "endpoints": endpoints,
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _stats_for(self, endpoint: str) -> EndpointStats:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            with self._lock:
+                stats = self._endpoints.setdefault(
+                    endpoint, EndpointStats(self.limits.get(endpoint, self.default_limit))
+                )
+        return stats
+
+
+def _run_job(endpoint: str, fn: Callable[..., Any], args, kwargs) -> Any:
+    with blocking_job(endpoint):
+        return fn(*args, **kwargs)
+
+
+def executor_from_env() -> BlockingExecutor:
+    """Build the executor from BLOCKING_POOL_SIZE and ENDPOINT_CONCURRENCY* settings"""
+    return BlockingExecutor(
+        max_workers=int(os.environ.get("BLOCKING_POOL_SIZE", str(min(32, (os.cpu_count() or 1) + 4)))),
+        default_limit=int(os.environ.get("ENDPOINT_CONCURRENCY", "8")),
+        limits=parse_limits(os.environ.get("ENDPOINT_CONCURRENCY_LIMITS", "")),
+    )
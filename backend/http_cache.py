@@ -0,0 +1,63 @@
+"""HTTP validators and conditional GET handling.
+
+Responses carry a strong ETag built from an immutable token (a dataset
+version or a chart id) plus whatever else selects the representation, such
+as the format and query parameters. The token is known from a stat() call,
+so a matching If-None-Match is answered with 304 before any data is read.
+"""
+import hashlib
+import json
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# Chart ids hash the chart config and dataset version, so their content never changes
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Datasets can be rewritten in place; clients keep a copy but revalidate it
+REVALIDATE = "no-cache"
+
+
+def make_etag(token: str, *variant: Any) -> str:
+    """Strong ETag for the representation of token selected by variant"""
+    if not variant:
+        return f'"{token}"'
+    key = json.dumps(variant, sort_keys=True, default=str)
+    return f'"{token}-{hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]}"'
+
+
+def cache_headers(
+    etag: str, last_modified: Optional[float] = None, cache_control: str = REVALIDATE, vary: Optional[str] = None
+) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    if vary:
+        headers["Vary"] = vary
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[float] = None) -> bool:
+    """Whether the client's cached copy is current (If-None-Match takes precedence)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match uses the weak comparison, so W/ prefixes added by proxies still match
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def with_headers(response: Response, headers: Dict[str, str]) -> Response:
+    response.headers.update(headers)
+    return response
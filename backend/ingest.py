@@ -0,0 +1,165 @@
+"""Streaming CSV ingestion with bounded memory use"""
+import io
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import UploadFile
+
+from dataset_profile import ColumnProfiler
+from metrics import phase
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+PARSE_CHUNK_ROWS = int(os.environ.get("INGEST_CHUNK_ROWS", "100000"))
+
+
+class IngestError(ValueError):
+    """Raised when an uploaded file is not a well-formed CSV dataset"""
+
+
+@dataclass
+class IngestSummary:
+    rows: int = 0
+    columns: List[str] = field(default_factory=list)
+    dtypes: Dict[str, np.dtype] = field(default_factory=dict)
+    sample: pd.DataFrame = None
+    profilers: Dict[str, ColumnProfiler] = field(default_factory=dict)
+
+    def profile(self) -> Dict[str, Dict[str, Any]]:
+        """Column profiles of the whole file, accumulated chunk by chunk"""
+        return {str(col): self.profilers[col].result(self.dtypes[col]) for col in self.columns}
+
+    def schema(self) -> pd.DataFrame:
+        """Empty frame carrying the merged column dtypes of every chunk"""
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in self.dtypes.items()})
+
+
+async def spool_upload(file: UploadFile, directory: Path) -> Path:
+    """Copy an upload to a temp file in directory one chunk at a time"""
+    fd, spool_path = tempfile.mkstemp(dir=directory, suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                out.write(chunk)
+    except BaseException:
+        os.unlink(spool_path)
+        raise
+    return Path(spool_path)
+
+
+def spool_text(text: str, directory: Path) -> Path:
+    """Write CSV text sent inside a request body to a temp file in directory"""
+    fd, spool_path = tempfile.mkstemp(dir=directory, suffix=".upload")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as out:
+            out.write(text)
+    except BaseException:
+        os.unlink(spool_path)
+        raise
+    return Path(spool_path)
+
+
+def ingest_csv(
+    source: Path,
+    target: Path,
+    chunk_rows: int = PARSE_CHUNK_ROWS,
+    install: Optional[Callable[[Path, Path], None]] = None,
+) -> IngestSummary:
+    """Parse source in chunks, validate it and atomically publish it as target.
+
+    Only one chunk of rows is held in memory at a time. The normalized CSV
+    is written next to target and renamed over it once every chunk parsed,
+    so readers never observe a half-written dataset. install(target, tmp)
+    replaces the plain rename, e.g. with a storage backend's install().
+    """
+    summary = IngestSummary()
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=".csv.tmp")
+    try:
+        with os.fdopen(fd, "w", newline="") as out:
+            try:
+                with pd.read_csv(source, chunksize=chunk_rows, encoding="utf-8") as reader:
+                    while True:
+                        with phase("parse"):
+                            chunk = next(reader, None)
+                        if chunk is None:
+                            break
+                        first_chunk = summary.sample is None
+                        if first_chunk:
+                            _validate_header(chunk)
+                            summary.columns = list(chunk.columns)
+                            summary.sample = chunk.head(3)
+                        summary.rows += len(chunk)
+                        for col, dtype in chunk.dtypes.items():
+                            summary.dtypes[col] = _merge_dtype(summary.dtypes.get(col), dtype)
+                            summary.profilers.setdefault(col, ColumnProfiler(col)).add(chunk[col])
+                        with phase("write"):
+                            chunk.to_csv(out, header=first_chunk, index=False)
+            except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+                raise IngestError(f"Invalid CSV file: {e}") from e
+        if summary.sample is None:
+            raise IngestError("Invalid CSV file: no columns found")
+        # mkstemp creates owner-only files; match what to_csv would produce
+        os.chmod(tmp_path, 0o644)
+        if install is None:
+            os.replace(tmp_path, target)
+        else:
+            install(target, Path(tmp_path))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return summary
+
+
+def _validate_header(chunk: pd.DataFrame) -> None:
+    # pandas silently turns a surplus leading field into the index
+    if not isinstance(chunk.index, pd.RangeIndex):
+        raise IngestError("Invalid CSV file: rows have more fields than the header")
+    unnamed = [col for col in chunk.columns if str(col).startswith("Unnamed:")]
+    if unnamed:
+        raise IngestError(f"Invalid CSV file: missing column names for {unnamed}")
+
+
+def _merge_dtype(current, new):
+    """Widen a column dtype so it can hold the values of every chunk seen so far"""
+    if current is None or current == new:
+        return new
+    if pd.api.types.is_numeric_dtype(current) and pd.api.types.is_numeric_dtype(new) \
+            and not pd.api.types.is_bool_dtype(current) and not pd.api.types.is_bool_dtype(new):
+        return np.result_type(current, new)
+    return np.dtype(object)
+
+
+def parse_rows(body: bytes, content_type: str) -> pd.DataFrame:
+    """Parse rows sent with a write request as CSV, NDJSON or JSON.
+
+    JSON bodies are {"data": [{col: value}, ...]} or {"data": {col: [...]}}.
+    """
+    media_type = content_type.split(";")[0].strip().lower()
+    try:
+        if media_type == "text/csv":
+            df = pd.read_csv(io.BytesIO(body), encoding="utf-8")
+            _validate_header(df)
+            return df
+        if media_type == "application/x-ndjson":
+            return pd.read_json(io.BytesIO(body), lines=True, dtype=False) if body.strip() else pd.DataFrame()
+        payload = json.loads(body)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError, ValueError) as e:
+        raise IngestError(f"Invalid request body: {e}") from e
+    data = payload.get("data") if isinstance(payload, dict) else None
+    if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+        return pd.DataFrame.from_records(data)
+    if isinstance(data, dict) and all(isinstance(values, list) for values in data.values()):
+        try:
+            return pd.DataFrame(data)
+        except ValueError as e:
+            raise IngestError(f"Invalid columnar data: {e}") from e
+    raise IngestError('Expected {"data": [{...}, ...]} or {"data": {"column": [...]}}')
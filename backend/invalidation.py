@@ -0,0 +1,120 @@
+"""Cross-worker invalidation of in-memory dataset state.
+
+With several worker processes (uvicorn --workers / WEB_CONCURRENCY) each
+one keeps its own dataset cache and catalog. A worker that writes a
+dataset appends "<pid> <name>" to a shared log file, and every worker polls
+the file's size from a background thread, applying the lines that other
+processes wrote since its last poll. Each line is a single O_APPEND write
+far below PIPE_BUF, so concurrent writers never interleave within a line,
+and an idle poll is one stat().
+
+The log is emptied by replacing the file once it grows past max_bytes. A
+worker that finds the file replaced cannot tell what it missed, so that
+poll reports ALL.
+"""
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+POLL_SECONDS = float(os.environ.get("INVALIDATION_POLL_MS", "250")) / 1000
+MAX_LOG_BYTES = 1024 * 1024
+# Reported instead of dataset names when the log was replaced between two polls
+ALL = "*"
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationLog:
+    def __init__(self, path: Path, max_bytes: int = MAX_LOG_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.published = 0
+        self.received = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # (inode, offset) read up to; writes from before this process started are irrelevant
+        self._position = self._stat()
+
+    def publish(self, name: str) -> None:
+        """Tell the other workers that dataset name changed"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, f"{os.getpid()} {name}\n".encode())
+            oversized = os.fstat(fd).st_size > self.max_bytes
+        finally:
+            os.close(fd)
+        if oversized:
+            tmp_file = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_file.write_bytes(b"")
+            os.replace(tmp_file, self.path)
+        self.published += 1
+
+    def poll(self) -> Set[str]:
+        """Names of datasets other processes changed since the last poll"""
+        with self._lock:
+            inode, offset = self._position
+            current_inode, size = self._stat()
+            if (current_inode, size) == (inode, offset):
+                return set()
+            if inode and current_inode != inode or size < offset:
+                self._position = (current_inode, size)
+                self.received += 1
+                return {ALL}
+            try:
+                with open(self.path, "rb") as f:
+                    f.seek(offset)
+                    data = f.read(size - offset)
+            except FileNotFoundError:
+                return set()
+            # A line still being written is picked up by the next poll
+            complete = data[:data.rfind(b"\n") + 1]
+            self._position = (current_inode, offset + len(complete))
+
+        names = set()
+        own = str(os.getpid())
+        for line in complete.decode(errors="replace").splitlines():
+            pid, _, name = line.partition(" ")
+            if name and pid != own:
+                names.add(name)
+        self.received += len(names)
+        return names
+
+    def start(self, apply: Callable[[Set[str]], None], interval: float = POLL_SECONDS) -> None:
+        """Call apply(names) from a background thread whenever other workers changed datasets"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(apply, interval), name="invalidation-log", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "published": self.published,
+            "received": self.received,
+            "polling": self._thread is not None,
+        }
+
+    def _stat(self) -> Tuple[int, int]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return 0, 0
+        return stat.st_ino, stat.st_size
+
+    def _run(self, apply: Callable[[Set[str]], None], interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                names = self.poll()
+                if names:
+                    apply(names)
+            except Exception:
+                logger.exception("Applying dataset invalidations failed")
@@ -0,0 +1,165 @@
+"""Server-sent event subscriptions to dataset changes.
+
+A subscription holds no queue of changes, only a flag that is set when
+its dataset is written; the stream remembers the version it last sent.
+Writes made while an event is being computed or sent, or while the
+client is slow to read it, collapse into the next event, which covers
+everything since that version. Memory per subscriber therefore stays
+constant however hot the dataset is. A client that stops reading simply
+stops receiving: the stream waits on the transport before it computes
+the next event.
+"""
+import asyncio
+import contextlib
+import os
+from collections import defaultdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from encoding import dumps
+from invalidation import ALL
+
+MAX_SUBSCRIBERS = int(os.environ.get("LIVE_MAX_SUBSCRIBERS", "1000"))
+MIN_INTERVAL_SECONDS = float(os.environ.get("LIVE_MIN_INTERVAL_MS", "250")) / 1000
+HEARTBEAT_SECONDS = 15.0
+AGGREGATES = ["count", "sum", "min", "max", "mean"]
+
+# (event name, version, payload) describing a dataset relative to the version a client has
+Event = Tuple[str, str, Dict[str, Any]]
+
+
+class SubscriberLimitError(RuntimeError):
+    """Raised when LIVE_MAX_SUBSCRIBERS streams are already open"""
+
+
+class Subscription:
+    def __init__(self, name: str):
+        self.name = name
+        self.changed = asyncio.Event()
+
+
+class LiveUpdates:
+    def __init__(
+        self,
+        max_subscribers: int = MAX_SUBSCRIBERS,
+        min_interval: float = MIN_INTERVAL_SECONDS,
+        heartbeat: float = HEARTBEAT_SECONDS,
+    ):
+        self.max_subscribers = max_subscribers
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        self.events = 0
+        self.coalesced = 0
+        self._subscriptions: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Set the event loop the streams run on; notify() is a no-op until then"""
+        self._loop = loop
+
+    def notify(self, names: Iterable[str]) -> None:
+        """Wake the subscribers of names (ALL for every dataset); safe to call from any thread"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        names = set(names)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._mark(names)
+        else:
+            loop.call_soon_threadsafe(self._mark, names)
+
+    def check_capacity(self) -> None:
+        if self.subscribers() >= self.max_subscribers:
+            raise SubscriberLimitError(f"Too many live subscriptions (limit {self.max_subscribers})")
+
+    def subscribers(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    @contextlib.contextmanager
+    def subscribe(self, name: str) -> Iterator[Subscription]:
+        subscription = Subscription(name)
+        self._subscriptions[name].add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscriptions = self._subscriptions.get(name)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[name]
+
+    async def stream(
+        self, name: str, since: Optional[str], next_event: Callable[[Optional[str], bool], Awaitable[Optional[Event]]]
+    ) -> AsyncIterator[bytes]:
+        """Server-sent events for one subscriber of dataset name.
+
+        next_event(version, initial) describes the dataset relative to
+        version, or returns None when it is still at version (never for the
+        initial event). Event ids are versions, so a reconnecting
+        EventSource resumes through its Last-Event-ID.
+        """
+        with self.subscribe(name) as subscription:
+            event = await next_event(since, True)
+            while True:
+                if event is not None:
+                    kind, since, payload = event
+                    self.events += 1
+                    yield format_event(kind, since, payload)
+                    # Writes during the pause are coalesced into the next event
+                    await asyncio.sleep(self.min_interval)
+                try:
+                    await asyncio.wait_for(subscription.changed.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                subscription.changed.clear()
+                # Checked after a heartbeat too, which catches writes made outside the server
+                event = await next_event(since, False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": self.subscribers(),
+            "datasets": len(self._subscriptions),
+            "max_subscribers": self.max_subscribers,
+            "events": self.events,
+            "coalesced": self.coalesced,
+        }
+
+    def _mark(self, names: Set[str]) -> None:
+        if ALL in names:
+            targets = [s for subscriptions in self._subscriptions.values() for s in subscriptions]
+        else:
+            targets = [s for name in names for s in self._subscriptions.get(name, ())]
+        for subscription in targets:
+            if subscription.changed.is_set():
+                self.coalesced += 1
+            subscription.changed.set()
+
+
+def summarize(df: pd.DataFrame) -> pd.DataFrame:
+    """count, sum, min, max and mean (rows) of every numeric column of df"""
+    return df.select_dtypes("number").agg(AGGREGATES)
+
+
+def fold_appends(summary: pd.DataFrame, appended: List[pd.DataFrame]) -> pd.DataFrame:
+    """summary updated with appended rows, without rereading the rows it was computed from"""
+    columns = list(summary.columns)
+    if not columns or not appended:
+        return summary
+    added = pd.concat([frame[columns] for frame in appended]).apply(pd.to_numeric, errors="coerce").agg(AGGREGATES)
+    folded = summary.astype(float)
+    folded.loc["count"] = summary.loc["count"] + added.loc["count"]
+    folded.loc["sum"] = summary.loc["sum"] + added.loc["sum"]
+    folded.loc["min"] = np.fmin(summary.loc["min"], added.loc["min"])
+    folded.loc["max"] = np.fmax(summary.loc["max"], added.loc["max"])
+    folded.loc["mean"] = folded.loc["sum"] / folded.loc["count"].where(folded.loc["count"] > 0)
+    return folded
+
+
+def format_event(kind: str, event_id: str, payload: Dict[str, Any]) -> bytes:
+    return b"event: " + kind.encode() + b"\nid: " + event_id.encode() + b"\ndata: " + dumps(payload) + b"\n\n"
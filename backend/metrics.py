@@ -0,0 +1,309 @@
+"""Prometheus-style metrics, request timing middleware and phase timers.
+
+Metrics are kept in-process and rendered in the Prometheus text exposition
+format by /api/metrics; no client library is needed. Besides per-route
+latency, size and in-flight metrics recorded by MetricsMiddleware, blocking
+work is split into phases:
+
+    with phase("parse"):
+        df = pd.read_csv(path)
+
+Each phase is recorded per endpoint (the name the job was submitted to
+BlockingExecutor.run() under) as exclusive time, so a write that has to
+re-read the dataset counts the read as parse, not write. The phases of one
+request are also summed into its Server-Timing header.
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import profiler
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = tuple(float(10 ** exponent) for exponent in range(2, 10))
+
+# Name of the endpoint whose blocking job runs in the current context
+ENDPOINT: contextvars.ContextVar[str] = contextvars.ContextVar("metrics_endpoint", default="other")
+_PHASE: contextvars.ContextVar[Optional["_PhaseFrame"]] = contextvars.ContextVar("metrics_phase", default=None)
+_REQUEST_PHASES: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "metrics_request_phases", default=None
+)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            # Per series: one count per bucket, then sum and count
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = self.header()
+        for labels, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}")
+        return lines
+
+
+class Registry:
+    """Metrics rendered by /api/metrics, plus collectors that report other components' stats"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterator[_Metric]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterator[_Metric]]) -> None:
+        """collector() yields freshly filled metrics each time the registry is rendered"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUESTS = REGISTRY.register(Counter(
+    "d3tool_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "d3tool_http_request_duration_seconds", "Time from request start to the last body byte", ("method", "route")
+))
+REQUEST_BYTES = REGISTRY.register(Histogram(
+    "d3tool_http_request_size_bytes", "Request body size", ("method", "route"), SIZE_BUCKETS
+))
+RESPONSE_BYTES = REGISTRY.register(Histogram(
+    "d3tool_http_response_size_bytes", "Response body size as sent, after compression", ("method", "route"), SIZE_BUCKETS
+))
+IN_FLIGHT = REGISTRY.register(Gauge("d3tool_http_requests_in_flight", "Requests currently being served"))
+PHASE_SECONDS = REGISTRY.register(Histogram(
+    "d3tool_phase_duration_seconds",
+    "Exclusive time spent parsing, serializing, compressing and writing, by endpoint",
+    ("endpoint", "phase"),
+))
+
+
+class _PhaseFrame:
+    __slots__ = ("name", "parent", "child_seconds")
+
+    def __init__(self, name: str, parent: Optional["_PhaseFrame"]):
+        self.name = name
+        self.parent = parent
+        self.child_seconds = 0.0
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block as one phase of the current endpoint's work"""
+    parent = _PHASE.get()
+    if parent is not None and parent.name == name:
+        # Nested use of the same phase folds into the outer one
+        yield
+        return
+    frame = _PhaseFrame(name, parent)
+    token = _PHASE.set(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _PHASE.reset(token)
+        if parent is not None:
+            parent.child_seconds += elapsed
+        exclusive = elapsed - frame.child_seconds
+        PHASE_SECONDS.observe(exclusive, ENDPOINT.get(), name)
+        request_phases = _REQUEST_PHASES.get()
+        if request_phases is not None:
+            request_phases[name] = request_phases.get(name, 0.0) + exclusive
+
+
+@contextmanager
+def blocking_job(endpoint: str) -> Iterator[None]:
+    """Context of one BlockingExecutor job on a pool thread"""
+    token = ENDPOINT.set(endpoint)
+    active = profiler.ACTIVE.get()
+    if active is not None:
+        active.add_thread(threading.get_ident())
+    try:
+        yield
+    finally:
+        if active is not None:
+            active.remove_thread(threading.get_ident())
+        ENDPOINT.reset(token)
+
+
+def server_timing(phases: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in sorted(phases.items()))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, sizes and status per route template.
+
+    Requests carrying an X-Profile header equal to profile_token are run
+    under the sampling profiler; the response then carries X-Profile-Id and
+    the report is kept in profiler.PROFILES.
+    """
+
+    def __init__(self, app, profile_token: Optional[str] = None):
+        self.app = app
+        self.profile_token = profile_token
+        self._routes: Optional[Dict[Any, str]] = None
+
+    def route_name(self, scope) -> str:
+        if self._routes is None:
+            self._routes = {
+                getattr(route, "endpoint", None): route.path for route in getattr(scope.get("app"), "routes", [])
+            }
+        return self._routes.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_phases: Dict[str, float] = {}
+        phases_token = _REQUEST_PHASES.set(request_phases)
+        active = self._start_profile(scope)
+        state = {"status": 500, "request_bytes": 0, "response_bytes": 0}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                state["request_bytes"] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                headers = list(message.get("headers", []))
+                if request_phases:
+                    headers.append((b"server-timing", server_timing(request_phases).encode("latin-1")))
+                if active is not None:
+                    headers.append((b"x-profile-id", active.id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                state["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            _REQUEST_PHASES.reset(phases_token)
+            method, route = scope["method"], self.route_name(scope)
+            REQUESTS.inc(method, route, str(state["status"]))
+            REQUEST_SECONDS.observe(elapsed, method, route)
+            REQUEST_BYTES.observe(state["request_bytes"], method, route)
+            RESPONSE_BYTES.observe(state["response_bytes"], method, route)
+            if active is not None:
+                profiler.ACTIVE.reset(active.token)
+                active.stop(route=route, status=state["status"], phases=request_phases)
+
+    def _start_profile(self, scope) -> Optional[profiler.SamplingProfiler]:
+        if not self.profile_token:
+            return None
+        requested = dict(scope.get("headers", [])).get(b"x-profile")
+        if requested is None or requested.decode("latin-1") != self.profile_token:
+            return None
+        active = profiler.SamplingProfiler(path=scope.get("path", ""))
+        active.token = profiler.ACTIVE.set(active)
+        active.add_thread(threading.get_ident())
+        active.start()
+        return active
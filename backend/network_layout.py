@@ -0,0 +1,213 @@
+"""Force-directed layout of network datasets, computed on the server.
+
+The simulation mirrors the d3 forces the NetworkGraph component used to run
+in the browser (link distance 80, many-body strength -300, centering,
+velocity decay 0.4 and alpha cooling over a fixed number of ticks, plus a
+weak pull towards the centre for unlinked nodes), but
+every tick is a handful of vectorized NumPy operations over all nodes.
+Many-body repulsion is exact up to EXACT_MAX_NODES nodes; larger graphs use
+a particle-mesh approximation (node counts binned on a grid and convolved
+with the force kernel by FFT), which keeps a tick linear in the node count.
+
+Positions are returned in [-1, 1] so the client only has to scale them to
+its drawing size. They depend only on the node and link datasets, so the
+server caches them per pair of dataset versions. Graphs with more than
+NETWORK_MAX_NODES nodes can be aggregated after layout, by node group or by
+grid cell. Each aggregated node sits at the centroid of its members, and
+links between the same pair of aggregates are summed.
+"""
+import math
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+LAYOUT_ITERATIONS = int(os.environ.get("NETWORK_LAYOUT_ITERATIONS", "300"))
+NETWORK_MAX_NODES = int(os.environ.get("NETWORK_MAX_NODES", "500"))
+EXACT_MAX_NODES = 400
+MESH_CELLS = 128
+LINK_DISTANCE = 80.0
+CHARGE_STRENGTH = -300.0
+VELOCITY_DECAY = 0.4
+# Weak pull towards the centre (d3.forceX/forceY) so unlinked nodes do not drift off
+GRAVITY = 0.02
+ALPHA_MIN = 0.001
+AGGREGATIONS = ("auto", "none", "group", "grid")
+DEFAULT_SIZE = 8
+MAX_AGGREGATE_SIZE = 40
+
+
+def graph_frames(nodes: Optional[pd.DataFrame], links: Optional[pd.DataFrame]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Normalize node and link tables to (id, group, size) and (source, target, value).
+
+    Either table may be missing: nodes are then taken from the link
+    endpoints, and a node table alone gives a graph without links. Links
+    to unknown nodes are dropped.
+    """
+    if links is not None:
+        missing = {"source", "target"} - set(links.columns)
+        if missing:
+            raise ValueError(f"Links dataset needs source and target columns, missing {', '.join(sorted(missing))}")
+        links = pd.DataFrame({
+            "source": links["source"].astype(str),
+            "target": links["target"].astype(str),
+            "value": pd.to_numeric(links["value"], errors="coerce").fillna(1.0) if "value" in links.columns else 1.0,
+        })
+    else:
+        links = pd.DataFrame({"source": pd.Series(dtype=str), "target": pd.Series(dtype=str), "value": pd.Series(dtype=float)})
+
+    if nodes is not None:
+        id_field = "id" if "id" in nodes.columns else nodes.columns[0]
+        nodes = pd.DataFrame({
+            "id": nodes[id_field].astype(str),
+            "group": nodes["group"] if "group" in nodes.columns else 0,
+            "size": pd.to_numeric(nodes["size"], errors="coerce").fillna(DEFAULT_SIZE) if "size" in nodes.columns else DEFAULT_SIZE,
+        }).drop_duplicates("id")
+        known = set(nodes["id"])
+        links = links[links["source"].isin(known) & links["target"].isin(known)]
+    else:
+        ids = pd.unique(pd.concat([links["source"], links["target"]]))
+        nodes = pd.DataFrame({"id": ids, "group": 0, "size": DEFAULT_SIZE})
+    return nodes.reset_index(drop=True), links.reset_index(drop=True)
+
+
+def _initial_positions(n: int) -> np.ndarray:
+    # d3's phyllotaxis arrangement, so layouts start from the same place the browser did
+    index = np.arange(n, dtype=np.float64)
+    radius = 10.0 * np.sqrt(0.5 + index)
+    angle = index * math.pi * (3 - math.sqrt(5))
+    return np.stack([radius * np.cos(angle), radius * np.sin(angle)], axis=1)
+
+
+def _repulsion_exact(positions: np.ndarray, strength: float) -> np.ndarray:
+    """Pairwise many-body force, in row blocks to bound memory"""
+    n = len(positions)
+    force = np.empty_like(positions)
+    x, y = positions[:, 0], positions[:, 1]
+    block = max(1, 4_000_000 // n)
+    for start in range(0, n, block):
+        dx = x[None, :] - x[start:start + block, None]
+        dy = y[None, :] - y[start:start + block, None]
+        weight = strength / np.maximum(dx * dx + dy * dy, 1.0)
+        force[start:start + block, 0] = (dx * weight).sum(axis=1)
+        force[start:start + block, 1] = (dy * weight).sum(axis=1)
+    return force
+
+
+def _repulsion_mesh(positions: np.ndarray, strength: float, cells: int = MESH_CELLS) -> np.ndarray:
+    """Many-body force by particle-mesh: node counts on a cells x cells grid,
+    convolved with the pairwise force kernel through an FFT.
+
+    Each tick costs O(n + cells^2 log cells) instead of O(n^2). Nodes
+    sharing a grid cell do not repel each other, and link forces keep them
+    apart at LINK_DISTANCE anyway.
+    """
+    low = positions.min(axis=0)
+    step = max(float((positions.max(axis=0) - low).max()) / (cells - 1), 1e-9)
+    index = np.rint((positions - low) / step).astype(np.int64)
+    flat = index[:, 0] * cells + index[:, 1]
+    density = np.bincount(flat, minlength=cells * cells).reshape(cells, cells).astype(np.float64)
+
+    # Kernel over every offset between two cells, laid out for a linear (not circular) convolution
+    offsets = np.fft.ifftshift(np.arange(-cells, cells)) * step
+    dx, dy = np.meshgrid(offsets, offsets, indexing="ij")
+    dist2 = dx * dx + dy * dy
+    dist2[0, 0] = np.inf
+    scale = -strength / np.maximum(dist2, 1.0)
+    size = (2 * cells, 2 * cells)
+    spectrum = np.fft.rfft2(density, size)
+    fx = np.fft.irfft2(spectrum * np.fft.rfft2(dx * scale), size)[:cells, :cells]
+    fy = np.fft.irfft2(spectrum * np.fft.rfft2(dy * scale), size)[:cells, :cells]
+    return np.stack([fx.ravel()[flat], fy.ravel()[flat]], axis=1)
+
+
+def force_layout(n: int, sources: np.ndarray, targets: np.ndarray, iterations: int = LAYOUT_ITERATIONS) -> np.ndarray:
+    """Positions of n nodes linked by sources[i] -> targets[i], scaled into [-1, 1]"""
+    if n == 0:
+        return np.zeros((0, 2))
+    positions = _initial_positions(n)
+    velocities = np.zeros_like(positions)
+    degree = np.bincount(sources, minlength=n) + np.bincount(targets, minlength=n)
+    if len(sources):
+        link_strength = 1.0 / np.maximum(np.minimum(degree[sources], degree[targets]), 1)
+        bias = degree[sources] / np.maximum(degree[sources] + degree[targets], 1)
+    repulsion = _repulsion_exact if n <= EXACT_MAX_NODES else _repulsion_mesh
+    alpha = 1.0
+    alpha_decay = 1 - ALPHA_MIN ** (1 / max(iterations, 1))
+
+    for _ in range(iterations):
+        alpha += (0.0 - alpha) * alpha_decay
+        if len(sources):
+            delta = (positions[targets] + velocities[targets]) - (positions[sources] + velocities[sources])
+            length = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-6)
+            pull = delta * ((length - LINK_DISTANCE) / length * alpha * link_strength)[:, None]
+            for k in (0, 1):
+                velocities[:, k] -= np.bincount(targets, pull[:, k] * bias, minlength=n)
+                velocities[:, k] += np.bincount(sources, pull[:, k] * (1 - bias), minlength=n)
+        if n > 1:
+            velocities += repulsion(positions, CHARGE_STRENGTH) * alpha
+        velocities -= positions * (GRAVITY * alpha)
+        velocities *= 1 - VELOCITY_DECAY
+        positions += velocities
+        positions -= positions.mean(axis=0)
+
+    extent = np.abs(positions).max()
+    return positions / extent if extent > 0 else positions
+
+
+def layout_network(nodes: pd.DataFrame, links: pd.DataFrame, iterations: int = LAYOUT_ITERATIONS) -> pd.DataFrame:
+    """Node table of graph_frames() with x and y columns added"""
+    index = pd.Series(np.arange(len(nodes)), index=nodes["id"])
+    sources = index.reindex(links["source"]).to_numpy(dtype=np.int64)
+    targets = index.reindex(links["target"]).to_numpy(dtype=np.int64)
+    positions = force_layout(len(nodes), sources, targets, iterations)
+    laid_out = nodes.copy()
+    laid_out["x"] = positions[:, 0].round(5)
+    laid_out["y"] = positions[:, 1].round(5)
+    return laid_out
+
+
+def aggregate_network(
+    nodes: pd.DataFrame, links: pd.DataFrame, by: str = "auto", max_nodes: int = NETWORK_MAX_NODES
+) -> Tuple[pd.DataFrame, pd.DataFrame, Optional[str]]:
+    """Collapse a laid out graph into at most about max_nodes nodes.
+
+    by is "group" (one node per node group), "grid" (one node per occupied
+    grid cell), "none", or "auto", which aggregates only graphs larger than
+    max_nodes and prefers groups when there are few enough of them.
+    Aggregated nodes get a count of their members. Returns the nodes, the
+    links and the aggregation used (None when unchanged).
+    """
+    if by not in AGGREGATIONS:
+        raise ValueError(f"Invalid aggregate '{by}', expected one of {', '.join(AGGREGATIONS)}")
+    if by == "auto":
+        if len(nodes) <= max_nodes:
+            return nodes, links, None
+        by = "group" if 1 < nodes["group"].nunique() <= max_nodes else "grid"
+    if by == "none":
+        return nodes, links, None
+
+    if by == "group":
+        key = nodes["group"].astype(str).radd("group ")
+    else:
+        cells = max(1, int(math.sqrt(max_nodes)))
+        col = np.minimum(((nodes["x"].to_numpy() + 1) / 2 * cells).astype(np.int64), cells - 1)
+        row = np.minimum(((nodes["y"].to_numpy() + 1) / 2 * cells).astype(np.int64), cells - 1)
+        key = pd.Series([f"cell {r},{c}" for r, c in zip(row, col)], index=nodes.index)
+    grouped = nodes.assign(key=key.to_numpy()).groupby("key", sort=False)
+    aggregated = grouped.agg(
+        group=("group", lambda g: g.mode().iloc[0]), count=("id", "size"), x=("x", "mean"), y=("y", "mean")
+    ).rename_axis("id").reset_index()
+    aggregated[["x", "y"]] = aggregated[["x", "y"]].round(5)
+    # size stays a radius, growing with the area an aggregate stands for
+    aggregated.insert(2, "size", np.minimum(DEFAULT_SIZE * np.sqrt(aggregated["count"]), MAX_AGGREGATE_SIZE).round(1))
+    mapping = pd.Series(key.to_numpy(), index=nodes["id"])
+    merged = pd.DataFrame({
+        "source": mapping.reindex(links["source"]).to_numpy(),
+        "target": mapping.reindex(links["target"]).to_numpy(),
+        "value": links["value"].to_numpy(),
+    })
+    merged = merged[merged["source"] != merged["target"]]
+    merged = merged.groupby(["source", "target"], as_index=False, sort=False)["value"].sum()
+    return aggregated, merged, by
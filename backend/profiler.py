@@ -0,0 +1,134 @@
+"""Sampling profiler that can be switched on for a single request.
+
+While a profiled request runs, a background thread samples the Python
+stacks of the threads working on it: the event loop thread and any pool
+thread running one of its blocking jobs. Samples are aggregated into
+collapsed stacks ("outer;inner;leaf count", the input format of
+flamegraph.pl and speedscope) and per-function self/total counts.
+
+The event loop thread also runs other requests' coroutines, so under
+concurrent load its samples are only indicative; pool thread samples
+belong to the profiled request alone.
+"""
+import contextvars
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+INTERVAL_SECONDS = float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000
+MAX_PROFILES = 32
+TOP_STACKS = 200
+TOP_FUNCTIONS = 30
+
+# Profiler of the request running in the current context, if it is being profiled
+ACTIVE: contextvars.ContextVar[Optional["SamplingProfiler"]] = contextvars.ContextVar("active_profiler", default=None)
+# Finished reports by id, oldest first
+PROFILES: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, path: str = "", interval: float = INTERVAL_SECONDS):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.interval = interval
+        self.token = None
+        self._threads: Set[int] = set()
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+        self._lock = threading.Lock()
+
+    def add_thread(self, ident: int) -> None:
+        with self._lock:
+            self._threads.add(ident)
+
+    def remove_thread(self, ident: int) -> None:
+        with self._lock:
+            self._threads.discard(ident)
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id[:8]}", daemon=True)
+        self._thread.start()
+
+    def stop(self, **details: Any) -> Dict[str, Any]:
+        """Stop sampling and publish the report under self.id"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        report = self.report(**details)
+        with _profiles_lock:
+            PROFILES[self.id] = report
+            while len(PROFILES) > MAX_PROFILES:
+                PROFILES.popitem(last=False)
+        return report
+
+    def report(self, **details: Any) -> Dict[str, Any]:
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self._stacks.items():
+            self_counts[stack[-1]] += count
+            for name in set(stack):
+                total_counts[name] += count
+        return {
+            "id": self.id,
+            "path": self.path,
+            **details,
+            "interval_ms": self.interval * 1000,
+            "duration_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "samples": self._samples,
+            "functions": [
+                {"function": name, "self": count, "total": total_counts[name]}
+                for name, count in self_counts.most_common(TOP_FUNCTIONS)
+            ],
+            "stacks": [{"stack": ";".join(stack), "samples": count} for stack, count in self._stacks.most_common(TOP_STACKS)],
+        }
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                threads = [ident for ident in self._threads if ident != own]
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                # An event loop waiting in select() is idle, not working on the request
+                if frame is None or frame.f_code.co_filename.endswith("selectors.py"):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                self._stacks[tuple(reversed(stack))] += 1
+                self._samples += 1
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    with _profiles_lock:
+        return PROFILES.get(profile_id)
+
+
+def collapsed(report: Dict[str, Any]) -> str:
+    """The report's stacks in collapsed format, one "stack count" line each"""
+    return "".join(f"{entry['stack']} {entry['samples']}\n" for entry in report["stacks"])
+
+
+def list_profiles() -> Tuple[Dict[str, Any], ...]:
+    with _profiles_lock:
+        return tuple(
+            {key: report[key] for key in ("id", "path", "route", "status", "duration_ms", "samples") if key in report}
+            for report in reversed(PROFILES.values())
+        )
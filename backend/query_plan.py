@@ -0,0 +1,234 @@
+"""Declarative query plans over stored datasets.
+
+A plan names a dataset and a list of steps that run in order:
+
+    {"dataset": "time_series_data", "steps": [
+        {"op": "filter", "where": ["visitors:gt:150"]},
+        {"op": "resample", "on": "date", "freq": "W", "agg": {"visitors": "sum"}},
+        {"op": "rolling", "columns": ["visitors"], "window": 4, "agg": "mean"},
+        {"op": "sort", "by": ["visitors"], "descending": true},
+        {"op": "limit", "n": 10}
+    ]}
+
+Steps:
+
+- filter:   {"where": ["column:op:value", ...]} with the /api/data filter syntax
+- project:  {"columns": [...]}
+- groupby:  {"by": [...], "agg": {...}}
+- resample: {"on": date column, "freq": "D" | "W" | "MS" | ..., "agg": {...}, "by": [...]}
+- rolling:  {"columns": [...], "window": rows or "7D", "agg": "mean", "on": date column,
+             "by": [...], "min_periods": 1}, adding <column>_<agg>_<window> columns
+- join:     {"dataset": other, "on": [...] | "left_on"/"right_on", "how": "inner"}
+- sort:     {"by": [...], "descending": false}
+- limit:    {"n": rows}
+
+An agg maps output columns to a function ("sales": "sum") or to a
+[column, function] pair ("orders": ["id", "count"]). Every step is a single
+vectorized pandas operation. A plan's result depends only on the plan and
+the versions of the datasets it reads, so results are cached under
+result_key().
+"""
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+
+import pandas as pd
+
+from dataset_query import QueryError, apply_window, parse_predicates
+
+STEPS = ("filter", "project", "groupby", "resample", "rolling", "join", "sort", "limit")
+AGGREGATIONS = ("sum", "mean", "median", "min", "max", "count", "size", "nunique", "std", "var", "first", "last")
+ROLLING_AGGREGATIONS = ("sum", "mean", "median", "min", "max", "count", "std", "var")
+ROLLING_TIME = "__rolling_time__"
+JOIN_TYPES = ("inner", "left", "right", "outer")
+MAX_STEPS = 32
+QUERY_MAX_ROWS = int(os.environ.get("QUERY_MAX_ROWS", "1000000"))
+
+
+def _list(step: Mapping[str, Any], field: str, required: bool = True) -> List[str]:
+    value = step.get(field)
+    if value is None and not required:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not value or not all(isinstance(v, str) for v in value):
+        raise QueryError(f"'{step['op']}' step needs '{field}' as a column name or a list of them")
+    return value
+
+
+def _columns(df: pd.DataFrame, columns: List[str]) -> List[str]:
+    unknown = [col for col in columns if col not in df.columns]
+    if unknown:
+        raise QueryError(f"Unknown columns: {', '.join(dict.fromkeys(unknown))}")
+    return columns
+
+
+def _aggregations(df: pd.DataFrame, step: Mapping[str, Any]) -> Dict[str, Tuple[str, str]]:
+    spec = step.get("agg")
+    if not isinstance(spec, dict) or not spec:
+        raise QueryError(f"'{step['op']}' step needs 'agg' as {{output: function or [column, function]}}")
+    named = {}
+    for output, value in spec.items():
+        column, func = (output, value) if isinstance(value, str) else (tuple(value) + (None,))[:2]
+        if func not in AGGREGATIONS:
+            raise QueryError(f"Invalid aggregation '{func}', expected one of {', '.join(AGGREGATIONS)}")
+        named[output] = (_columns(df, [column])[0], func)
+    return named
+
+
+def _datetimes(df: pd.DataFrame, column: str) -> pd.Series:
+    _columns(df, [column])
+    try:
+        return pd.to_datetime(df[column], format="ISO8601")
+    except (TypeError, ValueError):
+        raise QueryError(f"Column '{column}' does not hold ISO 8601 dates")
+
+
+def _format_dates(values: pd.Series) -> pd.Series:
+    """Render datetimes the way dates are stored in the CSV files"""
+    date_only = (values.dropna() == values.dropna().dt.normalize()).all()
+    return values.dt.strftime("%Y-%m-%d" if date_only else "%Y-%m-%dT%H:%M:%S")
+
+
+def _frequency(freq: Any) -> str:
+    try:
+        pd.tseries.frequencies.to_offset(freq)
+    except (TypeError, ValueError):
+        raise QueryError(f"Invalid frequency '{freq}', expected a pandas offset such as D, W, MS or 15min")
+    return freq
+
+
+def _groupby(df: pd.DataFrame, step: Mapping[str, Any], load) -> pd.DataFrame:
+    by = _columns(df, _list(step, "by"))
+    named = _aggregations(df, step)
+    return df.groupby(by, sort=True, dropna=False).agg(**named).reset_index()
+
+
+def _resample(df: pd.DataFrame, step: Mapping[str, Any], load) -> pd.DataFrame:
+    on = step.get("on")
+    if not isinstance(on, str):
+        raise QueryError("'resample' step needs 'on' as the date column")
+    by = _columns(df, _list(step, "by", required=False))
+    named = _aggregations(df, step)
+    df = df.assign(**{on: _datetimes(df, on)})
+    grouper = pd.Grouper(key=on, freq=_frequency(step.get("freq")))
+    result = df.groupby([*by, grouper], sort=True).agg(**named).reset_index()
+    return result.assign(**{on: _format_dates(result[on])})
+
+
+def _rolling(df: pd.DataFrame, step: Mapping[str, Any], load) -> pd.DataFrame:
+    columns = _columns(df, _list(step, "columns"))
+    by = _columns(df, _list(step, "by", required=False))
+    func = step.get("agg", "mean")
+    if func not in ROLLING_AGGREGATIONS:
+        raise QueryError(f"Invalid rolling aggregation '{func}', expected one of {', '.join(ROLLING_AGGREGATIONS)}")
+    window = step.get("window")
+    on = step.get("on")
+    if isinstance(window, str):
+        if not isinstance(on, str):
+            raise QueryError("A time-based rolling window needs 'on' as the date column")
+        _frequency(window)
+    elif not isinstance(window, int) or isinstance(window, bool) or window < 1:
+        raise QueryError("'rolling' step needs 'window' as a positive row count or an offset such as 7D")
+
+    # Windows run over rows in their current order, or in date order when 'on' is given
+    source = df[by + columns]
+    options = {"min_periods": step.get("min_periods", 1)}
+    if isinstance(on, str):
+        dates = _datetimes(df, on)
+        order = dates.argsort(kind="stable").to_numpy()
+        df, source, dates = df.iloc[order], source.iloc[order], dates.iloc[order]
+        if isinstance(window, str):
+            source = source.assign(**{ROLLING_TIME: dates})
+            options["on"] = ROLLING_TIME
+    rolled = (source.groupby(by, sort=False) if by else source).rolling(window, **options).agg(func)[columns]
+    if by:
+        rolled = rolled.reset_index(level=list(range(len(by))), drop=True)
+    rolled = rolled.reindex(df.index)
+    return df.assign(**{f"{col}_{func}_{window}": rolled[col] for col in columns})
+
+
+def _join(df: pd.DataFrame, step: Mapping[str, Any], load) -> pd.DataFrame:
+    other = load(step.get("dataset"))
+    how = step.get("how", "inner")
+    if how not in JOIN_TYPES:
+        raise QueryError(f"Invalid join type '{how}', expected one of {', '.join(JOIN_TYPES)}")
+    if "on" in step:
+        left_on = right_on = _list(step, "on")
+    else:
+        left_on, right_on = _list(step, "left_on"), _list(step, "right_on")
+    if len(left_on) != len(right_on):
+        raise QueryError("'left_on' and 'right_on' must name the same number of columns")
+    _columns(df, left_on)
+    _columns(other, right_on)
+    # Multiplying rows is the one way a plan can blow up memory, so bound it up front
+    left_counts = df.groupby(left_on, sort=False).size()
+    right_counts = other.groupby(right_on, sort=False).size()
+    right_counts.index.names = left_counts.index.names
+    matched = int(left_counts.mul(right_counts, fill_value=0 if how == "outer" else None).fillna(0).sum())
+    if matched > QUERY_MAX_ROWS:
+        raise QueryError(f"Join would produce {matched} rows, more than the limit of {QUERY_MAX_ROWS}")
+    return df.merge(
+        other, how=how, left_on=left_on, right_on=right_on, suffixes=("", f"_{step['dataset']}")
+    )
+
+
+def _filter(df: pd.DataFrame, step: Mapping[str, Any], load) -> pd.DataFrame:
+    return apply_window(df, predicates=parse_predicates(_list(step, "where")))[0]
+
+
+def _project(df: pd.DataFrame, step: Mapping[str, Any], load) -> pd.DataFrame:
+    return df[_columns(df, _list(step, "columns"))]
+
+
+def _sort(df: pd.DataFrame, step: Mapping[str, Any], load) -> pd.DataFrame:
+    by = _columns(df, _list(step, "by"))
+    return df.sort_values(by, ascending=not step.get("descending", False), kind="stable")
+
+
+def _limit(df: pd.DataFrame, step: Mapping[str, Any], load) -> pd.DataFrame:
+    n = step.get("n")
+    if not isinstance(n, int) or isinstance(n, bool) or n < 0:
+        raise QueryError("'limit' step needs 'n' as a non-negative row count")
+    return df.iloc[:n]
+
+
+EXECUTORS: Dict[str, Callable[..., pd.DataFrame]] = {
+    "filter": _filter, "project": _project, "groupby": _groupby, "resample": _resample,
+    "rolling": _rolling, "join": _join, "sort": _sort, "limit": _limit,
+}
+
+
+def validate_plan(plan: Mapping[str, Any]) -> List[str]:
+    """Check the shape of a plan and return the datasets it reads, the source first"""
+    if not isinstance(plan.get("dataset"), str):
+        raise QueryError("Query plan needs 'dataset'")
+    steps = plan.get("steps", [])
+    if not isinstance(steps, list) or len(steps) > MAX_STEPS:
+        raise QueryError(f"Query plan 'steps' must be a list of at most {MAX_STEPS} steps")
+    datasets = [plan["dataset"]]
+    for step in steps:
+        if not isinstance(step, dict) or step.get("op") not in STEPS:
+            raise QueryError(f"Every step needs 'op', one of {', '.join(STEPS)}")
+        if step["op"] == "join":
+            if not isinstance(step.get("dataset"), str):
+                raise QueryError("'join' step needs 'dataset'")
+            datasets.append(step["dataset"])
+    return list(dict.fromkeys(datasets))
+
+
+def result_key(plan: Mapping[str, Any], versions: Mapping[str, str]) -> str:
+    """Cache key for the result of plan over the given dataset versions"""
+    key = json.dumps({"plan": plan, "versions": versions}, sort_keys=True, default=str)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def execute_plan(plan: Mapping[str, Any], load: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+    """Run a validated plan; load(name) returns a dataset's frame, which is never mutated"""
+    df = load(plan["dataset"])
+    for step in plan.get("steps", []):
+        df = EXECUTORS[step["op"]](df, step, load)
+        if len(df) > QUERY_MAX_ROWS:
+            raise QueryError(f"Step '{step['op']}' produced {len(df)} rows, more than the limit of {QUERY_MAX_ROWS}")
+    return df.reset_index(drop=True)
@@ -0,0 +1,101 @@
+"""Bulk sales data ingestion with column-at-a-time validation.
+
+Accepts the same fields as SalesDataPoint (month, sales, expenses, profit),
+either as columnar JSON
+
+    {"name": "q3", "data": {"month": [...], "sales": [...], "expenses": [...]}}
+
+or as NDJSON with one point per line. Each column is checked and converted
+with a single NumPy/pandas operation, and profit is derived as
+sales - expenses wherever it is missing, matching create-sales-data.
+"""
+import io
+from typing import Any, Dict, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from encoding import loads
+from ingest import IngestError
+
+SALES_COLUMNS = ("month", "sales", "expenses", "profit")
+MAX_REPORTED_ROWS = 5
+
+
+def _rows(mask: np.ndarray) -> str:
+    rows = np.flatnonzero(mask)
+    listed = ", ".join(str(row) for row in rows[:MAX_REPORTED_ROWS])
+    return listed + (f" and {len(rows) - MAX_REPORTED_ROWS} more" if len(rows) > MAX_REPORTED_ROWS else "")
+
+
+def _numeric(values: Any, name: str, required: bool) -> np.ndarray:
+    series = pd.Series(values)
+    missing = series.isna().to_numpy()
+    numbers = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+    invalid = np.isnan(numbers) & ~missing
+    if invalid.any():
+        raise IngestError(f"Column '{name}' has non-numeric values at rows {_rows(invalid)}")
+    if required and missing.any():
+        raise IngestError(f"Column '{name}' has missing values at rows {_rows(missing)}")
+    return numbers
+
+
+def sales_frame(columns: Mapping[str, Sequence[Any]]) -> pd.DataFrame:
+    """Validate columnar sales data and return it as a month/sales/expenses/profit frame"""
+    unknown = sorted(set(columns) - set(SALES_COLUMNS))
+    if unknown:
+        raise IngestError(f"Unknown columns: {', '.join(unknown)}")
+    for required in ("month", "sales"):
+        if required not in columns:
+            raise IngestError(f"Missing required column '{required}'")
+    lengths = {name: len(values) for name, values in columns.items()}
+    if len(set(lengths.values())) > 1:
+        raise IngestError(f"Columns have different lengths: {lengths}")
+
+    month = pd.Series(columns["month"], dtype=object)
+    missing = month.isna().to_numpy()
+    if missing.any():
+        raise IngestError(f"Column 'month' has missing values at rows {_rows(missing)}")
+    if len(month) and pd.api.types.infer_dtype(month, skipna=False) != "string":
+        raise IngestError("Column 'month' must contain only strings")
+
+    sales = _numeric(columns["sales"], "sales", required=True)
+    expenses = np.zeros(len(sales))
+    if "expenses" in columns:
+        expenses = np.nan_to_num(_numeric(columns["expenses"], "expenses", required=False), nan=0.0)
+    derived = sales - expenses
+    if "profit" in columns:
+        profit = _numeric(columns["profit"], "profit", required=False)
+        profit = np.where(np.isnan(profit), derived, profit)
+    else:
+        profit = derived
+    return pd.DataFrame({"month": month.to_numpy(), "sales": sales, "expenses": expenses, "profit": profit})
+
+
+def parse_columnar(body: bytes) -> Dict[str, Any]:
+    """Parse a columnar JSON payload into {"name", "description", "data": frame}"""
+    try:
+        payload = loads(body)
+    except ValueError as e:
+        raise IngestError(f"Invalid JSON: {e}")
+    if not isinstance(payload, dict) or not isinstance(payload.get("data"), dict):
+        raise IngestError('Expected {"name": ..., "data": {"month": [...], "sales": [...]}}')
+    for name, values in payload["data"].items():
+        if not isinstance(values, list):
+            raise IngestError(f"Column '{name}' must be an array")
+    return {
+        "name": payload.get("name"),
+        "description": payload.get("description", ""),
+        "data": sales_frame(payload["data"]),
+    }
+
+
+def parse_ndjson(body: bytes) -> pd.DataFrame:
+    """Parse one sales point per line into a validated frame"""
+    if not body.strip():
+        return sales_frame({"month": [], "sales": []})
+    try:
+        df = pd.read_json(io.BytesIO(body), lines=True, dtype=False)
+    except ValueError as e:
+        raise IngestError(f"Invalid NDJSON: {e}")
+    return sales_frame({col: df[col] for col in df.columns})
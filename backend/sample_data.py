@@ -0,0 +1,139 @@
+"""Sample datasets seeded into the data directory at startup.
+
+The seeds are precomputed CSVs under samples/, so starting a server only
+copies the ones missing from data/ and never rewrites a dataset that
+already exists (SEED_SAMPLE_DATA=overwrite restores them all, =off seeds
+nothing). A generated sample whose seed file is missing is built in memory
+instead. Regenerate the seed files with:
+
+    python sample_data.py [--out DIR]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+SAMPLE_DIR = Path(__file__).parent / "samples"
+SEED_MODES = ("missing", "overwrite", "off")
+GENERATED_SAMPLES = (
+    "sales_data", "quarterly_sales", "product_performance", "user_data", "category_data", "time_series_data",
+)
+
+
+def build_sample_frames() -> Dict[str, pd.DataFrame]:
+    """The generated sample datasets by name"""
+    frames = {}
+    # Enhanced sales data
+    frames["sales_data"] = pd.DataFrame({
+        'month': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
+        'sales': [12000, 19000, 13000, 25000, 22000, 30000, 28000, 32000, 27000, 35000, 40000, 38000],
+        'expenses': [8000, 12000, 9000, 15000, 14000, 18000, 16000, 19000, 15000, 20000, 24000, 22000],
+        'profit': [4000, 7000, 4000, 10000, 8000, 12000, 12000, 13000, 12000, 15000, 16000, 16000]
+    })
+
+    # Quarterly sales data
+    frames["quarterly_sales"] = pd.DataFrame({
+        'quarter': ['Q1 2024', 'Q2 2024', 'Q3 2024', 'Q4 2024'],
+        'sales': [44000, 77000, 87000, 113000],
+        'expenses': [29000, 47000, 50000, 66000],
+        'profit': [15000, 30000, 37000, 47000]
+    })
+
+    # Product performance data
+    frames["product_performance"] = pd.DataFrame({
+        'product': ['Product A', 'Product B', 'Product C', 'Product D', 'Product E'],
+        'sales': [85000, 65000, 45000, 35000, 25000],
+        'units_sold': [850, 1300, 750, 500, 400],
+        'profit_margin': [0.35, 0.28, 0.42, 0.31, 0.38]
+    })
+
+    frames["user_data"] = pd.DataFrame({
+        'age': [23, 45, 56, 78, 32, 24, 35, 67, 29, 45, 39, 52, 28, 33, 41, 59, 26, 37, 48, 55],
+        'income': [35000, 65000, 80000, 45000, 55000, 38000, 62000, 70000, 42000, 68000, 58000, 75000,
+                   40000, 51000, 64000, 82000, 36000, 59000, 71000, 77000],
+        'satisfaction': [7.2, 8.1, 6.8, 7.9, 8.4, 6.9, 7.6, 8.2, 7.1, 8.0, 7.8, 8.3, 6.7, 7.4, 8.1, 7.7, 7.0, 8.2, 7.9, 8.0]
+    })
+
+    frames["category_data"] = pd.DataFrame({
+        'category': ['Technology', 'Healthcare', 'Finance', 'Education', 'Entertainment', 'Retail'],
+        'value': [350, 280, 220, 180, 160, 140],
+        'color': ['#ff6b6b', '#4ecdc4', '#45b7d1', '#96ceb4', '#ffeaa7', '#dda0dd']
+    })
+
+    dates = pd.date_range('2024-01-01', periods=50, freq='D')
+    frames["time_series_data"] = pd.DataFrame({
+        'date': dates.strftime('%Y-%m-%d'),
+        'visitors': [100 + i*5 + (i%7)*20 for i in range(50)],
+        'page_views': [300 + i*15 + (i%5)*50 for i in range(50)],
+        'conversions': [10 + i*2 + (i%3)*8 for i in range(50)]
+    })
+    return frames
+
+
+def _replace_atomically(target: Path, write, install=None) -> None:
+    # The temporary name does not end in .csv, so listings never see a partial file
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.stem}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(Path(tmp_name))
+        # mkstemp creates owner-only files; match every other dataset writer
+        os.chmod(tmp_name, 0o644)
+        if install is None:
+            os.replace(tmp_name, target)
+        else:
+            install(target, Path(tmp_name))
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def seed_datasets(
+    data_dir: Path,
+    mode: str = "missing",
+    sample_dir: Path = SAMPLE_DIR,
+    install: Optional[Callable[[Path, Path], None]] = None,
+) -> List[Path]:
+    """Copy sample datasets into data_dir, returning the files written.
+
+    mode "missing" only writes samples that have no file in data_dir yet,
+    "overwrite" replaces every sample and "off" writes nothing. Each file
+    is renamed into place, or handed to install(target, tmp) when given.
+    """
+    if mode not in SEED_MODES:
+        raise ValueError(f"Unknown SEED_SAMPLE_DATA mode '{mode}', expected one of {', '.join(SEED_MODES)}")
+    if mode == "off":
+        return []
+
+    seeds = {path.stem: path for path in sample_dir.glob("*.csv")}
+    generated = None
+    written = []
+    for name in sorted(set(seeds) | set(GENERATED_SAMPLES)):
+        target = data_dir / f"{name}.csv"
+        if mode == "missing" and target.exists():
+            continue
+        if name in seeds:
+            _replace_atomically(target, lambda tmp: shutil.copyfile(seeds[name], tmp), install)
+        else:
+            if generated is None:
+                generated = build_sample_frames()
+            _replace_atomically(target, lambda tmp: generated[name].to_csv(tmp, index=False), install)
+        written.append(target)
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Regenerate the sample dataset seed files")
+    parser.add_argument("--out", type=Path, default=SAMPLE_DIR)
+    args = parser.parse_args()
+    args.out.mkdir(parents=True, exist_ok=True)
+    for name, df in build_sample_frames().items():
+        df.to_csv(args.out / f"{name}.csv", index=False)
+        print(f"wrote {args.out / name}.csv ({len(df)} rows)")
+
+
+if __name__ == "__main__":
+    main()
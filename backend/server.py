@@ -1,19 +1,53 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
+import time
+
+# Taken before anything else is imported, so startup timings include the imports.
+# Of the roughly 1 s import, fastapi takes about 0.4 s and pandas (which loads
+# pyarrow) about 0.45 s; the background warmup needs pandas straight away, so
+# neither is deferred.
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.cors import CORSMiddleware
 import os
+import asyncio
 import logging
 import pandas as pd
 import json
-import io
 import base64
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-import uuid
 from datetime import datetime
 from pydantic import BaseModel, Field
 
+from batch import OPERATIONS, READ_OPS, dataset_key, plan_stages
+from catalog import DatasetCatalog
+from chart_render import FORMATS as RENDER_FORMATS, MEDIA_TYPES as RENDER_MEDIA_TYPES, ChartRenderer
+from chart_store import ChartStore
+from dataset_cache import DatasetCache
+from dataset_profile import profile_frame, recommend_charts
+from dataset_query import (
+    QueryError, apply_window, check_columns, decode_cursor, encode_cursor, parse_columns, parse_predicates
+)
+from downsample import reduce_for_chart
+from encoding import MEDIA_TYPES, dumps, frame_response, frame_to_records, loads, negotiate_format
+from executor import executor_from_env
+from http_cache import IMMUTABLE, cache_headers, is_not_modified, make_etag, not_modified, with_headers
+from ingest import IngestError, ingest_csv, parse_rows, spool_text, spool_upload
+from invalidation import ALL, InvalidationLog
+from live_updates import LiveUpdates, SubscriberLimitError, fold_appends, summarize
+from metrics import CONTENT_TYPE, REGISTRY, Counter, Gauge, MetricsMiddleware
+from network_layout import NETWORK_MAX_NODES, aggregate_network, graph_frames, layout_network
+from precompress import (
+    compress_response, compressible_response, find_variant, negotiate_encoding, precompressed_response
+)
+import profiler
+from query_plan import execute_plan, result_key, validate_plan
+from sales_ingest import parse_columnar, parse_ndjson
+from sample_data import SEED_MODES, seed_datasets
+from storage import StorageError, get_storage
+
 ROOT_DIR = Path(__file__).parent
 
 # Create the main app
@@ -27,15 +61,152 @@ app = FastAPI(
 api_router = APIRouter(prefix="/api")
 
 # Create directories
-csv_dir = ROOT_DIR / "data"
+csv_dir = Path(os.environ.get("DATA_DIR", ROOT_DIR / "data"))
 csv_dir.mkdir(exist_ok=True)
 
-uploads_dir = ROOT_DIR / "uploads"
+uploads_dir = Path(os.environ.get("UPLOADS_DIR", ROOT_DIR / "uploads"))
 uploads_dir.mkdir(exist_ok=True)
 
-exports_dir = ROOT_DIR / "exports"
+exports_dir = Path(os.environ.get("EXPORTS_DIR", ROOT_DIR / "exports"))
 exports_dir.mkdir(exist_ok=True)
 
+# Blocking pandas and file work runs on a bounded pool, never on the event loop
+blocking = executor_from_env()
+
+# CSV is the ingest format; reads go through the configured storage backend
+dataset_storage = get_storage()
+
+# Parsed datasets are cached in-process and re-read only when their version changes
+dataset_cache = DatasetCache(
+    max_bytes=int(os.environ.get("DATASET_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    signature=dataset_storage.version,
+)
+
+# Query results depend only on the plan and the versions of the datasets it reads
+query_cache = DatasetCache(max_bytes=int(os.environ.get("QUERY_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+# Network layouts are computed once per version of their node and link datasets
+layout_cache = DatasetCache(max_bytes=int(os.environ.get("NETWORK_LAYOUT_CACHE_MAX_MB", "32")) * 1024 * 1024)
+
+# A chart id fixes its rows, so stored charts are resolved and reduced at most once per process
+chart_data_cache = DatasetCache(max_bytes=int(os.environ.get("CHART_DATA_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+# Generated charts are content-addressed and evicted by age and total size.
+# In reference mode a chart stores a dataset version instead of its rows, and
+# snapshots no chart references any more are pruned after each sweep.
+CHART_DATA_MODE = os.environ.get("CHART_DATA_MODE", "reference")
+if CHART_DATA_MODE not in ("reference", "inline"):
+    raise ValueError(f"Unknown CHART_DATA_MODE: {CHART_DATA_MODE}")
+
+chart_store = ChartStore(
+    exports_dir,
+    max_bytes=int(os.environ.get("EXPORTS_MAX_MB", "1024")) * 1024 * 1024,
+    ttl_seconds=float(os.environ.get("EXPORTS_TTL_HOURS", "168")) * 3600,
+    on_sweep=lambda referenced: dataset_storage.prune_snapshots(csv_dir, referenced),
+)
+
+# SVG and PNG exports are rendered on a process pool and stored beside their chart
+EXPORT_FORMATS = ("json",) + RENDER_FORMATS
+chart_renderer = ChartRenderer(exports_dir, max_workers=int(os.environ.get("RENDER_POOL_SIZE", "2")))
+
+def load_dataset(csv_file: Path) -> pd.DataFrame:
+    """Read a dataset through the cache; the returned frame must not be mutated"""
+    return dataset_cache.get(csv_file, loader=dataset_storage.read)
+
+def save_dataset(csv_file: Path, df: pd.DataFrame) -> None:
+    """Write a dataset to disk, seed the cache, update the catalog entry and announce the write"""
+    dataset_storage.write(csv_file, df)
+    dataset_cache.put(csv_file, df)
+    dataset_catalog.update(csv_file, df)
+    announce_write(csv_file.stem)
+
+def get_recommended_charts(df):
+    """Recommend chart types based on data structure; datasets in the catalog use their stored profile"""
+    return recommend_charts(profile_frame(df))
+
+# Row counts, schema, column profiles and samples for listings are served from an on-disk index
+dataset_catalog = DatasetCatalog(csv_dir, loader=load_dataset, signature=dataset_storage.version)
+
+# Worker processes share dataset memory through the mapped Arrow store, but each
+# has its own cache and catalog; writes are announced to the others through a log
+invalidations = InvalidationLog(csv_dir / ".store" / "invalidations.log")
+
+# Clients following a dataset get its new rows pushed instead of re-downloading it
+live_updates = LiveUpdates()
+LIVE_MAX_DELTA_ROWS = int(os.environ.get("LIVE_MAX_DELTA_ROWS", "10000"))
+
+def announce_write(name: str) -> None:
+    """Tell the other workers and this worker's live subscribers that a dataset was written"""
+    invalidations.publish(name)
+    live_updates.notify([name])
+
+def apply_invalidations(names):
+    """Drop what this worker holds for datasets another worker wrote"""
+    live_updates.notify(names)
+    if ALL in names:
+        dataset_cache.clear()
+        dataset_catalog.reload()
+        return
+    for name in names:
+        dataset_cache.invalidate(csv_dir / f"{name}.csv")
+    dataset_catalog.reload(names)
+
+# Sample datasets are seeded when the server starts, not on import, and by
+# default only where no dataset of that name exists yet
+SEED_SAMPLE_DATA = os.environ.get("SEED_SAMPLE_DATA", "missing")
+if SEED_SAMPLE_DATA not in SEED_MODES:
+    raise ValueError(f"Unknown SEED_SAMPLE_DATA: {SEED_SAMPLE_DATA}")
+
+# Catalog refresh, chart sweep and dataset preloading run after startup, while requests are served
+STARTUP_WARMUP = os.environ.get("STARTUP_WARMUP", "1") != "0"
+startup_stats: Dict[str, Any] = {
+    "import_seconds": None,
+    "startup_seconds": None,
+    "warmup_seconds": None,
+    "seeded": [],
+    "warmed": 0,
+}
+
+def seed_sample_data() -> List[str]:
+    # A reseeded file replaces the whole dataset, so install() drops the appends logged against the old one
+    written = seed_datasets(csv_dir, SEED_SAMPLE_DATA, install=dataset_storage.install)
+    for csv_file in written:
+        announce_write(csv_file.stem)
+    return [csv_file.stem for csv_file in written]
+
+def warmup_files() -> List[Path]:
+    """Datasets to preload, smallest first, filling at most half the dataset cache"""
+    sized = []
+    for csv_file in csv_dir.glob("*.csv"):
+        try:
+            sized.append((csv_file.stat().st_size, csv_file))
+        except FileNotFoundError:
+            continue
+    files, total = [], 0
+    for size, csv_file in sorted(sized):
+        total += size
+        if total > dataset_cache.max_bytes // 2:
+            break
+        files.append(csv_file)
+    return files
+
+async def warm_caches():
+    started = time.perf_counter()
+    try:
+        await blocking.run("warmup", dataset_catalog.refresh)
+        await blocking.run("warmup", chart_store.sweep)
+        for csv_file in await blocking.run("warmup", warmup_files):
+            try:
+                await blocking.run("warmup", load_dataset, csv_file)
+                startup_stats["warmed"] += 1
+            except Exception as e:
+                logger.warning("Skipped warming %s: %s", csv_file.name, e)
+    except Exception:
+        logger.exception("Cache warmup failed")
+    finally:
+        startup_stats["warmup_seconds"] = round(time.perf_counter() - started, 4)
+        logger.info("Caches warmed in %.3fs (%d datasets preloaded)", startup_stats["warmup_seconds"], startup_stats["warmed"])
+
 # Pydantic models for AI integration
 class SalesDataPoint(BaseModel):
     month: str
@@ -72,6 +243,33 @@ class ChartConfig(BaseModel):
     width: Optional[int] = 500
     height: Optional[int] = 300
     export_format: Optional[str] = "json"  # "json", "png", "svg"
+    # Server-side reduction so payloads are bounded by width/height rather than rows
+    downsample: Optional[str] = "auto"  # "auto", "none", "lttb", "minmax", "sum", "sample", "bin"
+    x_field: Optional[str] = None
+    y_fields: Optional[List[str]] = None
+
+class BatchOperation(BaseModel):
+    op: str  # "create-sales-data", "upload-csv", "generate-chart" or "query"
+    id: Optional[str] = None
+    params: Dict[str, Any] = {}
+
+class BatchUploadParams(BaseModel):
+    dataset_name: str
+    content: str  # CSV text, header row first
+
+class BatchQueryParams(BaseModel):
+    dataset_name: str
+    offset: int = 0
+    limit: Optional[int] = None
+    columns: Optional[str] = None
+    where: Optional[List[str]] = None
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+class QueryPlan(BaseModel):
+    dataset: str
+    steps: List[Dict[str, Any]] = []  # see query_plan.py for the step types
 
 class AIToolResponse(BaseModel):
     success: bool
@@ -80,99 +278,82 @@ class AIToolResponse(BaseModel):
     chart_url: Optional[str] = None
     export_url: Optional[str] = None
 
-# Create comprehensive sample data
-def create_sample_data():
-    # Enhanced sales data
-    sales_data = {
-        'month': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
-        'sales': [12000, 19000, 13000, 25000, 22000, 30000, 28000, 32000, 27000, 35000, 40000, 38000],
-        'expenses': [8000, 12000, 9000, 15000, 14000, 18000, 16000, 19000, 15000, 20000, 24000, 22000],
-        'profit': [4000, 7000, 4000, 10000, 8000, 12000, 12000, 13000, 12000, 15000, 16000, 16000]
-    }
-    pd.DataFrame(sales_data).to_csv(csv_dir / "sales_data.csv", index=False)
-    
-    # Quarterly sales data
-    quarterly_data = {
-        'quarter': ['Q1 2024', 'Q2 2024', 'Q3 2024', 'Q4 2024'],
-        'sales': [44000, 77000, 87000, 113000],
-        'expenses': [29000, 47000, 50000, 66000],
-        'profit': [15000, 30000, 37000, 47000]
-    }
-    pd.DataFrame(quarterly_data).to_csv(csv_dir / "quarterly_sales.csv", index=False)
-    
-    # Product performance data
-    product_data = {
-        'product': ['Product A', 'Product B', 'Product C', 'Product D', 'Product E'],
-        'sales': [85000, 65000, 45000, 35000, 25000],
-        'units_sold': [850, 1300, 750, 500, 400],
-        'profit_margin': [0.35, 0.28, 0.42, 0.31, 0.38]
-    }
-    pd.DataFrame(product_data).to_csv(csv_dir / "product_performance.csv", index=False)
-    
-    # Keep existing datasets
-    user_data = {
-        'age': [23, 45, 56, 78, 32, 24, 35, 67, 29, 45, 39, 52, 28, 33, 41, 59, 26, 37, 48, 55],
-        'income': [35000, 65000, 80000, 45000, 55000, 38000, 62000, 70000, 42000, 68000, 58000, 75000, 
-                  40000, 51000, 64000, 82000, 36000, 59000, 71000, 77000],
-        'satisfaction': [7.2, 8.1, 6.8, 7.9, 8.4, 6.9, 7.6, 8.2, 7.1, 8.0, 7.8, 8.3, 6.7, 7.4, 8.1, 7.7, 7.0, 8.2, 7.9, 8.0]
-    }
-    pd.DataFrame(user_data).to_csv(csv_dir / "user_data.csv", index=False)
-    
-    category_data = {
-        'category': ['Technology', 'Healthcare', 'Finance', 'Education', 'Entertainment', 'Retail'],
-        'value': [350, 280, 220, 180, 160, 140],
-        'color': ['#ff6b6b', '#4ecdc4', '#45b7d1', '#96ceb4', '#ffeaa7', '#dda0dd']
-    }
-    pd.DataFrame(category_data).to_csv(csv_dir / "category_data.csv", index=False)
-    
-    dates = pd.date_range('2024-01-01', periods=50, freq='D')
-    time_data = {
-        'date': dates.strftime('%Y-%m-%d'),
-        'visitors': [100 + i*5 + (i%7)*20 for i in range(50)],
-        'page_views': [300 + i*15 + (i%5)*50 for i in range(50)],
-        'conversions': [10 + i*2 + (i%3)*8 for i in range(50)]
-    }
-    pd.DataFrame(time_data).to_csv(csv_dir / "time_series_data.csv", index=False)
-
-# Initialize sample data
-create_sample_data()
-
 # AI Tool Endpoints
 @api_router.post("/ai/create-sales-data", response_model=AIToolResponse)
 async def create_sales_data(dataset: SalesDataset):
     """AI endpoint to create sales data programmatically"""
     try:
-        # Process the data
-        data_records = []
-        for point in dataset.data:
-            record = {
-                'month': point.month,
-                'sales': point.sales,
-                'expenses': point.expenses or 0
-            }
-            if point.profit is not None:
-                record['profit'] = point.profit
-            else:
-                record['profit'] = point.sales - (point.expenses or 0)
-            data_records.append(record)
-        
-        # Save to CSV
-        df = pd.DataFrame(data_records)
-        filename = f"{dataset.name.replace(' ', '_').lower()}.csv"
-        df.to_csv(csv_dir / filename, index=False)
-        
+        result = await blocking.run("create_sales_data", write_sales_dataset, dataset)
         return AIToolResponse(
             success=True,
             message=f"Sales dataset '{dataset.name}' created successfully",
-            data={
+            data=result
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/ai/create-sales-data/bulk", response_model=AIToolResponse)
+async def create_sales_data_bulk(
+    request: Request,
+    name: Optional[str] = Query(None, description="Dataset name; required for NDJSON bodies"),
+):
+    """AI endpoint to create large sales datasets from columnar JSON or NDJSON"""
+    try:
+        body = await request.body()
+        ndjson = request.headers.get("content-type", "").startswith(MEDIA_TYPES["ndjson"])
+        
+        def ingest():
+            # Validation and the profit derivation run column-wise, not per point
+            if ndjson:
+                dataset_name, df = name, parse_ndjson(body)
+            else:
+                payload = parse_columnar(body)
+                dataset_name, df = payload["name"] or name, payload["data"]
+            if not dataset_name:
+                raise IngestError("A dataset name is required")
+            filename = f"{dataset_key(dataset_name)}.csv"
+            save_dataset(csv_dir / filename, df)
+            return dataset_name, {
                 "filename": filename,
-                "records": len(data_records),
-                "api_endpoint": f"/api/data/{dataset.name.replace(' ', '_').lower()}"
+                "records": len(df),
+                "api_endpoint": f"/api/data/{dataset_key(dataset_name)}"
             }
+        
+        dataset_name, result = await blocking.run("create_sales_data", ingest)
+        return AIToolResponse(
+            success=True,
+            message=f"Sales dataset '{dataset_name}' created successfully",
+            data=result
         )
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def write_sales_dataset(dataset: SalesDataset):
+    """Save a sales dataset, deriving profit where it is missing"""
+    data_records = []
+    for point in dataset.data:
+        record = {
+            'month': point.month,
+            'sales': point.sales,
+            'expenses': point.expenses or 0
+        }
+        if point.profit is not None:
+            record['profit'] = point.profit
+        else:
+            record['profit'] = point.sales - (point.expenses or 0)
+        data_records.append(record)
+    
+    # Save to CSV
+    filename = f"{dataset_key(dataset.name)}.csv"
+    save_dataset(csv_dir / filename, pd.DataFrame(data_records))
+    return {
+        "filename": filename,
+        "records": len(data_records),
+        "api_endpoint": f"/api/data/{dataset_key(dataset.name)}"
+    }
+
 @api_router.post("/ai/upload-csv", response_model=AIToolResponse)
 async def upload_csv_data(file: UploadFile = File(...), dataset_name: str = Form(...)):
     """AI endpoint to upload CSV data files"""
@@ -180,79 +361,499 @@ async def upload_csv_data(file: UploadFile = File(...), dataset_name: str = Form
         if not file.filename.endswith('.csv'):
             raise HTTPException(status_code=400, detail="Only CSV files are allowed")
         
-        content = await file.read()
-        df = pd.read_csv(io.StringIO(content.decode('utf-8')))
-        
-        # Save the file
-        filename = f"{dataset_name.replace(' ', '_').lower()}.csv"
-        df.to_csv(csv_dir / filename, index=False)
+        # Stream the upload to disk, then parse it chunk by chunk off the event loop
+        spool_path = await spool_upload(file, uploads_dir)
+        try:
+            result = await blocking.run("upload_csv_data", ingest_dataset, spool_path, dataset_name)
+        finally:
+            spool_path.unlink(missing_ok=True)
         
         return AIToolResponse(
             success=True,
             message=f"CSV file uploaded as '{dataset_name}'",
-            data={
-                "filename": filename,
-                "rows": len(df),
-                "columns": list(df.columns),
-                "sample": df.head(3).to_dict('records'),
-                "api_endpoint": f"/api/data/{dataset_name.replace(' ', '_').lower()}"
-            }
+            data=result
+        )
+    except HTTPException:
+        raise
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def ingest_dataset(source: Path, dataset_name: str):
+    """Validate the CSV at source, install it as dataset_name and record it in the catalog"""
+    filename = f"{dataset_key(dataset_name)}.csv"
+    # Renamed into place and the log reset under the dataset's write lock, so no append lands in between
+    summary = ingest_csv(source, csv_dir / filename, install=dataset_storage.install)
+    # Profiled from the parsed chunks, so the dataset is never loaded whole
+    dataset_catalog.record(csv_dir / filename, summary.profile(), summary.rows, summary.sample)
+    announce_write(dataset_key(dataset_name))
+    return {
+        "filename": filename,
+        "rows": summary.rows,
+        "columns": summary.columns,
+        "sample": summary.sample.to_dict('records'),
+        "api_endpoint": f"/api/data/{dataset_key(dataset_name)}"
+    }
+
+def ingest_inline_csv(content: str, dataset_name: str):
+    """Ingest CSV text sent inside a request, e.g. by a batch upload-csv operation"""
+    spool_path = spool_text(content, uploads_dir)
+    try:
+        return ingest_dataset(spool_path, dataset_name)
+    finally:
+        spool_path.unlink(missing_ok=True)
+
+@api_router.post("/ai/datasets/{dataset_name}/append", response_model=AIToolResponse)
+async def append_dataset(dataset_name: str, request: Request):
+    """AI endpoint to add rows to a dataset without rewriting it"""
+    return await log_rows("append_dataset", dataset_name, request)
+
+@api_router.post("/ai/datasets/{dataset_name}/upsert", response_model=AIToolResponse)
+async def upsert_dataset(
+    dataset_name: str,
+    request: Request,
+    key: List[str] = Query(..., description="Column(s) identifying a row; repeat for composite keys"),
+):
+    """AI endpoint to insert or replace rows by key without rewriting the dataset"""
+    return await log_rows("upsert_dataset", dataset_name, request, keys=key)
+
+async def log_rows(endpoint, dataset_name, request, keys=None):
+    """Write the request's rows to the dataset's append log"""
+    try:
+        csv_file = csv_dir / f"{dataset_name}.csv"
+        if not csv_file.exists():
+            raise HTTPException(status_code=404, detail=f"Dataset {dataset_name} not found")
+        body = await request.body()
+        
+        def write():
+            df = parse_rows(body, request.headers.get("content-type", "application/json"))
+            if keys is None:
+                result = dataset_storage.append(csv_file, df)
+            else:
+                result = dataset_storage.upsert(csv_file, df, keys)
+            announce_write(dataset_name)
+            return result
+        
+        # The new version invalidates cached frames, charts and catalog entries on their next use
+        result = await blocking.run(endpoint, write)
+        action = "appended to" if keys is None else "upserted into"
+        return AIToolResponse(
+            success=True,
+            message=f"{result['rows_written']} rows {action} '{dataset_name}'",
+            data={**result, "api_endpoint": f"/api/data/{dataset_name}"}
         )
+    except HTTPException:
+        raise
+    except (IngestError, StorageError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/ai/datasets/{dataset_name}/compact", response_model=AIToolResponse)
+async def compact_dataset(dataset_name: str):
+    """AI endpoint to fold a dataset's append log into its base file"""
+    try:
+        csv_file = csv_dir / f"{dataset_name}.csv"
+        if not csv_file.exists():
+            raise HTTPException(status_code=404, detail=f"Dataset {dataset_name} not found")
+        compacted = await blocking.run("compact_dataset", dataset_storage.compact, csv_file)
+        return AIToolResponse(
+            success=True,
+            message=f"Dataset '{dataset_name}' compacted" if compacted else f"Dataset '{dataset_name}' has no pending writes",
+            data={"compacted": compacted, "version": dataset_storage.version(csv_file)}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/ai/generate-chart", response_model=AIToolResponse)
-async def generate_chart(config: ChartConfig):
+async def generate_chart(
+    config: ChartConfig,
+    request: Request,
+    response_format: Optional[str] = Query(None, alias="format", description="records, columnar or ndjson"),
+):
     """AI endpoint to generate charts programmatically"""
     try:
+        fmt = negotiate_format(response_format, request.headers.get("accept"))
+        
         # Check if dataset exists
         dataset_file = csv_dir / f"{config.dataset_name}.csv"
         if not dataset_file.exists():
             raise HTTPException(status_code=404, detail=f"Dataset {config.dataset_name} not found")
         
-        # Load data
-        df = pd.read_csv(dataset_file)
-        chart_data = df.to_dict('records')
-        
-        # Generate chart configuration
-        chart_config = {
-            "type": config.chart_type,
-            "data": chart_data,
-            "title": config.title or f"{config.chart_type.title()} Chart - {config.dataset_name}",
-            "width": config.width,
-            "height": config.height
-        }
+        check_export_format(config)
+        df, chart_id, chart_config, cached = await blocking.run("generate_chart", build_chart, config, dataset_file)
+        export_url = await render_export(config, chart_id, chart_config)
+        return await blocking.run("generate_chart", chart_response, fmt, df, chart_id, chart_config, cached, export_url)
+    except HTTPException:
+        raise
+    except (QueryError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def build_chart(config: ChartConfig, dataset_file: Path, loaded=None):
+    """Generate (or find) the chart for config.
+    
+    loaded is an optional (version, frame) pair of dataset_file that was
+    already read by the caller. Returns (df, chart_id, chart_config, cached).
+    """
+    # Identical configs against an unchanged dataset map to the same chart
+    version = loaded[0] if loaded is not None else dataset_storage.version(dataset_file)
+    chart_id = chart_store.chart_id(config.model_dump(), version)
+    chart_config = chart_store.load(chart_id)
+    if chart_config is not None:
+        df, chart_config = resolve_chart(chart_id, chart_config)
+        return df, chart_id, chart_config, True
+    
+    # Load data; the version is re-read with it in case the file changed meanwhile
+    if loaded is None:
+        loaded = dataset_cache.get_versioned(dataset_file, loader=dataset_storage.read)
+    loaded_version, source_df = loaded
+    if loaded_version != version:
+        version = loaded_version
+        chart_id = chart_store.chart_id(config.model_dump(), version)
+    params = {"downsample": config.downsample or "auto", "x_field": config.x_field, "y_fields": config.y_fields}
+    chart = {
+        "type": config.chart_type,
+        "title": config.title or f"{config.chart_type.title()} Chart - {config.dataset_name}",
+        "width": config.width,
+        "height": config.height
+    }
+    if config.chart_type == "network":
+        # Node positions travel with the chart, so clients draw without simulating
+        chart["layout"] = network_chart_layout(dataset_file, version, source_df)
+    df, chart_config = render_chart_data(source_df, chart, params)
+    chart_data_cache.fetch(chart_id, chart_id, lambda: df)
+    
+    # Save chart config for frontend
+    if CHART_DATA_MODE == "reference":
+        dataset_storage.write_snapshot(dataset_file, version, source_df)
+        chart_store.save(chart_id, chart_store.reference(chart_config, config.dataset_name, version, params))
+    else:
+        chart_store.save(chart_id, chart_config)
+    return df, chart_id, chart_config, False
+
+def network_chart_layout(dataset_file: Path, version, df):
+    """{node id: [x, y]} for a network chart over a link table (source, target) or a node table"""
+    is_links = {"source", "target"} <= set(df.columns)
+    laid_out = layout_cache.fetch(
+        f"network:{dataset_file}", version,
+        lambda: layout_network(*graph_frames(None if is_links else df, df if is_links else None)),
+    )
+    return {node: [x, y] for node, x, y in zip(laid_out["id"], laid_out["x"], laid_out["y"])}
+
+def render_chart_data(df, chart, params):
+    """Reduce df for a chart and return it with the inline chart config"""
+    df, reduction = reduce_for_chart(
+        df, chart["type"], chart["width"], chart["height"],
+        method=params.get("downsample") or "auto", x_field=params.get("x_field"), y_fields=params.get("y_fields")
+    )
+    chart_config = {"type": chart["type"], "data": frame_to_records(df)}
+    chart_config.update((key, value) for key, value in chart.items() if key not in ("type", "source", "params"))
+    if reduction is not None:
+        chart_config["reduction"] = reduction
+    return df, chart_config
+
+def resolve_chart(chart_id, chart_config):
+    """Return the data frame and inline config of a stored chart.
+    
+    Reference charts are resolved against the snapshot of the dataset
+    version they were built from, falling back to the live dataset while it
+    is still at that version. The resulting rows are cached by chart id.
+    """
+    source = chart_config.get("source")
+    if source is None:
+        df = chart_data_cache.fetch(chart_id, chart_id, lambda: pd.DataFrame.from_records(chart_config.get("data") or []))
+        return df, chart_config
+    params = chart_config.get("params") or {}
+    if "reduction" not in chart_config:
+        # Stored before references kept their reduction, which only a full resolve reports
+        return render_chart_data(load_chart_source(source), chart_config, params)
+    df = chart_data_cache.fetch(
+        chart_id, chart_id, lambda: render_chart_data(load_chart_source(source), chart_config, params)[0]
+    )
+    inline = {"type": chart_config["type"], "data": frame_to_records(df)}
+    inline.update(
+        (key, value) for key, value in chart_config.items()
+        if key not in ("type", "source", "params", "reduction")
+    )
+    if chart_config["reduction"] is not None:
+        inline["reduction"] = chart_config["reduction"]
+    return df, inline
+
+def load_chart_source(source):
+    """The dataset version a reference chart was built from"""
+    dataset_file = csv_dir / f"{source['dataset']}.csv"
+    snapshot_dir = dataset_storage.snapshot_path(dataset_file, source["version"])
+    if snapshot_dir.exists():
+        return dataset_cache.get(snapshot_dir, loader=dataset_storage.read_snapshot)
+    if dataset_file.exists() and dataset_storage.version(dataset_file) == source["version"]:
+        return load_dataset(dataset_file)
+    raise HTTPException(status_code=410, detail="Dataset version for chart is no longer available")
+
+def check_export_format(config: ChartConfig):
+    if (config.export_format or "json") not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export_format '{config.export_format}', expected one of {', '.join(EXPORT_FORMATS)}")
+
+async def render_export(config: ChartConfig, chart_id, chart_config):
+    """Return the export URL of a chart, rendering it first when an SVG or PNG export is requested"""
+    if (config.export_format or "json") == "json":
+        return f"/api/exports/chart_{chart_id}.json"
+    params = {"x_field": config.x_field, "y_fields": config.y_fields}
+    image_file = await chart_renderer.render(chart_id, {**chart_config, "params": params}, config.export_format)
+    return f"/api/exports/{image_file.name}"
+
+def chart_response(fmt, df, chart_id, chart_config, cached=False, export_url=None):
+    response = {
+        "success": True,
+        "message": "Chart served from cache" if cached else "Chart generated successfully",
+        "data": {**chart_config, "data": None},
+        "chart_url": f"/api/charts/{chart_id}",
+        "export_url": export_url or f"/api/exports/chart_{chart_id}.json"
+    }
+    return frame_response(df, fmt, response, data_path=("data", "data"))
+
+# Batches are capped so one request cannot queue unbounded work
+BATCH_MAX_OPERATIONS = int(os.environ.get("BATCH_MAX_OPERATIONS", "100"))
+
+@api_router.post("/ai/batch", response_model=AIToolResponse)
+async def run_batch(batch: BatchRequest):
+    """AI endpoint to run many dataset and chart operations in one request"""
+    if len(batch.operations) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_OPERATIONS} operations per batch")
+    try:
+        results: List[Optional[Dict[str, Any]]] = [None] * len(batch.operations)
+        planned = []
+        for index, operation in enumerate(batch.operations):
+            try:
+                planned.append((index, *parse_batch_operation(operation)))
+            except (HTTPException, ValueError) as e:
+                results[index] = batch_error(operation, e)
         
-        # Save chart config for frontend
-        chart_id = str(uuid.uuid4())
-        chart_file = exports_dir / f"chart_{chart_id}.json"
-        with open(chart_file, 'w') as f:
-            json.dump(chart_config, f)
+        # Stages run in order; each dataset read in a stage is loaded once and shared
+        for stage in plan_stages([(op, dataset) for _, op, dataset, _ in planned]):
+            reads = sorted({planned[i][2] for i in stage if planned[i][1] in READ_OPS})
+            frames = await asyncio.gather(*(load_batch_dataset(name) for name in reads), return_exceptions=True)
+            loaded = dict(zip(reads, frames))
+            outcomes = await asyncio.gather(*(
+                run_batch_operation(batch.operations[planned[i][0]], *planned[i][1:], loaded) for i in stage
+            ))
+            for i, outcome in zip(stage, outcomes):
+                results[planned[i][0]] = outcome
         
+        failed = sum(1 for result in results if not result["success"])
         return AIToolResponse(
-            success=True,
-            message=f"Chart generated successfully",
-            data=chart_config,
-            chart_url=f"/api/charts/{chart_id}",
-            export_url=f"/api/exports/chart_{chart_id}.json"
+            success=failed == 0,
+            message=f"Ran {len(results)} operations, {failed} failed",
+            data={"results": results}
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def parse_batch_operation(operation: BatchOperation):
+    """Validate one batch operation and return (op, dataset, params)"""
+    if operation.op == "create-sales-data":
+        params = SalesDataset.model_validate(operation.params)
+        return operation.op, dataset_key(params.name), params
+    if operation.op == "upload-csv":
+        params = BatchUploadParams.model_validate(operation.params)
+        return operation.op, dataset_key(params.dataset_name), params
+    if operation.op == "generate-chart":
+        params = ChartConfig.model_validate(operation.params)
+        check_export_format(params)
+        return operation.op, params.dataset_name, params
+    if operation.op == "query":
+        params = BatchQueryParams.model_validate(operation.params)
+        return operation.op, params.dataset_name, params
+    raise HTTPException(status_code=400, detail=f"Unknown operation '{operation.op}', expected one of {', '.join(OPERATIONS)}")
+
+async def load_batch_dataset(dataset_name: str):
+    dataset_file = csv_dir / f"{dataset_name}.csv"
+    if not dataset_file.exists():
+        raise HTTPException(status_code=404, detail=f"Dataset {dataset_name} not found")
+    return await blocking.run("batch", dataset_cache.get_versioned, dataset_file, dataset_storage.read)
+
+async def run_batch_operation(operation: BatchOperation, op, dataset_name, params, loaded):
+    try:
+        if op == "create-sales-data":
+            data = await blocking.run("batch", write_sales_dataset, params)
+        elif op == "upload-csv":
+            data = await blocking.run("batch", ingest_inline_csv, params.content, params.dataset_name)
+        else:
+            frame = loaded[dataset_name]
+            if isinstance(frame, BaseException):
+                raise frame
+            if op == "generate-chart":
+                _, chart_id, chart_config, cached = await blocking.run(
+                    "batch", build_chart, params, csv_dir / f"{dataset_name}.csv", frame
+                )
+                data = {
+                    "chart": chart_config,
+                    "cached": cached,
+                    "chart_url": f"/api/charts/{chart_id}",
+                    "export_url": await render_export(params, chart_id, chart_config)
+                }
+            else:
+                data = await blocking.run("batch", query_frame, frame[1], params)
+        return {"id": operation.id, "op": op, "success": True, "data": data}
+    except (HTTPException, ValueError) as e:
+        return batch_error(operation, e)
+    except Exception as e:
+        return batch_error(operation, e, status_code=500)
+
+def query_frame(df, params: BatchQueryParams):
+    window, total = apply_window(
+        df, parse_columns(params.columns), parse_predicates(params.where), params.offset, params.limit
+    )
+    return {
+        "data": frame_to_records(window),
+        "metadata": {"rows": total, "columns": list(window.columns), "offset": params.offset, "returned": len(window)}
+    }
+
+def batch_error(operation: BatchOperation, error: Exception, status_code: int = 400):
+    if isinstance(error, HTTPException):
+        status_code, message = error.status_code, error.detail
+    else:
+        message = str(error)
+    return {"id": operation.id, "op": operation.op, "success": False, "status": status_code, "error": message}
+
+@api_router.post("/query")
+async def run_query(
+    plan: QueryPlan,
+    request: Request,
+    response_format: Optional[str] = Query(None, alias="format", description="records, columnar or ndjson"),
+):
+    """Run a filter/group-by/resample/rolling/join plan over stored datasets"""
+    return await query_response(plan.model_dump(), request, response_format)
+
+@api_router.get("/query")
+async def get_query(
+    request: Request,
+    plan: str = Query(..., description="Query plan as JSON, for responses HTTP caches can keep"),
+    response_format: Optional[str] = Query(None, alias="format", description="records, columnar or ndjson"),
+):
+    """Run a query plan passed in the URL"""
+    try:
+        parsed = QueryPlan.model_validate(loads(plan))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query plan: {e}")
+    return await query_response(parsed.model_dump(), request, response_format)
+
+@api_router.get("/network")
+async def get_network(
+    request: Request,
+    nodes: Optional[str] = Query(None, description="Dataset of nodes (id, group, size)"),
+    links: Optional[str] = Query(None, description="Dataset of links (source, target, value)"),
+    aggregate: str = Query("auto", description="auto, none, group or grid"),
+    max_nodes: int = Query(NETWORK_MAX_NODES, ge=1, description="Node budget above which auto aggregates"),
+):
+    """Nodes with precomputed force-layout positions in [-1, 1], plus their links"""
+    try:
+        files = {}
+        for role, name in (("nodes", nodes), ("links", links)):
+            if name is None:
+                continue
+            dataset_file = csv_dir / f"{name}.csv"
+            if Path(name).name != name or not dataset_file.exists():
+                raise HTTPException(status_code=404, detail=f"Dataset {name} not found")
+            files[role] = dataset_file
+        if not files:
+            raise HTTPException(status_code=400, detail="Pass a nodes dataset, a links dataset or both")
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        
+        # The layout is fixed by the two dataset versions, so they make the ETag
+        versions = {files[role].stem: dataset_storage.version(files[role]) for role in files}
+        key = "network:" + ":".join(f"{role}={files[role].stem}" for role in sorted(files))
+        etag = make_etag(key, versions, aggregate, max_nodes, encoding)
+        headers = cache_headers(etag, vary="Accept-Encoding")
+        if is_not_modified(request, etag):
+            return not_modified(headers)
+        
+        def build_response():
+            frames = {role: load_dataset(dataset_file) for role, dataset_file in files.items()}
+            node_table, link_table = graph_frames(frames.get("nodes"), frames.get("links"))
+            laid_out = layout_cache.fetch(key, versions, lambda: layout_network(node_table, link_table))
+            shown_nodes, shown_links, aggregated = aggregate_network(laid_out, link_table, aggregate, max_nodes)
+            response = frame_response(shown_nodes, "records", {
+                "nodes": None,
+                "links": frame_to_records(shown_links),
+                "metadata": {
+                    "nodes": len(shown_nodes),
+                    "links": len(shown_links),
+                    "source_nodes": len(laid_out),
+                    "source_links": len(link_table),
+                    "aggregated": aggregated,
+                    "datasets": versions
+                }
+            }, data_path=("nodes",))
+            return with_headers(compress_response(response, encoding), headers)
+        
+        return await blocking.run("get_network", build_response)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def query_response(plan, request, response_format):
+    try:
+        files = {}
+        for name in validate_plan(plan):
+            dataset_file = csv_dir / f"{name}.csv"
+            if Path(name).name != name or not dataset_file.exists():
+                raise HTTPException(status_code=404, detail=f"Dataset {name} not found")
+            files[name] = dataset_file
+        fmt = negotiate_format(response_format, request.headers.get("accept"))
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        
+        # The result is fixed by the plan and the dataset versions, both known before any read
+        versions = {name: dataset_storage.version(dataset_file) for name, dataset_file in files.items()}
+        key = result_key(plan, versions)
+        etag = make_etag(key, fmt, encoding)
+        headers = cache_headers(etag, vary="Accept, Accept-Encoding")
+        if is_not_modified(request, etag):
+            return not_modified(headers)
+        
+        def load(name):
+            version, df = dataset_cache.get_versioned(files[name], loader=dataset_storage.read)
+            if version != versions[name]:
+                raise HTTPException(status_code=409, detail=f"Dataset {name} changed while the query ran")
+            return df
+        
+        def build_response():
+            df = query_cache.fetch(key, key, lambda: execute_plan(plan, load))
+            response = frame_response(df, fmt, {
+                "data": None,
+                "metadata": {"rows": len(df), "columns": list(df.columns), "datasets": versions, "query_key": key}
+            })
+            return with_headers(compress_response(response, encoding), headers)
+        
+        return await blocking.run("query", build_response)
+    except HTTPException:
+        raise
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.get("/ai/datasets", response_model=AIToolResponse)
 async def list_datasets_for_ai():
     """AI endpoint to list all available datasets"""
     try:
+        await blocking.run("list_datasets_for_ai", dataset_catalog.refresh)
         datasets = []
-        for csv_file in csv_dir.glob("*.csv"):
-            df = pd.read_csv(csv_file)
+        for entry in dataset_catalog.entries():
             datasets.append({
-                "name": csv_file.stem,
-                "filename": csv_file.name,
-                "rows": len(df),
-                "columns": list(df.columns),
-                "sample": df.head(2).to_dict('records'),
-                "api_endpoint": f"/api/data/{csv_file.stem}"
+                "name": entry["name"],
+                "filename": entry["filename"],
+                "rows": entry["rows"],
+                "columns": entry["columns"],
+                "sample": entry["sample"][:2],
+                "api_endpoint": f"/api/data/{entry['name']}"
             })
         
         return AIToolResponse(
@@ -271,16 +872,23 @@ async def root():
         "version": "1.0.0",
         "ai_endpoints": [
             "/api/ai/create-sales-data",
+            "/api/ai/create-sales-data/bulk",
             "/api/ai/upload-csv", 
             "/api/ai/generate-chart",
+            "/api/ai/batch",
+            "/api/ai/datasets/{dataset_name}/append",
+            "/api/ai/datasets/{dataset_name}/upsert",
+            "/api/ai/datasets/{dataset_name}/compact",
             "/api/ai/datasets"
         ],
         "data_endpoints": [
             "/api/data/sales_data", "/api/data/quarterly_sales", "/api/data/product_performance",
             "/api/data/user_data", "/api/data/category_data", "/api/data/time_series_data"
         ],
-        "chart_endpoints": ["/api/charts/{chart_id}"],
-        "utility_endpoints": ["/api/datasets", "/api/health"]
+        "query_endpoints": ["/api/query", "/api/network"],
+        "chart_endpoints": ["/api/charts/{chart_id}", "/api/charts/{chart_id}/live"],
+        "live_endpoints": ["/api/datasets/{dataset_name}/live", "/api/charts/{chart_id}/live"],
+        "utility_endpoints": ["/api/datasets", "/api/datasets/{dataset_name}/profile", "/api/health", "/api/metrics"]
     }
 
 @api_router.get("/health")
@@ -289,84 +897,417 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "datasets_count": len(list(csv_dir.glob("*.csv"))),
+        "datasets_count": len(dataset_catalog),
+        "dataset_storage": dataset_storage.name,
+        "dataset_cache": dataset_cache.stats(),
+        "query_cache": query_cache.stats(),
+        "layout_cache": layout_cache.stats(),
+        "chart_data_cache": chart_data_cache.stats(),
+        "chart_store": chart_store.stats(),
+        "chart_renderer": chart_renderer.stats(),
+        "executor": blocking.stats(),
+        "invalidations": invalidations.stats(),
+        "live_updates": live_updates.stats(),
+        "startup": {**startup_stats, "warming": warmup_task is not None and not warmup_task.done()},
         "server": "AI D3.js Tool Server"
     }
 
 @api_router.get("/datasets")
 async def get_available_datasets():
     """Enhanced datasets endpoint"""
+    await blocking.run("get_available_datasets", dataset_catalog.refresh)
     datasets = []
-    for csv_file in csv_dir.glob("*.csv"):
-        df = pd.read_csv(csv_file)
+    for entry in dataset_catalog.entries():
         datasets.append({
-            "name": csv_file.stem,
-            "filename": csv_file.name,
-            "rows": len(df),
-            "columns": list(df.columns),
-            "sample": df.head(3).to_dict('records'),
-            "chart_types": get_recommended_charts(df)
+            "name": entry["name"],
+            "filename": entry["filename"],
+            "rows": entry["rows"],
+            "columns": entry["columns"],
+            "sample": entry["sample"][:3],
+            "chart_types": entry["chart_types"]
         })
     return {"datasets": datasets}
 
-def get_recommended_charts(df):
-    """Recommend chart types based on data structure"""
-    recommendations = []
-    columns = df.columns.tolist()
-    
-    if any(col in ['month', 'quarter', 'date'] for col in columns):
-        recommendations.extend(['line', 'area', 'bar'])
-    if any(col in ['category', 'product', 'type'] for col in columns):
-        recommendations.extend(['pie', 'bar'])
-    if len([col for col in columns if df[col].dtype in ['int64', 'float64']]) >= 2:
-        recommendations.append('scatter')
+@api_router.get("/datasets/{dataset_name}/profile")
+async def get_dataset_profile(dataset_name: str):
+    """Per-column dtype, kind, null count, cardinality, range and histogram for a dataset"""
+    try:
+        await blocking.run("get_dataset_profile", dataset_catalog.refresh)
+        entry = dataset_catalog.get(dataset_name)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"Dataset {dataset_name} not found")
+        return {
+            "name": entry["name"],
+            "rows": entry["rows"],
+            "version": entry["signature"],
+            "chart_types": entry["chart_types"],
+            "columns": entry["profile"]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/datasets/{dataset_name}/live")
+async def follow_dataset(
+    dataset_name: str,
+    request: Request,
+    since: Optional[str] = Query(None, description="Dataset version the client already has, e.g. metadata.version of /api/data"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to send rows and aggregates for"),
+):
+    """Server-sent events with a dataset's appended and changed rows and its recomputed aggregates"""
+    try:
+        csv_file = csv_dir / f"{dataset_name}.csv"
+        if not csv_file.exists():
+            raise HTTPException(status_code=404, detail=f"Dataset {dataset_name} not found")
+        projection = parse_columns(columns)
+        if projection is not None:
+            check_columns(await blocking.run("follow_dataset", dataset_storage.columns, csv_file), projection, [])
+        # A reconnecting EventSource sends the id of the last event it received
+        return live_response(csv_file, projection, request.headers.get("last-event-id") or since)
+    except HTTPException:
+        raise
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SubscriberLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/charts/{chart_id}/live")
+async def follow_chart(chart_id: str, request: Request):
+    """Server-sent events with the changes to a chart's source dataset since the chart was built, limited to its fields"""
+    try:
+        chart_config = await blocking.run("follow_chart", chart_store.load, chart_id)
+        if chart_config is None:
+            raise HTTPException(status_code=404, detail=f"Chart {chart_id} not found")
+        source = chart_config.get("source")
+        if source is None:
+            raise HTTPException(status_code=400, detail="Only charts stored with CHART_DATA_MODE=reference can be followed")
+        csv_file = csv_dir / f"{source['dataset']}.csv"
+        if not csv_file.exists():
+            raise HTTPException(status_code=404, detail=f"Dataset {source['dataset']} not found")
+        params = chart_config.get("params") or {}
+        fields = [params.get("x_field")] + list(params.get("y_fields") or [])
+        projection = list(dict.fromkeys(field for field in fields if field)) or None
+        return live_response(csv_file, projection, request.headers.get("last-event-id") or source["version"])
+    except HTTPException:
+        raise
+    except SubscriberLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def live_response(csv_file: Path, columns: Optional[List[str]], since: Optional[str]) -> StreamingResponse:
+    live_updates.check_capacity()
+
+    async def next_event(version, initial):
+        return await blocking.run("live_updates", live_event, csv_file, columns, version, initial)
+
+    return StreamingResponse(
+        live_updates.stream(csv_file.stem, since, next_event),
+        media_type="text/event-stream",
+        # Proxies must pass events through as they are written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def live_event(csv_file: Path, columns: Optional[List[str]], since: Optional[str], initial: bool):
+    """The next event for a subscriber that has csv_file at version since, or None if there is nothing new.
+
+    "ready" means the client is up to date, "delta" carries the logged
+    appends and upserts since its version in order, and "reset" means it
+    has to fetch the dataset again: the dataset was replaced, or more than
+    LIVE_MAX_DELTA_ROWS rows changed.
+    """
+    if since is None:
+        version, changes = dataset_storage.version(csv_file), []
+    else:
+        version, changes = dataset_storage.changes_since(csv_file, since)
+    if changes == [] and not initial:
+        return None
+    payload = {"dataset": csv_file.stem, "version": version}
+    if changes is None or sum(len(rows) for _, rows in changes) > LIVE_MAX_DELTA_ROWS:
+        kind = "reset"
+    elif not changes:
+        kind = "ready"
+    else:
+        kind = "delta"
+        payload["since"] = since
+        payload["changes"] = []
+        for keys, rows in changes:
+            if columns is not None:
+                rows = rows[list(dict.fromkeys(columns + (keys or [])))]
+            change = {"op": "append" if keys is None else "upsert", "rows": frame_to_records(rows)}
+            if keys is not None:
+                change["keys"] = keys
+            payload["changes"].append(change)
+    payload["aggregates"] = json.loads(live_summary(csv_file, columns).to_json())
+    return kind, version, payload
+
+def live_summary(csv_file: Path, columns: Optional[List[str]]) -> pd.DataFrame:
+    """Aggregates of the dataset's numeric columns, folded forward while only rows were appended"""
+    key = f"live:{csv_file}:{','.join(columns or [])}"
+    cached = query_cache.peek(key)
+    if cached is not None:
+        version, changes = dataset_storage.changes_since(csv_file, cached[0])
+        if changes is not None and all(keys is None for keys, _ in changes):
+            summary = fold_appends(cached[1], [rows for _, rows in changes])
+            return query_cache.fetch(key, version, lambda: summary)
+    version, df = dataset_cache.get_versioned(csv_file, loader=dataset_storage.read)
+    return query_cache.fetch(key, version, lambda: summarize(df if columns is None else df[columns]))
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Request, phase, cache and pool metrics in the Prometheus text format"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@api_router.get("/metrics/profiles")
+async def list_request_profiles():
+    """Recent sampling profiles of requests sent with X-Profile: <PROFILE_TOKEN>"""
+    return {"profiles": list(profiler.list_profiles())}
+
+@api_router.get("/metrics/profiles/{profile_id}")
+async def get_request_profile(
+    profile_id: str,
+    response_format: Optional[str] = Query(None, alias="format", description="json or collapsed"),
+):
+    """One request's sampling profile; format=collapsed is flamegraph.pl / speedscope input"""
+    report = profiler.get_profile(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    if response_format == "collapsed":
+        return PlainTextResponse(profiler.collapsed(report))
+    return report
+
+def collect_component_metrics():
+    """Cache and blocking pool statistics, read each time /api/metrics is scraped"""
+    hits = Counter("d3tool_cache_hits_total", "Lookups answered from the cache", ("cache",))
+    misses = Counter("d3tool_cache_misses_total", "Lookups that had to load or compute", ("cache",))
+    hit_ratio = Gauge("d3tool_cache_hit_ratio", "Hits over lookups since startup", ("cache",))
+    cached_bytes = Gauge("d3tool_cache_bytes", "Approximate memory held by the cache", ("cache",))
+    caches = {
+        "dataset": dataset_cache.stats(), "query": query_cache.stats(), "chart": chart_store.stats(),
+        "chart_data": chart_data_cache.stats(),
+    }
+    for name, stats in caches.items():
+        hits.inc(name, amount=stats["hits"])
+        misses.inc(name, amount=stats["misses"])
+        lookups = stats["hits"] + stats["misses"]
+        hit_ratio.set(name, value=stats["hits"] / lookups if lookups else 0.0)
+        if "bytes" in stats:
+            cached_bytes.set(name, value=stats["bytes"])
     
-    return list(set(recommendations)) or ['bar']
+    running = Gauge("d3tool_blocking_jobs_running", "Blocking jobs running on the pool", ("endpoint",))
+    queued = Gauge("d3tool_blocking_jobs_queued", "Blocking jobs waiting for their endpoint's limit", ("endpoint",))
+    completed = Counter("d3tool_blocking_jobs_completed_total", "Blocking jobs that finished", ("endpoint",))
+    failed = Counter("d3tool_blocking_jobs_failed_total", "Blocking jobs that raised", ("endpoint",))
+    for endpoint, stats in blocking.stats()["endpoints"].items():
+        running.set(endpoint, value=stats["running"])
+        queued.set(endpoint, value=stats["queued"])
+        completed.inc(endpoint, amount=stats["completed"])
+        failed.inc(endpoint, amount=stats["failed"])
+
+    startup = Gauge("d3tool_startup_seconds", "Time spent importing, starting and warming up the server", ("phase",))
+    for phase_name in ("import", "startup", "warmup"):
+        seconds = startup_stats[f"{phase_name}_seconds"]
+        if seconds is not None:
+            startup.set(phase_name, value=seconds)
+    return [hits, misses, hit_ratio, cached_bytes, running, queued, completed, failed, startup]
+
+REGISTRY.add_collector(collect_component_metrics)
 
 # Data endpoints
 @api_router.get("/data/{dataset_name}")
-async def get_dataset(dataset_name: str):
-    """Enhanced data endpoint with error handling"""
+async def get_dataset(
+    dataset_name: str,
+    request: Request,
+    offset: int = Query(0, ge=0, description="Index of the first matching row to return"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of rows to return"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    where: Optional[List[str]] = Query(None, description="Row filters as column:op:value (eq, ne, gt, ge, lt, le, in, contains)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page; overrides the other parameters"),
+    response_format: Optional[str] = Query(None, alias="format", description="records, columnar or ndjson"),
+):
+    """Enhanced data endpoint with error handling, paging, projection and filters"""
     try:
         csv_file = csv_dir / f"{dataset_name}.csv"
         if not csv_file.exists():
             raise HTTPException(status_code=404, detail=f"Dataset {dataset_name} not found")
-        df = pd.read_csv(csv_file)
-        return {
-            "data": df.to_dict('records'),
-            "metadata": {
-                "rows": len(df),
-                "columns": list(df.columns),
-                "recommended_charts": get_recommended_charts(df)
-            }
-        }
+        fmt = negotiate_format(response_format, request.headers.get("accept"))
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        
+        # Validators come from the dataset version alone, so a revalidation is answered from a stat()
+        version = dataset_storage.version(csv_file)
+        etag = make_etag(version, fmt, offset, limit, columns, where, cursor, encoding)
+        last_modified = dataset_storage.modified_time(csv_file)
+        headers = cache_headers(etag, last_modified, vary="Accept, Accept-Encoding")
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(headers)
+        
+        if cursor is None and offset == 0 and limit is None and columns is None and not where:
+            # The whole dataset in one format is immutable per version, so large
+            # bodies are compressed once and then served straight from disk
+            body_file = dataset_storage.body_path(csv_file, version, f"{fmt}.json")
+            if fmt != "ndjson" and find_variant(body_file, encoding) is not None:
+                return precompressed_response(body_file, encoding, MEDIA_TYPES[fmt], headers)
+            
+            def build_response():
+                loaded_version, df = dataset_cache.get_versioned(csv_file, loader=dataset_storage.read)
+                response = frame_response(df, fmt, {
+                    "data": None,
+                    "metadata": {
+                        "rows": len(df),
+                        "columns": list(df.columns),
+                        "recommended_charts": dataset_catalog.current(csv_file, df, loaded_version)["chart_types"],
+                        "version": loaded_version
+                    }
+                })
+                if fmt == "ndjson" or loaded_version != version:
+                    return with_headers(compress_response(response, encoding), headers)
+                dataset_storage.prune_bodies(csv_file, version)
+                return compressible_response(body_file, response.body, encoding, MEDIA_TYPES[fmt], headers)
+            
+            return await blocking.run("get_dataset", build_response)
+        
+        def build_window():
+            response = build_window_response(csv_file, offset, limit, columns, where, cursor, fmt)
+            return with_headers(compress_response(response, encoding), headers)
+        
+        return await blocking.run("get_dataset", build_window)
+    except HTTPException:
+        raise
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def build_window_response(csv_file, offset, limit, columns, where, cursor, fmt="records"):
+    """Serve one filtered, projected page of a dataset"""
+    version = dataset_storage.version(csv_file)
+    if cursor is not None:
+        state = decode_cursor(cursor)
+        if state.get("version") != version:
+            raise HTTPException(status_code=409, detail="Dataset changed since the cursor was issued")
+        offset, limit, columns, where = state["offset"], state.get("limit"), state.get("columns"), state.get("where")
+    projection = parse_columns(columns)
+    predicates = parse_predicates(where)
+    
+    # Push filters and projection down to storage unless the frame is already in memory
+    if dataset_storage.supports_pushdown and not dataset_cache.contains(csv_file):
+        window, total = dataset_storage.read_window(csv_file, projection, predicates, offset, limit)
+    else:
+        window, total = apply_window(load_dataset(csv_file), projection, predicates, offset, limit)
+    
+    next_offset = offset + len(window)
+    next_cursor = None
+    if limit is not None and next_offset < total:
+        next_cursor = encode_cursor({
+            "offset": next_offset, "limit": limit, "columns": columns, "where": where, "version": version
+        })
+    entry = dataset_catalog.get(csv_file.stem)
+    return frame_response(window, fmt, {
+        "data": None,
+        "metadata": {
+            "rows": total,
+            "columns": list(window.columns),
+            "recommended_charts": entry["chart_types"] if entry else get_recommended_charts(window),
+            "offset": offset,
+            "limit": limit,
+            "returned": len(window),
+            "next_cursor": next_cursor,
+            "version": version
+        }
+    })
+
 # Chart serving endpoint
 @api_router.get("/charts/{chart_id}")
-async def get_chart(chart_id: str):
+async def get_chart(
+    chart_id: str,
+    request: Request,
+    response_format: Optional[str] = Query(None, alias="format", description="records, columnar or ndjson"),
+):
     """Serve generated charts"""
     try:
         chart_file = exports_dir / f"chart_{chart_id}.json"
         if not chart_file.exists():
             raise HTTPException(status_code=404, detail=f"Chart {chart_id} not found")
+        fmt = negotiate_format(response_format, request.headers.get("accept"))
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        
+        # A chart id never changes content, so a matching ETag needs no read at all
+        etag = make_etag(chart_id, fmt, encoding)
+        last_modified = chart_file.stat().st_mtime
+        headers = cache_headers(etag, last_modified, IMMUTABLE, vary="Accept, Accept-Encoding")
+        if is_not_modified(request, etag, last_modified):
+            chart_store.touch(chart_file)
+            return not_modified(headers)
         
-        with open(chart_file, 'r') as f:
-            chart_config = json.load(f)
+        if fmt == "records":
+            return await chart_records_response("get_chart", chart_id, chart_file, encoding, headers)
         
-        return chart_config
+        def reencode():
+            content = chart_store.read(chart_id)
+            df, chart_config = resolve_chart(chart_id, loads(content))
+            response = frame_response(df, fmt, {**chart_config, "data": None})
+            return with_headers(compress_response(response, encoding), headers)
+        
+        return await blocking.run("get_chart", reencode)
+    except HTTPException:
+        raise
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def chart_records_response(endpoint, chart_id, chart_file, encoding, headers):
+    """Records-shaped chart body, from a precompressed variant when one is stored"""
+    if find_variant(chart_file, encoding) is not None:
+        chart_store.touch(chart_file)
+        return precompressed_response(chart_file, encoding, "application/json", headers)
+    
+    def build_body():
+        # Inline charts already are the records-shaped JSON body; pass them through unparsed
+        content = chart_store.read(chart_id)
+        if chart_store.is_reference(content):
+            _, chart_config = resolve_chart(chart_id, loads(content))
+            content = dumps(chart_config)
+        return compressible_response(chart_file, content, encoding, "application/json", headers)
+    
+    return await blocking.run(endpoint, build_body)
+
 # Export endpoint
 @api_router.get("/exports/{filename}")
-async def download_export(filename: str):
+async def download_export(filename: str, request: Request):
     """Download exported files"""
     file_path = exports_dir / filename
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path)
+    is_chart = file_path.name.startswith("chart_") and file_path.suffix == ".json"
+    image_format = file_path.suffix[1:] if file_path.name.startswith("chart_") else None
+    is_image = image_format in RENDER_FORMATS
+    stat = file_path.stat()
+    if is_chart:
+        chart_id = file_path.stem[len("chart_"):]
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        etag = make_etag(chart_id, encoding)
+        headers = cache_headers(etag, stat.st_mtime, IMMUTABLE, vary="Accept-Encoding")
+    elif is_image:
+        # Rendered images are as immutable as their chart and share its recency
+        chart_id = file_path.stem[len("chart_"):]
+        chart_store.touch(chart_store.path(chart_id))
+        etag = make_etag(chart_id, image_format)
+        headers = cache_headers(etag, stat.st_mtime, IMMUTABLE)
+    else:
+        etag = make_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+        headers = cache_headers(etag, stat.st_mtime)
+    if is_not_modified(request, etag, stat.st_mtime):
+        return not_modified(headers)
+    
+    if is_chart:
+        return await chart_records_response("download_export", chart_id, file_path, encoding, headers)
+    if is_image:
+        return FileResponse(file_path, media_type=RENDER_MEDIA_TYPES[image_format], headers=headers)
+    return FileResponse(file_path, headers=headers)
 
 # API Documentation endpoint
 @api_router.get("/docs/ai", response_class=HTMLResponse)
@@ -440,6 +1381,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency and sizes cover CORS handling and error responses too
+app.add_middleware(MetricsMiddleware, profile_token=os.environ.get("PROFILE_TOKEN") or None)
+
+warmup_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_server():
+    """Seed missing sample datasets, then warm caches without delaying the first request"""
+    global warmup_task
+    started = time.perf_counter()
+    startup_stats["seeded"] = await blocking.run("startup", seed_sample_data)
+    startup_stats["startup_seconds"] = round(time.perf_counter() - started, 4)
+    live_updates.bind(asyncio.get_running_loop())
+    invalidations.start(apply_invalidations)
+    if STARTUP_WARMUP:
+        warmup_task = asyncio.create_task(warm_caches())
+    logger.info(
+        "AI D3.js Tool Server started in %.3fs after %.3fs of imports (seeded %d sample datasets)",
+        startup_stats["startup_seconds"], startup_stats["import_seconds"], len(startup_stats["seeded"]),
+    )
+
+@app.on_event("shutdown")
+def shutdown_blocking_pool():
+    if warmup_task is not None:
+        warmup_task.cancel()
+    invalidations.stop()
+    blocking.shutdown()
+    chart_renderer.shutdown()
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -447,4 +1417,4 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-logger.info("AI D3.js Tool Server started successfully!")
+startup_stats["import_seconds"] = round(time.perf_counter() - IMPORT_STARTED, 4)
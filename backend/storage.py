@@ -0,0 +1,609 @@
+"""Pluggable dataset storage.
+
+CSV stays the ingest and interchange format in data/. The Arrow backend
+additionally keeps an uncompressed Arrow IPC (Feather v2) copy of each
+dataset under data/.store/ that is read through a memory map, so repeated
+reads skip CSV parsing entirely. The copy records the mtime and size of the
+CSV it was built from and is rebuilt whenever the CSV no longer matches.
+
+Appends and keyed upserts never rewrite the dataset. Each one is written as
+an immutable segment under data/.store/log/<name>/ and committed by
+atomically replacing that directory's manifest.json; reads apply the
+segments to the base file in order. Once COMPACT_SEGMENTS segments have
+accumulated they are folded back into the base file. Every committed write
+gets a new version token, while compaction keeps the version unchanged
+because the contents are unchanged. Writers of one dataset are serialized
+across threads and, through a lock file under data/.store/locks/, across
+worker processes.
+
+Arrow files are written as a single record batch, so numeric and string
+columns convert to pandas without copying: every worker process reading a
+dataset shares the same page-cache pages instead of holding its own copy.
+
+Convert an existing data directory with:
+
+    python storage.py migrate [--data-dir DIR]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from dataset_cache import file_signature
+from dataset_query import Predicate, apply_window, check_columns
+from metrics import phase
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - optional dependency
+    feather = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+DEFAULT_DATA_DIR = Path(__file__).parent / "data"
+COMPACT_SEGMENTS = int(os.environ.get("DATASET_COMPACT_SEGMENTS", "32"))
+# Schema metadata key of a columnar copy holding the version of the CSV it was built from
+SOURCE_KEY = b"d3tool.source"
+
+
+class StorageError(ValueError):
+    """Raised when a write does not fit the stored dataset"""
+
+
+class CSVStorage:
+    """Reads and writes datasets as plain CSV files"""
+
+    name = "csv"
+    # Whether read_window() is cheaper than filtering a fully loaded frame
+    supports_pushdown = False
+    # File format of snapshots and log segments
+    frame_suffix = ".csv"
+
+    def __init__(self, compact_segments: int = COMPACT_SEGMENTS):
+        self.compact_segments = compact_segments
+        self._write_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        # Derived files (columnar copies, snapshots) are built by one thread at a time
+        self._build_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+
+    def read(self, csv_file: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        with phase("parse"):
+            return self._read_merged(csv_file, columns)
+
+    def _read_merged(self, csv_file: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        for _ in range(3):
+            manifest = self._manifest(csv_file)
+            if manifest is None or not manifest["segments"]:
+                return self._read_base(csv_file, columns)
+            try:
+                df = self._read_base(csv_file)
+                # A compaction between loading the manifest and the base file has
+                # already folded the segments in, so applying them again would duplicate rows
+                if self._base_version(csv_file) != manifest["base"]:
+                    continue
+                return self._apply_log(csv_file, df, manifest, columns)
+            except FileNotFoundError:
+                # A concurrent compaction removed the segments; the new manifest covers them
+                continue
+        # Writers kept overtaking the read, so take the base file and the log together
+        with self._locked(csv_file):
+            manifest = self._manifest(csv_file)
+            if manifest is None:
+                return self._read_base(csv_file, columns)
+            return self._apply_log(csv_file, self._read_base(csv_file), manifest, columns)
+
+    def _apply_log(
+        self, csv_file: Path, df: pd.DataFrame, manifest: Dict[str, Any], columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        for segment in manifest["segments"]:
+            segment_df = self.read_frame(self.log_dir(csv_file) / segment["file"])
+            df = _apply_segment(df, segment_df, segment.get("keys"))
+        return df if columns is None else df[columns]
+
+    def version(self, csv_file: Path) -> str:
+        """Opaque token that changes whenever the dataset's contents change"""
+        manifest = self._manifest(csv_file)
+        return manifest["version"] if manifest is not None else self._base_version(csv_file)
+
+    def modified_time(self, csv_file: Path) -> float:
+        """When the dataset's contents last changed, including logged writes"""
+        mtime = csv_file.stat().st_mtime
+        if self._manifest(csv_file) is not None:
+            mtime = max(mtime, (self.log_dir(csv_file) / "manifest.json").stat().st_mtime)
+        return mtime
+
+    def read_window(
+        self,
+        csv_file: Path,
+        columns: Optional[List[str]] = None,
+        predicates: Sequence[Predicate] = (),
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Tuple[pd.DataFrame, int]:
+        """Read only the filtered, projected rows [offset, offset + limit) and the match count"""
+        return apply_window(self.read(csv_file), columns, predicates, offset, limit)
+
+    def write(self, csv_file: Path, df: pd.DataFrame) -> None:
+        """Replace the whole dataset; readers see either the old or the new file"""
+        with self._locked(csv_file):
+            self._write_base(csv_file, df)
+            self.reset_log(csv_file)
+
+    def install(self, csv_file: Path, source: Path) -> None:
+        """Replace the whole dataset with the finished CSV file at source, e.g. a validated upload"""
+        with self._locked(csv_file):
+            os.replace(source, csv_file)
+            self.reset_log(csv_file)
+
+    def append(self, csv_file: Path, df: pd.DataFrame) -> Dict[str, Any]:
+        """Add rows to the end of the dataset"""
+        return self._log(csv_file, df, None)
+
+    def upsert(self, csv_file: Path, df: pd.DataFrame, keys: List[str]) -> Dict[str, Any]:
+        """Replace the rows whose keys appear in df and append the others"""
+        if not keys:
+            raise StorageError("Upsert needs at least one key column")
+        missing_keys = [key for key in keys if key not in df.columns]
+        if missing_keys:
+            raise StorageError(f"Unknown key columns: {', '.join(missing_keys)}")
+        return self._log(csv_file, df.drop_duplicates(keys, keep="last"), list(keys))
+
+    def compact(self, csv_file: Path) -> bool:
+        """Fold the log into the base file; returns False when there was nothing to fold"""
+        with self._locked(csv_file):
+            manifest = self._manifest(csv_file)
+            if manifest is None or not manifest["segments"]:
+                return False
+            self._write_base(csv_file, self.read(csv_file))
+            # Same contents, so the version carries over to the new base file
+            self._write_manifest(csv_file, {
+                "base": self._base_version(csv_file),
+                "start": manifest["version"],
+                "version": manifest["version"],
+                "seq": manifest["seq"],
+                "segments": [],
+            })
+            for segment in manifest["segments"]:
+                (self.log_dir(csv_file) / segment["file"]).unlink(missing_ok=True)
+            return True
+
+    @contextlib.contextmanager
+    def _locked(self, csv_file: Path) -> Iterator[None]:
+        """Hold the write lock of one dataset, in this process and across worker processes"""
+        with self._write_locks[str(csv_file)]:
+            if fcntl is None:
+                yield
+                return
+            lock_file = csv_file.parent / ".store" / "locks" / f"{csv_file.stem}.lock"
+            lock_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(lock_file, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                yield
+
+    def changes_since(
+        self, csv_file: Path, version: str
+    ) -> Tuple[str, Optional[List[Tuple[Optional[List[str]], pd.DataFrame]]]]:
+        """The current version and the logged writes committed after version.
+
+        Writes are (keys, rows) pairs, oldest first, with keys None for
+        appends. They are None when version is not on the current log (the
+        dataset was replaced, or compacted past it), so the caller has to
+        start over from a full read.
+        """
+        manifest = self._manifest(csv_file)
+        if manifest is None:
+            current = self._base_version(csv_file)
+            return current, [] if version == current else None
+        if version == manifest["version"]:
+            return version, []
+        # Segments of one manifest were all written against its base file
+        versions = [manifest.get("start", manifest["base"])] + [
+            f"{manifest['base']}.{int(Path(segment['file']).stem):x}" for segment in manifest["segments"]
+        ]
+        if version not in versions:
+            return manifest["version"], None
+        try:
+            changes = [
+                (segment.get("keys"), self.read_frame(self.log_dir(csv_file) / segment["file"]))
+                for segment in manifest["segments"][versions.index(version):]
+            ]
+        except FileNotFoundError:
+            # Compacted while reading
+            return manifest["version"], None
+        return manifest["version"], changes
+
+    def reset_log(self, csv_file: Path) -> None:
+        """Forget logged writes, e.g. after the base file was replaced wholesale"""
+        shutil.rmtree(self.log_dir(csv_file), ignore_errors=True)
+
+    def log_dir(self, csv_file: Path) -> Path:
+        return csv_file.parent / ".store" / "log" / csv_file.stem
+
+    def columns(self, csv_file: Path) -> List[str]:
+        return list(pd.read_csv(csv_file, nrows=0).columns)
+
+    # Snapshots pin one dataset version for the charts that reference it
+    # instead of embedding rows. A snapshot is a directory of hard links to
+    # the version's base file and log segments, which are only ever replaced,
+    # never modified, so it takes no space of its own until the dataset is
+    # rewritten or compacted. Every chart built from that version shares it.
+    def snapshot_path(self, csv_file: Path, version: str) -> Path:
+        return csv_file.parent / ".store" / "snapshots" / csv_file.stem / version
+
+    def write_snapshot(self, csv_file: Path, version: str, df: pd.DataFrame) -> Path:
+        """Pin version of the dataset unless it already is; df holds its rows in case the dataset moved on"""
+        snapshot_dir = self.snapshot_path(csv_file, version)
+        if snapshot_dir.exists():
+            return snapshot_dir
+        # Charts built from the same version at once write the snapshot only once
+        with self._build_locks[str(snapshot_dir)]:
+            if snapshot_dir.exists():
+                return snapshot_dir
+            snapshot_dir.parent.mkdir(parents=True, exist_ok=True)
+            tmp_dir = Path(tempfile.mkdtemp(dir=snapshot_dir.parent, prefix=f".{version}.", suffix=".tmp"))
+            try:
+                self._fill_snapshot(tmp_dir, csv_file, version, df)
+                os.chmod(tmp_dir, 0o755)
+                try:
+                    os.rename(tmp_dir, snapshot_dir)
+                except OSError:
+                    # Another worker process pinned the same version first
+                    if not snapshot_dir.exists():
+                        raise
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+            except BaseException:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+        return snapshot_dir
+
+    def _fill_snapshot(self, snapshot_dir: Path, csv_file: Path, version: str, df: pd.DataFrame) -> None:
+        base_file = snapshot_dir / f"base{self.frame_suffix}"
+        segments = []
+        with self._locked(csv_file):
+            manifest = self._manifest(csv_file)
+            current = manifest["version"] if manifest is not None else self._base_version(csv_file)
+            if current == version:
+                _link(self._base_file(csv_file), base_file)
+                segments = manifest["segments"] if manifest is not None else []
+                for segment in segments:
+                    _link(self.log_dir(csv_file) / segment["file"], snapshot_dir / segment["file"])
+        if current != version:
+            # Written since df was read, so the version only survives as a copy of its rows
+            self._write_frame(base_file, df)
+        with open(snapshot_dir / "manifest.json", "w") as f:
+            json.dump({"version": version, "segments": segments}, f)
+
+    def read_snapshot(self, snapshot_dir: Path) -> pd.DataFrame:
+        with open(snapshot_dir / "manifest.json", "r") as f:
+            manifest = json.load(f)
+        df = self.read_frame(snapshot_dir / f"base{self.frame_suffix}")
+        for segment in manifest["segments"]:
+            df = _apply_segment(df, self.read_frame(snapshot_dir / segment["file"]), segment.get("keys"))
+        return df
+
+    def read_frame(self, frame_file: Path) -> pd.DataFrame:
+        with phase("parse"):
+            return pd.read_csv(frame_file)
+
+    def prune_snapshots(self, data_dir: Path, keep: Iterable[Tuple[str, str]], min_age_seconds: float = 3600) -> int:
+        """Delete snapshots no chart references, sparing recently written ones"""
+        keep = set(keep)
+        cutoff = time.time() - min_age_seconds
+        removed = 0
+        for snapshot_dir in (data_dir / ".store" / "snapshots").glob("*/*"):
+            name, version = snapshot_dir.parent.name, snapshot_dir.name
+            try:
+                if (name, version) in keep or snapshot_dir.stat().st_mtime > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+            removed += 1
+        return removed
+
+    def body_path(self, csv_file: Path, version: str, name: str) -> Path:
+        """Where an encoded response body for one dataset version is stored"""
+        return csv_file.parent / ".store" / "bodies" / csv_file.stem / f"{version}.{name}"
+
+    def prune_bodies(self, csv_file: Path, version: str) -> None:
+        """Drop stored response bodies of every version but version"""
+        for body_file in (csv_file.parent / ".store" / "bodies" / csv_file.stem).glob("*"):
+            if not body_file.name.startswith(f"{version}."):
+                body_file.unlink(missing_ok=True)
+
+    def _read_base(self, csv_file: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return pd.read_csv(csv_file, usecols=columns)
+
+    def _base_file(self, csv_file: Path) -> Path:
+        """The file read_frame() reads the base of the dataset from"""
+        return csv_file
+
+    def _base_version(self, csv_file: Path) -> str:
+        mtime_ns, size = file_signature(csv_file)
+        return f"{mtime_ns:x}-{size:x}"
+
+    def _write_base(self, csv_file: Path, df: pd.DataFrame) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=csv_file.parent, prefix=f".{csv_file.stem}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", newline="") as f, phase("write"):
+                df.to_csv(f, index=False)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, csv_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _write_frame(self, path: Path, df: pd.DataFrame) -> None:
+        with phase("write"):
+            df.to_csv(path, index=False)
+
+    def _manifest(self, csv_file: Path) -> Optional[Dict[str, Any]]:
+        """The log manifest, or None when there is none or it predates the base file"""
+        try:
+            with open(self.log_dir(csv_file) / "manifest.json", "r") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        # A base file replaced behind the log's back makes the log meaningless
+        if manifest.get("base") != self._base_version(csv_file):
+            return None
+        return manifest
+
+    def _write_manifest(self, csv_file: Path, manifest: Dict[str, Any]) -> None:
+        manifest_file = self.log_dir(csv_file) / "manifest.json"
+        manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = manifest_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_file, manifest_file)
+
+    def _log(self, csv_file: Path, df: pd.DataFrame, keys: Optional[List[str]]) -> Dict[str, Any]:
+        columns = self.columns(csv_file)
+        if sorted(df.columns) != sorted(columns):
+            raise StorageError(f"Rows must have exactly the dataset's columns: {', '.join(columns)}")
+        df = df[columns]
+
+        with self._locked(csv_file):
+            base = self._base_version(csv_file)
+            manifest = self._manifest(csv_file)
+            if manifest is None:
+                self.reset_log(csv_file)
+                manifest = {"base": base, "version": base, "seq": 0, "segments": []}
+            seq = manifest["seq"] + 1
+            segment = {"file": f"{seq:08d}{self.frame_suffix}", "rows": len(df)}
+            if keys is not None:
+                segment["keys"] = keys
+            segment_file = self.log_dir(csv_file) / segment["file"]
+            segment_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = segment_file.with_suffix(f".{os.getpid()}.tmp")
+            self._write_frame(tmp_file, df)
+            os.replace(tmp_file, segment_file)
+
+            # Replacing the manifest is the commit point of the write
+            manifest = {
+                "base": base,
+                "start": manifest.get("start", base),
+                "version": f"{base}.{seq:x}",
+                "seq": seq,
+                "segments": manifest["segments"] + [segment],
+            }
+            self._write_manifest(csv_file, manifest)
+
+        compacted = len(manifest["segments"]) >= self.compact_segments and self.compact(csv_file)
+        return {
+            "version": manifest["version"],
+            "rows_written": len(df),
+            "segments": 0 if compacted else len(manifest["segments"]),
+            "compacted": compacted,
+        }
+
+
+class ArrowStorage(CSVStorage):
+    """CSV plus a memory-mapped Arrow IPC copy that serves all reads"""
+
+    name = "arrow"
+    supports_pushdown = True
+    frame_suffix = ".arrow"
+
+    def columnar_path(self, csv_file: Path) -> Path:
+        return csv_file.parent / ".store" / f"{csv_file.stem}.arrow"
+
+    def read_window(
+        self,
+        csv_file: Path,
+        columns: Optional[List[str]] = None,
+        predicates: Sequence[Predicate] = (),
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Tuple[pd.DataFrame, int]:
+        manifest = self._manifest(csv_file)
+        if manifest is not None and manifest["segments"]:
+            # Upserts can replace base rows, so logged datasets are merged before filtering
+            return super().read_window(csv_file, columns, predicates, offset, limit)
+        # Projection and filters are evaluated by the Arrow scanner, so only
+        # the requested window is ever converted to pandas
+        with phase("parse"):
+            dataset = ds.dataset(self._ensure_columnar(csv_file), format="ipc")
+            check_columns(dataset.schema.names, columns, list(predicates))
+            expression = _arrow_filter(dataset.schema, predicates)
+            total = dataset.count_rows(filter=expression)
+            scanner = dataset.scanner(columns=columns, filter=expression)
+            table = scanner.to_table() if limit is None else scanner.head(offset + limit)
+            return table.slice(offset).to_pandas(), total
+
+    def columns(self, csv_file: Path) -> List[str]:
+        return feather.read_table(self._ensure_columnar(csv_file), memory_map=True).schema.names
+
+    def read_frame(self, frame_file: Path) -> pd.DataFrame:
+        with phase("parse"):
+            return _mapped_frame(frame_file)
+
+    def _read_base(self, csv_file: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return _mapped_frame(self._ensure_columnar(csv_file), columns)
+
+    def _base_file(self, csv_file: Path) -> Path:
+        return self._ensure_columnar(csv_file)
+
+    def _write_base(self, csv_file: Path, df: pd.DataFrame) -> None:
+        arrow_file = self.columnar_path(csv_file)
+        with self._build_locks[str(arrow_file)]:
+            super()._write_base(csv_file, df)
+            self._write_columnar(arrow_file, df, self._base_version(csv_file))
+
+    def _write_frame(self, path: Path, df: pd.DataFrame) -> None:
+        with phase("write"):
+            _write_arrow(path, df)
+
+    def _ensure_columnar(self, csv_file: Path) -> Path:
+        self.convert(csv_file)
+        return self.columnar_path(csv_file)
+
+    def convert(self, csv_file: Path) -> bool:
+        """Build the columnar copy of csv_file if it is missing or stale"""
+        arrow_file = self.columnar_path(csv_file)
+        if self._is_fresh(csv_file, arrow_file):
+            return False
+        # Concurrent cold reads wait for the first one instead of each parsing the CSV
+        with self._build_locks[str(arrow_file)]:
+            if self._is_fresh(csv_file, arrow_file):
+                return False
+            # Taken before parsing, so a CSV replaced meanwhile leaves the copy stale
+            source = self._base_version(csv_file)
+            self._write_columnar(arrow_file, pd.read_csv(csv_file), source)
+        return True
+
+    def _is_fresh(self, csv_file: Path, arrow_file: Path) -> bool:
+        """Whether arrow_file was built from csv_file as it is now; mtimes alone miss files copied with their old mtime"""
+        try:
+            with pa.memory_map(str(arrow_file)) as source:
+                metadata = pa.ipc.open_file(source).schema.metadata or {}
+            return metadata.get(SOURCE_KEY) == self._base_version(csv_file).encode()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return False
+
+    def _write_columnar(self, arrow_file: Path, df: pd.DataFrame, source: str) -> None:
+        arrow_file.parent.mkdir(exist_ok=True)
+        with phase("write"):
+            _replace_atomically(arrow_file, lambda tmp_file: _write_arrow(tmp_file, df, {SOURCE_KEY: source.encode()}))
+
+
+def _replace_atomically(target: Path, write: Callable[[Path], None]) -> None:
+    """Write target through a temporary file of its own, so concurrent writers never share one"""
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(Path(tmp_name))
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _link(source: Path, target: Path) -> None:
+    """Share source's contents as target, copying where the filesystem has no hard links"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def _write_arrow(path: Path, df: pd.DataFrame, metadata: Optional[Dict[bytes, bytes]] = None) -> None:
+    # Uncompressed and in one record batch, so a reader can map every column as one contiguous buffer
+    table = pa.Table.from_pandas(df)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+    feather.write_feather(table, path, compression="uncompressed", chunksize=max(len(df), 1))
+
+
+def _mapped_frame(arrow_file: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """A frame whose columns point into the memory-mapped file wherever the types allow it.
+
+    One block per column lets numeric columns stay views of the mapped
+    buffers; the frame keeps the mapping alive even after the file is
+    replaced, and like every cached frame it must not be mutated.
+    """
+    return feather.read_table(arrow_file, columns=columns, memory_map=True).to_pandas(split_blocks=True)
+
+
+def _apply_segment(df: pd.DataFrame, segment: pd.DataFrame, keys: Optional[List[str]]) -> pd.DataFrame:
+    """Apply one logged append (keys is None) or upsert to df"""
+    if keys is None or df.empty:
+        return pd.concat([df, segment], ignore_index=True)
+    existing = pd.MultiIndex.from_frame(df[keys])
+    incoming = pd.MultiIndex.from_frame(segment[keys])
+    positions = incoming.get_indexer(existing)
+    matched = positions >= 0
+    if matched.any():
+        # Replaced rows keep their position; only the new keys are appended
+        replaced = segment.iloc[positions[matched]].set_axis(df.index[matched])
+        df = pd.concat([df[~matched], replaced]).sort_index(kind="stable")
+    return pd.concat([df, segment[~incoming.isin(existing)]], ignore_index=True)
+
+
+def _arrow_filter(schema, predicates: Sequence[Predicate]):
+    """Translate predicates into a single Arrow dataset filter expression"""
+    expression = None
+    for predicate in predicates:
+        field_type = schema.field(predicate.column).type
+        numeric = pa.types.is_integer(field_type) or pa.types.is_floating(field_type)
+        values = predicate.values(numeric, integer=pa.types.is_integer(field_type))
+        field = pc.field(predicate.column)
+        if predicate.op == "in":
+            term = field.isin(values)
+        elif predicate.op == "contains":
+            term = pc.match_substring(field.cast(pa.string()), values[0])
+        else:
+            term = {
+                "eq": field.__eq__, "ne": field.__ne__,
+                "gt": field.__gt__, "ge": field.__ge__,
+                "lt": field.__lt__, "le": field.__le__,
+            }[predicate.op](values[0])
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def get_storage(backend: Optional[str] = None) -> CSVStorage:
+    """Return the storage backend named by backend or DATASET_STORAGE"""
+    backend = backend or os.environ.get("DATASET_STORAGE", "arrow" if feather else "csv")
+    if backend == "arrow":
+        if feather is None:
+            raise RuntimeError("DATASET_STORAGE=arrow requires the pyarrow package")
+        return ArrowStorage()
+    if backend == "csv":
+        return CSVStorage()
+    raise ValueError(f"Unknown dataset storage backend: {backend}")
+
+
+def migrate(data_dir: Path) -> None:
+    """Build columnar copies for every CSV in data_dir"""
+    storage = get_storage("arrow")
+    for csv_file in sorted(data_dir.glob("*.csv")):
+        converted = storage.convert(csv_file)
+        print(f"{'converted' if converted else 'up to date'}: {csv_file.name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dataset storage maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="convert CSV datasets to the columnar store")
+    migrate_parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate(args.data_dir)
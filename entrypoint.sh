@@ -5,8 +5,9 @@ set -e
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
 echo "Starting FastAPI backend"
-# Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
+# Start Uvicorn with proper host binding; open live event streams never finish
+# on their own, so shutdown stops waiting for them after a few seconds
+uvicorn server:app --host 0.0.0.0 --port 8001 --timeout-graceful-shutdown 5 &
 BACKEND_PID=$!
 
 echo "Waiting for backend to start..."
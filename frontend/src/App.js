@@ -15,6 +15,26 @@ import APIDocumentation from "./components/APIDocumentation";
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Apply the changes of a live "delta" event in order: appends add rows,
+// upserts replace the rows with the same key values and add the others
+const applyChanges = (rows, changes) => changes.reduce((current, change) => {
+  if (change.op !== 'upsert') {
+    return current.concat(change.rows);
+  }
+  const keyOf = (row) => JSON.stringify(change.keys.map((key) => row[key]));
+  const updates = new Map(change.rows.map((row) => [keyOf(row), row]));
+  const replaced = current.map((row) => {
+    const key = keyOf(row);
+    if (!updates.has(key)) {
+      return row;
+    }
+    const update = updates.get(key);
+    updates.delete(key);
+    return { ...row, ...update };
+  });
+  return replaced.concat(Array.from(updates.values()));
+}, rows);
+
 function App() {
   const [salesData, setSalesData] = useState([]);
   const [quarterlySales, setQuarterlySales] = useState([]);
@@ -22,6 +42,7 @@ function App() {
   const [userData, setUserData] = useState([]);
   const [categoryData, setCategoryData] = useState([]);
   const [timeSeriesData, setTimeSeriesData] = useState([]);
+  const [timeSeriesVersion, setTimeSeriesVersion] = useState(null);
   const [networkData, setNetworkData] = useState({ nodes: [], links: [] });
   const [datasets, setDatasets] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -52,20 +73,19 @@ function App() {
       setUserData(userRes.data.data);
       setCategoryData(categoryRes.data.data);
       setTimeSeriesData(timeSeriesRes.data.data);
+      setTimeSeriesVersion(timeSeriesRes.data.metadata.version);
       setDatasets(datasetsRes.data.datasets);
 
-      // Mock network data for demo
-      setNetworkData({
-        nodes: [
-          {id: 'A', group: 1, size: 10},
-          {id: 'B', group: 1, size: 15},
-          {id: 'C', group: 2, size: 12}
-        ],
-        links: [
-          {source: 'A', target: 'B', value: 1},
-          {source: 'B', target: 'C', value: 2}
-        ]
-      });
+      // Network layout is computed on the server; the graph only draws it
+      try {
+        const networkRes = await axios.get(`${API}/network`, {
+          params: { nodes: 'network_nodes', links: 'network_links' }
+        });
+        setNetworkData({ nodes: networkRes.data.nodes, links: networkRes.data.links });
+      } catch (networkErr) {
+        console.error('Error fetching network data:', networkErr);
+        setNetworkData({ nodes: [], links: [] });
+      }
 
       setLoading(false);
     } catch (err) {
@@ -79,6 +99,38 @@ function App() {
     fetchAllData();
   }, []);
 
+  // New time series rows are pushed by the server instead of refetching the dataset
+  useEffect(() => {
+    if (!timeSeriesVersion) {
+      return undefined;
+    }
+    let version = timeSeriesVersion;
+    const source = new EventSource(
+      `${API}/datasets/time_series_data/live?since=${encodeURIComponent(timeSeriesVersion)}`
+    );
+    const refetch = async () => {
+      source.close();
+      try {
+        const res = await axios.get(`${API}/data/time_series_data`);
+        setTimeSeriesData(res.data.data);
+        setTimeSeriesVersion(res.data.metadata.version);
+      } catch (err) {
+        console.error('Error refreshing time series data:', err);
+      }
+    };
+    source.addEventListener('delta', (event) => {
+      const payload = JSON.parse(event.data);
+      if (payload.since !== version) {
+        refetch();
+        return;
+      }
+      version = payload.version;
+      setTimeSeriesData((rows) => applyChanges(rows, payload.changes));
+    });
+    source.addEventListener('reset', refetch);
+    return () => source.close();
+  }, [timeSeriesVersion]);
+
   const handleDataRefresh = () => {
     fetchAllData();
   };
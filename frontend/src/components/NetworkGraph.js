@@ -18,17 +18,39 @@ const NetworkGraph = ({ data }) => {
     // Create color scale for groups
     const color = d3.scaleOrdinal(d3.schemeCategory10);
 
-    // Create simulation
-    const simulation = d3.forceSimulation(data.nodes)
-      .force("link", d3.forceLink(data.links).id(d => d.id).distance(80))
-      .force("charge", d3.forceManyBody().strength(-300))
-      .force("center", d3.forceCenter(width / 2, height / 2));
+    // Work on copies so the simulation or scaling never mutates props
+    const nodes = data.nodes.map(d => ({ ...d }));
+    const links = data.links.map(d => ({ ...d }));
+
+    // Layouts from /api/network carry positions in [-1, 1]; only graphs without them are simulated
+    const precomputed = nodes.every(d => Number.isFinite(d.x) && Number.isFinite(d.y));
+    let simulation = null;
+    if (precomputed) {
+      const padding = 20;
+      const scale = Math.min(width, height) / 2 - padding;
+      const byId = new Map();
+      nodes.forEach(d => {
+        d.x = width / 2 + d.x * scale;
+        d.y = height / 2 + d.y * scale;
+        byId.set(String(d.id), d);
+      });
+      links.forEach(d => {
+        d.source = byId.get(String(d.source));
+        d.target = byId.get(String(d.target));
+      });
+    } else {
+      simulation = d3.forceSimulation(nodes)
+        .force("link", d3.forceLink(links).id(d => d.id).distance(80))
+        .force("charge", d3.forceManyBody().strength(-300))
+        .force("center", d3.forceCenter(width / 2, height / 2));
+    }
+    const drawnLinks = links.filter(d => d.source && d.target);
 
     // Add links
     const link = svg.append("g")
       .attr("class", "links")
       .selectAll("line")
-      .data(data.links)
+      .data(drawnLinks)
       .enter().append("line")
       .attr("class", "link")
       .attr("stroke", "#999")
@@ -39,7 +61,7 @@ const NetworkGraph = ({ data }) => {
     const node = svg.append("g")
       .attr("class", "nodes")
       .selectAll("circle")
-      .data(data.nodes)
+      .data(nodes)
       .enter().append("circle")
       .attr("class", "node")
       .attr("r", d => d.size || 8)
@@ -56,7 +78,7 @@ const NetworkGraph = ({ data }) => {
     const label = svg.append("g")
       .attr("class", "labels")
       .selectAll("text")
-      .data(data.nodes)
+      .data(nodes)
       .enter().append("text")
       .text(d => d.id)
       .style("font-size", "12px")
@@ -93,8 +115,7 @@ const NetworkGraph = ({ data }) => {
         d3.selectAll(".tooltip").remove();
       });
 
-    // Update positions on simulation tick
-    simulation.on("tick", () => {
+    function draw() {
       link
         .attr("x1", d => d.source.x)
         .attr("y1", d => d.source.y)
@@ -108,11 +129,18 @@ const NetworkGraph = ({ data }) => {
       label
         .attr("x", d => d.x)
         .attr("y", d => d.y + 5);
-    });
+    }
+
+    // Update positions on simulation tick, or draw once when positions are precomputed
+    if (simulation) {
+      simulation.on("tick", draw);
+    } else {
+      draw();
+    }
 
     // Drag functions
     function dragstarted(event) {
-      if (!event.active) simulation.alphaTarget(0.3).restart();
+      if (simulation && !event.active) simulation.alphaTarget(0.3).restart();
       event.subject.fx = event.subject.x;
       event.subject.fy = event.subject.y;
     }
@@ -120,17 +148,22 @@ const NetworkGraph = ({ data }) => {
     function dragged(event) {
       event.subject.fx = event.x;
       event.subject.fy = event.y;
+      if (!simulation) {
+        event.subject.x = event.x;
+        event.subject.y = event.y;
+        draw();
+      }
     }
 
     function dragended(event) {
-      if (!event.active) simulation.alphaTarget(0);
+      if (simulation && !event.active) simulation.alphaTarget(0);
       event.subject.fx = null;
       event.subject.fy = null;
     }
 
     // Cleanup function
     return () => {
-      simulation.stop();
+      if (simulation) simulation.stop();
     };
 
   }, [data]);
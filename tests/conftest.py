@@ -0,0 +1,39 @@
+import os
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level modules, as they do when run from backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory):
+    """The server module, importable once per session, with its directories under a temp dir"""
+    root = tmp_path_factory.mktemp("server")
+    os.environ.update(
+        DATA_DIR=str(root / "data"),
+        UPLOADS_DIR=str(root / "uploads"),
+        EXPORTS_DIR=str(root / "exports"),
+        SEED_SAMPLE_DATA="off",
+        STARTUP_WARMUP="0",
+    )
+    import server
+
+    return server
+
+
+@pytest.fixture(scope="session")
+def api(server):
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture
+def dataset_name(request):
+    """A dataset name of its own for every test sharing the session's server"""
+    return re.sub(r"\W+", "_", request.node.name).strip("_").lower()
@@ -0,0 +1,83 @@
+import pytest
+
+from batch import dataset_key, plan_stages
+
+
+def test_reads_share_a_stage_until_the_next_write():
+    operations = [("query", "a"), ("generate-chart", "a"), ("upload-csv", "a"), ("query", "a"), ("query", "b")]
+
+    assert plan_stages(operations) == [[0, 1, 4], [2], [3]]
+
+
+def test_writes_wait_for_earlier_operations_on_their_dataset_only():
+    operations = [("create-sales-data", "a"), ("query", "a"), ("upload-csv", "a"), ("create-sales-data", "b")]
+
+    assert plan_stages(operations) == [[0, 3], [1], [2]]
+
+
+def test_dataset_key():
+    assert dataset_key("Q3 Sales") == "q3_sales"
+
+
+def sales(name, *values):
+    return {"op": "create-sales-data", "id": "create", "params": {
+        "name": name, "data": [{"month": f"M{i}", "sales": value, "expenses": 1} for i, value in enumerate(values)],
+    }}
+
+
+def query(name, op_id, **params):
+    return {"op": "query", "id": op_id, "params": {"dataset_name": name, **params}}
+
+
+def run(api, *operations):
+    response = api.post("/api/ai/batch", json={"operations": list(operations)})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_operations_on_one_dataset_see_each_other_in_order(api, dataset_name):
+    body = run(
+        api,
+        sales(dataset_name, 10, 20),
+        query(dataset_name, "after-create"),
+        {"op": "upload-csv", "id": "upload", "params": {"dataset_name": dataset_name, "content": "month,sales\nX,1\n"}},
+        query(dataset_name, "after-upload"),
+        {"op": "generate-chart", "id": "chart", "params": {"chart_type": "bar", "dataset_name": dataset_name}},
+    )
+
+    results = body["data"]["results"]
+    assert body["success"]
+    assert [result["id"] for result in results] == ["create", "after-create", "upload", "after-upload", "chart"]
+    assert [row["sales"] for row in results[1]["data"]["data"]] == [10, 20]
+    assert results[3]["data"]["data"] == [{"month": "X", "sales": 1}]
+    assert results[4]["data"]["chart"]["data"] == [{"month": "X", "sales": 1}]
+
+
+def test_failed_operations_are_reported_without_stopping_the_others(api, dataset_name):
+    body = run(
+        api,
+        {"op": "drop-table", "id": "unknown"},
+        query("no_such_dataset", "missing"),
+        sales(dataset_name, 5),
+        {"op": "create-sales-data", "id": "invalid", "params": {"name": "x"}},
+        query(dataset_name, "bad-filter", where=["sales:between:1"]),
+        query(dataset_name, "filtered", where=["sales:gt:1"], columns="sales"),
+        {"op": "upload-csv", "id": "bad-csv", "params": {"dataset_name": "bad", "content": ""}},
+    )
+
+    results = {result["id"]: result for result in body["data"]["results"]}
+    assert not body["success"]
+    assert body["message"] == "Ran 7 operations, 5 failed"
+    assert {op_id: result.get("status") for op_id, result in results.items() if not result["success"]} == {
+        "unknown": 400, "missing": 404, "invalid": 400, "bad-filter": 400, "bad-csv": 400,
+    }
+    assert results["filtered"]["data"]["data"] == [{"sales": 5.0}]
+    assert all(result["error"] for result in results.values() if not result["success"])
+
+
+def test_oversized_batches_are_rejected(server, api, monkeypatch):
+    monkeypatch.setattr(server, "BATCH_MAX_OPERATIONS", 2)
+
+    response = api.post("/api/ai/batch", json={"operations": [query("x", str(i)) for i in range(3)]})
+
+    assert response.status_code == 400
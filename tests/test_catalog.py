@@ -0,0 +1,46 @@
+import threading
+
+import pandas as pd
+
+from catalog import DatasetCatalog
+
+
+def test_refresh_keeps_datasets_recorded_while_it_runs(tmp_path):
+    pd.DataFrame({"a": [1, 2]}).to_csv(tmp_path / "slow.csv", index=False)
+    loading, release = threading.Event(), threading.Event()
+
+    def loader(path):
+        if path.stem == "slow":
+            loading.set()
+            release.wait(5)
+        return pd.read_csv(path)
+
+    catalog = DatasetCatalog(tmp_path, loader)
+    refresh = threading.Thread(target=catalog.refresh)
+    refresh.start()
+    assert loading.wait(5)
+
+    recorded = pd.DataFrame({"b": [1, 2, 3]})
+    recorded.to_csv(tmp_path / "t1.csv", index=False)
+    catalog.update(tmp_path / "t1.csv", recorded)
+    rewritten = pd.DataFrame({"a": [1, 2, 3, 4]})
+    rewritten.to_csv(tmp_path / "slow.csv", index=False)
+    catalog.update(tmp_path / "slow.csv", rewritten)
+    release.set()
+    refresh.join()
+
+    assert catalog.get("t1")["rows"] == 3
+    assert catalog.get("slow")["rows"] == 4
+    assert DatasetCatalog(tmp_path, loader).get("t1") is not None
+
+
+def test_refresh_drops_datasets_whose_file_is_gone(tmp_path):
+    df = pd.DataFrame({"a": [1]})
+    df.to_csv(tmp_path / "gone.csv", index=False)
+    catalog = DatasetCatalog(tmp_path, pd.read_csv)
+    assert catalog.refresh() == 1
+
+    (tmp_path / "gone.csv").unlink()
+
+    assert catalog.refresh() == 1
+    assert catalog.get("gone") is None
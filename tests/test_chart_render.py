@@ -0,0 +1,80 @@
+import struct
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from chart_render import PALETTE, Scene, render
+
+SVG = "{http://www.w3.org/2000/svg}"
+PAYLOAD = '"/><script>alert(1)</script><rect fill="'
+
+
+def parse(body):
+    """The SVG's root element; fails on anything that is not well-formed"""
+    return ET.fromstring(body)
+
+
+def elements(root, tag):
+    return root.iter(f"{SVG}{tag}")
+
+
+@pytest.mark.parametrize("chart_type", ["bar", "line", "area", "scatter", "pie"])
+def test_dataset_text_is_escaped_in_every_chart_type(chart_type):
+    chart = {
+        "type": chart_type,
+        "title": "<b>Sales</b> & more",
+        "data": [{"label": PAYLOAD, "value": 3, "other": 1}, {"label": "<i>", "value": 5, "other": 2}],
+    }
+
+    root = parse(render(chart, "svg"))
+
+    assert not list(elements(root, "script"))
+    texts = [element.text for element in elements(root, "text")]
+    assert "<b>Sales</b> & more" in texts
+    attributes = {"x", "y", "font-size", "text-anchor", "font-weight", "fill"}
+    assert all(set(element.attrib) <= attributes for element in elements(root, "text"))
+
+
+def test_pie_colours_from_the_dataset_must_be_plain_colours():
+    chart = {"type": "pie", "data": [
+        {"category": "a", "value": 1, "color": "#abc"},
+        {"category": "b", "value": 1, "color": "rebeccapurple"},
+        {"category": "c", "value": 1, "color": PAYLOAD},
+        {"category": "d", "value": 1, "color": "url(javascript:alert(1))"},
+    ]}
+
+    root = parse(render(chart, "svg"))
+
+    fills = [element.get("fill") for element in elements(root, "polygon")]
+    assert fills[:2] == ["#abc", "rebeccapurple"]
+    assert all(fill in PALETTE for fill in fills[2:4])
+    assert not list(elements(root, "script"))
+
+
+def test_attribute_values_are_escaped():
+    scene = Scene(10, 10)
+    scene.rect(0, 0, 5, 5, fill=PAYLOAD)
+    scene.text(1, 1, "t", anchor='end" onload="x', fill=PAYLOAD)
+
+    root = parse(scene.to_svg())
+
+    rect = list(elements(root, "rect"))[-1]
+    text = next(elements(root, "text"))
+    assert rect.get("fill") == PAYLOAD
+    assert text.get("text-anchor") == 'end" onload="x'
+    assert "onload" not in text.attrib
+
+
+def test_network_node_ids_are_escaped():
+    chart = {"type": "network", "data": [{"source": PAYLOAD, "target": "<b>"}], "layout": {PAYLOAD: [0, 0], "<b>": [1, 1]}}
+
+    root = parse(render(chart, "svg"))
+
+    assert not list(elements(root, "script"))
+
+
+def test_png_has_the_chart_size():
+    body = render({"type": "bar", "width": 120, "height": 80, "data": [{"month": "Jan", "sales": 1}]}, "png")
+
+    assert body[:8] == b"\x89PNG\r\n\x1a\n"
+    assert struct.unpack(">II", body[16:24]) == (120, 80)
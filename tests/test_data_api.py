@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+
+ROWS = pd.DataFrame({
+    "month": ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul"],
+    "sales": [10, 25, 30, 45, 50, 65, 70],
+    "region": ["North", "South", "North", "East", "South", "North", "West"],
+})
+
+
+@pytest.fixture(params=["pushdown", "cached"])
+def dataset(request, server, dataset_name):
+    """A dataset read through the storage scanner, or filtered from the cached frame"""
+    csv_file = server.csv_dir / f"{dataset_name}.csv"
+    server.save_dataset(csv_file, ROWS)
+    if request.param == "pushdown":
+        server.dataset_cache.invalidate(csv_file)
+    return csv_file.stem
+
+
+def get(api, name, **params):
+    response = api.get(f"/api/data/{name}", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_full_read_returns_every_row_and_the_version(server, api, dataset):
+    body = get(api, dataset)
+
+    assert body["data"] == ROWS.to_dict("records")
+    assert body["metadata"]["rows"] == 7
+    assert body["metadata"]["version"] == server.dataset_storage.version(server.csv_dir / f"{dataset}.csv")
+
+
+def test_offset_and_limit_select_a_page(api, dataset):
+    body = get(api, dataset, offset=2, limit=3)
+
+    assert [row["month"] for row in body["data"]] == ["Mar", "Apr", "May"]
+    assert body["metadata"]["rows"] == 7
+    assert body["metadata"]["returned"] == 3
+    assert body["metadata"]["next_cursor"] is not None
+
+
+def test_cursors_walk_every_page_once(api, dataset):
+    months, body = [], get(api, dataset, limit=3, where="sales:ge:25", columns="month")
+    while True:
+        months += [row["month"] for row in body["data"]]
+        assert list(body["data"][0]) == ["month"]
+        cursor = body["metadata"]["next_cursor"]
+        if cursor is None:
+            break
+        body = get(api, dataset, cursor=cursor)
+
+    assert months == ["Feb", "Mar", "Apr", "May", "Jun", "Jul"]
+
+
+def test_cursors_expire_when_the_dataset_changes(api, dataset):
+    cursor = get(api, dataset, limit=2)["metadata"]["next_cursor"]
+    api.post(f"/api/ai/datasets/{dataset}/append", json={"data": [{"month": "Aug", "sales": 80, "region": "East"}]})
+
+    assert api.get(f"/api/data/{dataset}", params={"cursor": cursor}).status_code == 409
+
+
+def test_columns_project_in_the_requested_order(api, dataset):
+    body = get(api, dataset, columns="sales,month", limit=1)
+
+    assert body["data"] == [{"sales": 10, "month": "Jan"}]
+    assert body["metadata"]["columns"] == ["sales", "month"]
+
+
+@pytest.mark.parametrize("where, months", [
+    (["sales:gt:45"], ["May", "Jun", "Jul"]),
+    (["region:in:East|West"], ["Apr", "Jul"]),
+    (["region:contains:orth", "sales:lt:50"], ["Jan", "Mar"]),
+    (["month:ne:Jan", "sales:le:25"], ["Feb"]),
+    (["sales:eq:1000"], []),
+])
+def test_where_filters_combine_with_and(api, dataset, where, months):
+    body = get(api, dataset, where=where)
+
+    assert [row["month"] for row in body["data"]] == months
+    assert body["metadata"]["rows"] == len(months)
+
+
+@pytest.mark.parametrize("params", [
+    {"where": "sales:between:1"},
+    {"where": "profit:gt:1"},
+    {"where": "sales"},
+    {"columns": "sales,profit"},
+    {"cursor": "not-a-cursor"},
+])
+def test_malformed_queries_are_rejected(api, dataset, params):
+    assert api.get(f"/api/data/{dataset}", params=params).status_code == 400
+
+
+def test_unknown_datasets_are_not_found(api):
+    assert api.get("/api/data/no_such_dataset").status_code == 404
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsample import OTHER_LABEL, PIE_MAX_SLICES, lttb_indices, minmax_indices, reduce_for_chart
+
+
+@pytest.fixture
+def series():
+    x = np.arange(10_000)
+    return pd.DataFrame({"x": x, "y": np.sin(x / 300) + (x == 5_000) * 10})
+
+
+def test_lttb_keeps_the_endpoints_and_the_spike(series):
+    reduced, reduction = reduce_for_chart(series, "line", 200, 100)
+
+    assert reduction == {"method": "lttb", "x_field": "x", "y_fields": ["y"], "source_rows": 10_000, "rows": len(reduced)}
+    assert len(reduced) <= 200
+    assert reduced["x"].iloc[0] == 0
+    assert reduced["x"].iloc[-1] == 9_999
+    assert 5_000 in reduced["x"].tolist()
+    assert reduced["x"].is_monotonic_increasing
+
+
+def test_lttb_indices_leave_short_series_alone():
+    assert lttb_indices(np.arange(5), np.arange(5), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_minmax_keeps_each_buckets_extremes(series):
+    indices = minmax_indices(series["y"].to_numpy(), 50)
+
+    assert indices[0] == 0
+    assert indices[-1] == 9_999
+    assert series["y"].idxmax() in indices
+    assert series["y"].idxmin() in indices
+    assert len(indices) <= 50 * 2 + 2
+
+
+def test_small_data_is_returned_untouched():
+    df = pd.DataFrame({"month": ["Jan", "Feb"], "sales": [1, 2]})
+
+    for chart_type in ("line", "bar", "pie", "scatter"):
+        reduced, reduction = reduce_for_chart(df, chart_type, 500, 300)
+        assert reduced is df
+        assert reduction is None
+
+
+def test_sum_folds_the_smallest_categories_into_other():
+    df = pd.DataFrame({"category": [f"c{i}" for i in range(40)], "value": range(40, 0, -1), "color": "#abc"})
+
+    reduced, reduction = reduce_for_chart(df, "pie", 500, 300)
+
+    assert len(reduced) == PIE_MAX_SLICES
+    assert reduced["category"].tolist()[:-1] == [f"c{i}" for i in range(PIE_MAX_SLICES - 1)]
+    assert reduced["category"].iloc[-1] == OTHER_LABEL
+    assert reduced["value"].sum() == df["value"].sum()
+    assert reduced["value"].iloc[-1] == df["value"].iloc[PIE_MAX_SLICES - 1:].sum()
+    assert reduction["method"] == "sum"
+
+
+def test_sum_groups_repeated_categories_in_first_seen_order():
+    df = pd.DataFrame({"month": ["Feb", "Jan", "Feb", "Jan"], "sales": [1, 2, 3, 4], "color": ["r", "g", "b", "y"]})
+
+    reduced, _ = reduce_for_chart(df, "bar", 500, 300)
+
+    assert reduced.to_dict("records") == [
+        {"month": "Feb", "sales": 4, "color": "r"},
+        {"month": "Jan", "sales": 6, "color": "g"},
+    ]
+
+
+def test_scatter_samples_are_bounded_and_stable():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"a": rng.random(50_000), "b": rng.random(50_000)})
+
+    first, _ = reduce_for_chart(df, "scatter", 100, 100)
+    second, _ = reduce_for_chart(df, "scatter", 100, 100)
+
+    assert len(first) == (100 // 4) ** 2
+    assert first.index.equals(second.index)
+
+
+def test_scatter_binning_counts_every_row():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"a": rng.random(5_000), "b": rng.random(5_000)})
+
+    binned, _ = reduce_for_chart(df, "scatter", 40, 40, method="bin")
+
+    assert binned["count"].sum() == 5_000
+    assert list(binned.columns) == ["a", "b", "count"]
+
+
+@pytest.mark.parametrize("kwargs", [{"method": "smooth"}, {"x_field": "missing"}, {"y_fields": ["missing"]}])
+def test_invalid_requests_raise_value_errors(series, kwargs):
+    with pytest.raises(ValueError):
+        reduce_for_chart(series, "line", 200, 100, **kwargs)
@@ -0,0 +1,127 @@
+from email.utils import formatdate
+
+import pandas as pd
+import pytest
+
+from http_cache import IMMUTABLE
+
+
+@pytest.fixture
+def dataset(server, dataset_name):
+    csv_file = server.csv_dir / f"{dataset_name}.csv"
+    server.save_dataset(csv_file, pd.DataFrame({"month": ["Jan", "Feb", "Mar"], "sales": [10, 20, 30]}))
+    return csv_file
+
+
+@pytest.fixture
+def forbid_reads(server, monkeypatch):
+    """Make any later read of a dataset or chart fail the request"""
+    def read(*args, **kwargs):
+        raise AssertionError("read while answering a conditional request")
+
+    def forbid():
+        server.dataset_cache.clear()
+        for target in (server.dataset_storage, server.chart_store):
+            monkeypatch.setattr(target, "read", read)
+        monkeypatch.setattr(server.dataset_storage, "read_window", read)
+
+    return forbid
+
+
+@pytest.fixture
+def chart_id(api, dataset):
+    response = api.post("/api/ai/generate-chart", json={"chart_type": "bar", "dataset_name": dataset.stem})
+    assert response.status_code == 200
+    return response.json()["chart_url"].rsplit("/", 1)[-1]
+
+
+def test_dataset_responses_carry_validators(api, dataset):
+    response = api.get(f"/api/data/{dataset.stem}")
+
+    assert response.status_code == 200
+    assert response.headers["etag"].startswith('"')
+    assert response.headers["cache-control"] == "no-cache"
+    assert "Accept" in response.headers["vary"]
+    assert "last-modified" in response.headers
+
+
+def test_matching_if_none_match_is_answered_without_loading_the_dataset(api, dataset, forbid_reads):
+    etag = api.get(f"/api/data/{dataset.stem}?limit=2").headers["etag"]
+    forbid_reads()
+
+    response = api.get(f"/api/data/{dataset.stem}?limit=2", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+@pytest.mark.parametrize("if_none_match", ["W/{etag}", '"other", {etag}', "*"])
+def test_if_none_match_uses_the_weak_comparison_and_lists(api, dataset, if_none_match):
+    etag = api.get(f"/api/data/{dataset.stem}").headers["etag"]
+    headers = {"If-None-Match": if_none_match.format(etag=etag)}
+
+    assert api.get(f"/api/data/{dataset.stem}", headers=headers).status_code == 304
+
+
+def test_etag_changes_after_an_append(api, dataset):
+    etag = api.get(f"/api/data/{dataset.stem}").headers["etag"]
+    appended = api.post(
+        f"/api/ai/datasets/{dataset.stem}/append", content=b"month,sales\nApr,40\n", headers={"Content-Type": "text/csv"}
+    )
+    assert appended.status_code == 200
+
+    response = api.get(f"/api/data/{dataset.stem}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [row["month"] for row in response.json()["data"]] == ["Jan", "Feb", "Mar", "Apr"]
+
+
+def test_other_representations_have_other_etags(api, dataset):
+    etag = api.get(f"/api/data/{dataset.stem}").headers["etag"]
+
+    for query in ("?format=columnar", "?limit=1", "?columns=sales", "?where=sales:gt:10"):
+        response = api.get(f"/api/data/{dataset.stem}{query}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+
+def test_if_modified_since_applies_without_if_none_match(api, dataset):
+    last_modified = api.get(f"/api/data/{dataset.stem}").headers["last-modified"]
+    earlier = formatdate(dataset.stat().st_mtime - 3600, usegmt=True)
+
+    assert api.get(f"/api/data/{dataset.stem}", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert api.get(f"/api/data/{dataset.stem}", headers={"If-Modified-Since": earlier}).status_code == 200
+    stale = {"If-None-Match": '"stale"', "If-Modified-Since": last_modified}
+    assert api.get(f"/api/data/{dataset.stem}", headers=stale).status_code == 200
+
+
+def test_charts_are_immutable_and_revalidated_without_reading_them(api, chart_id, forbid_reads):
+    etag = api.get(f"/api/charts/{chart_id}").headers["etag"]
+    forbid_reads()
+
+    response = api.get(f"/api/charts/{chart_id}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"] == IMMUTABLE
+
+
+def test_chart_etags_differ_by_format(api, chart_id):
+    records = api.get(f"/api/charts/{chart_id}")
+    columnar = api.get(f"/api/charts/{chart_id}?format=columnar", headers={"If-None-Match": records.headers["etag"]})
+
+    assert records.status_code == columnar.status_code == 200
+    assert records.headers["cache-control"] == IMMUTABLE
+    assert columnar.headers["etag"] != records.headers["etag"]
+
+
+def test_exports_are_revalidated_without_reading_them(api, chart_id, forbid_reads):
+    etag = api.get(f"/api/exports/chart_{chart_id}.json").headers["etag"]
+    forbid_reads()
+
+    response = api.get(f"/api/exports/chart_{chart_id}.json", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == IMMUTABLE
@@ -0,0 +1,119 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from invalidation import ALL, InvalidationLog
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def in_other_worker(code, *args, **env):
+    """Run code with args in a separate Python process, as another uvicorn worker would"""
+    subprocess.run(
+        [sys.executable, "-c", code, *args],
+        check=True,
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env, "PYTHONPATH": str(BACKEND_DIR)},
+    )
+
+
+def publish_elsewhere(path, *names):
+    in_other_worker(
+        "import sys; from pathlib import Path; from invalidation import InvalidationLog\n"
+        "log = InvalidationLog(Path(sys.argv[1]))\n"
+        "for name in sys.argv[2:]: log.publish(name)",
+        str(path),
+        *names,
+    )
+
+
+@pytest.fixture
+def log(tmp_path):
+    return InvalidationLog(tmp_path / "invalidations.log")
+
+
+def test_writes_of_other_processes_are_received_once(log):
+    publish_elsewhere(log.path, "sales", "users", "sales")
+
+    assert log.poll() == {"sales", "users"}
+    assert log.poll() == set()
+    assert log.received == 2
+
+
+def test_own_writes_are_not_received(log):
+    log.publish("sales")
+
+    assert log.poll() == set()
+    assert log.published == 1
+
+
+def test_writes_from_before_start_are_ignored(tmp_path):
+    publish_elsewhere(tmp_path / "invalidations.log", "sales")
+
+    assert InvalidationLog(tmp_path / "invalidations.log").poll() == set()
+
+
+def test_partial_lines_wait_for_the_next_poll(tmp_path):
+    path = tmp_path / "invalidations.log"
+    path.write_bytes(b"")
+    log = InvalidationLog(path)
+    with open(path, "ab") as f:
+        f.write(b"1 sal")
+        f.flush()
+        assert log.poll() == set()
+        f.write(b"es\n")
+
+    assert log.poll() == {"sales"}
+
+
+def test_a_replaced_log_invalidates_everything(log):
+    publish_elsewhere(log.path, "sales")
+    assert log.poll() == {"sales"}
+
+    InvalidationLog(log.path, max_bytes=1).publish("users")
+
+    assert log.poll() == {ALL}
+    assert log.poll() == set()
+
+
+def test_background_polling_applies_invalidations(log):
+    received, applied = [], threading.Event()
+    log.start(lambda names: (received.append(names), applied.set()), interval=0.01)
+    try:
+        publish_elsewhere(log.path, "sales")
+        assert applied.wait(5)
+    finally:
+        log.stop()
+
+    assert received == [{"sales"}]
+    assert not log.stats()["polling"]
+
+
+def test_server_drops_datasets_another_worker_wrote(server, api, dataset_name):
+    csv_file = server.csv_dir / f"{dataset_name}.csv"
+    server.save_dataset(csv_file, pd.DataFrame({"a": [1, 2]}))
+    assert api.get(f"/api/data/{dataset_name}").json()["metadata"]["rows"] == 2
+    received = server.invalidations.received
+
+    in_other_worker(
+        "import sys, pandas as pd, server\n"
+        "server.save_dataset(server.csv_dir / f'{sys.argv[1]}.csv', pd.DataFrame({'a': [1, 2, 3]}))",
+        dataset_name,
+        DATA_DIR=str(server.csv_dir),
+        UPLOADS_DIR=str(server.uploads_dir),
+        EXPORTS_DIR=str(server.exports_dir),
+    )
+    deadline = time.monotonic() + 5
+    while server.invalidations.received == received and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert server.invalidations.received > received
+    assert not server.dataset_cache.contains(csv_file)
+    assert api.get(f"/api/data/{dataset_name}").json()["metadata"]["rows"] == 3
+    assert server.dataset_catalog.get(dataset_name)["rows"] == 3
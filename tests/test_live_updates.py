@@ -0,0 +1,154 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from invalidation import ALL
+from live_updates import LiveUpdates, SubscriberLimitError, fold_appends, format_event, summarize
+
+
+@pytest.fixture
+def dataset(server, dataset_name):
+    csv_file = server.csv_dir / f"{dataset_name}.csv"
+    server.save_dataset(csv_file, pd.DataFrame({"day": ["d1", "d2"], "visits": [10, 20], "sales": [1.5, 2.5]}))
+    return csv_file
+
+
+def append(server, csv_file, **columns):
+    return server.dataset_storage.append(csv_file, pd.DataFrame(columns))["version"]
+
+
+def test_up_to_date_clients_get_ready_then_nothing(server, dataset):
+    version = server.dataset_storage.version(dataset)
+
+    kind, event_version, payload = server.live_event(dataset, None, version, True)
+
+    assert (kind, event_version) == ("ready", version)
+    assert payload["aggregates"]["visits"] == {"count": 2, "sum": 30, "min": 10, "max": 20, "mean": 15}
+    assert server.live_event(dataset, None, version, False) is None
+
+
+def test_appends_and_upserts_are_sent_as_ordered_deltas(server, dataset):
+    since = server.dataset_storage.version(dataset)
+    append(server, dataset, day=["d3"], visits=[30], sales=[3.5])
+    server.dataset_storage.upsert(dataset, pd.DataFrame({"day": ["d1"], "visits": [11], "sales": [1.0]}), ["day"])
+
+    kind, version, payload = server.live_event(dataset, ["visits"], since, False)
+
+    assert kind == "delta"
+    assert version == server.dataset_storage.version(dataset)
+    assert payload["since"] == since
+    assert payload["changes"] == [
+        {"op": "append", "rows": [{"visits": 30}]},
+        {"op": "upsert", "rows": [{"visits": 11, "day": "d1"}], "keys": ["day"]},
+    ]
+    assert payload["aggregates"] == {"visits": pytest.approx({"count": 3, "sum": 61, "min": 11, "max": 30, "mean": 61 / 3})}
+
+
+def test_replaced_datasets_and_large_changes_reset_the_client(server, dataset, monkeypatch):
+    since = server.dataset_storage.version(dataset)
+    append(server, dataset, day=["d3", "d4"], visits=[30, 40], sales=[3.5, 4.5])
+    monkeypatch.setattr(server, "LIVE_MAX_DELTA_ROWS", 1)
+
+    assert server.live_event(dataset, None, since, False)[0] == "reset"
+
+    monkeypatch.undo()
+    server.save_dataset(dataset, pd.DataFrame({"day": ["x"], "visits": [1], "sales": [0.5]}))
+
+    kind, _, payload = server.live_event(dataset, None, since, False)
+    assert kind == "reset"
+    assert "changes" not in payload
+    assert server.live_event(dataset, None, "unknown-version", True)[0] == "reset"
+
+
+def test_aggregates_are_folded_forward_across_appends(server, dataset):
+    server.live_summary(dataset, None)
+    append(server, dataset, day=["d3"], visits=[30], sales=[np.nan])
+    append(server, dataset, day=["d4"], visits=[5], sales=[0.5])
+
+    folded = server.live_summary(dataset, None)
+
+    expected = summarize(server.dataset_storage.read(dataset))
+    pd.testing.assert_frame_equal(folded, expected, check_dtype=False)
+
+
+def test_fold_appends_matches_a_full_summary():
+    base = pd.DataFrame({"a": [1, 2, 3], "b": [0.5, np.nan, 2.0], "label": ["x", "y", "z"]})
+    added = [
+        pd.DataFrame({"a": [10], "b": [-1.0], "label": ["w"]}),
+        pd.DataFrame({"a": [-4, 0], "b": [np.nan, 3.0], "label": ["v", "u"]}),
+    ]
+
+    folded = fold_appends(summarize(base), added)
+
+    pd.testing.assert_frame_equal(folded, summarize(pd.concat([base, *added])), check_dtype=False)
+
+
+def test_format_event():
+    assert format_event("delta", "v2", {"a": 1}) == b'event: delta\nid: v2\ndata: {"a":1}\n\n'
+
+
+async def collect(live, name, since, events, count, writes=()):
+    """The first count frames of a stream whose next_event pops from events"""
+    async def next_event(version, initial):
+        return events.pop(0) if events else None
+
+    frames = []
+    stream = live.stream(name, since, next_event)
+    async for frame in stream:
+        frames.append(frame)
+        if len(frames) == 1:
+            for names in writes:
+                live.notify(names)
+        if len(frames) == count:
+            break
+    await stream.aclose()
+    return frames
+
+
+def test_writes_during_an_event_collapse_into_the_next():
+    live = LiveUpdates(min_interval=0.05, heartbeat=5)
+
+    async def run():
+        live.bind(asyncio.get_running_loop())
+        events = [("ready", "v1", {}), ("delta", "v3", {"n": 2})]
+        return await collect(live, "sales", "v1", events, 2, writes=[["sales"], ["sales"], ["other"]])
+
+    frames = asyncio.run(run())
+
+    assert frames == [format_event("ready", "v1", {}), format_event("delta", "v3", {"n": 2})]
+    assert live.events == 2
+    assert live.coalesced == 1
+    assert live.subscribers() == 0
+
+
+def test_invalidating_everything_wakes_every_subscriber():
+    live = LiveUpdates(min_interval=0, heartbeat=5)
+
+    async def run():
+        live.bind(asyncio.get_running_loop())
+        return await collect(live, "sales", None, [("ready", "v1", {}), ("reset", "v2", {})], 2, writes=[[ALL]])
+
+    assert asyncio.run(run())[1] == format_event("reset", "v2", {})
+
+
+def test_idle_streams_send_heartbeats():
+    live = LiveUpdates(min_interval=0, heartbeat=0.01)
+
+    frames = asyncio.run(collect(live, "sales", None, [("ready", "v1", {})], 2))
+
+    assert frames[1] == b": keep-alive\n\n"
+
+
+def test_subscriber_limit():
+    live = LiveUpdates(max_subscribers=1)
+    with live.subscribe("sales"):
+        with pytest.raises(SubscriberLimitError):
+            live.check_capacity()
+    live.check_capacity()
+
+
+def test_live_endpoint_validates_before_streaming(api, dataset):
+    assert api.get("/api/datasets/no_such_dataset/live").status_code == 404
+    assert api.get(f"/api/datasets/{dataset.stem}/live", params={"columns": "profit"}).status_code == 400
@@ -0,0 +1,123 @@
+import pandas as pd
+import pytest
+
+from dataset_query import QueryError
+from query_plan import execute_plan, result_key, validate_plan
+
+DATASETS = {
+    "sales": pd.DataFrame({
+        "date": ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-08", "2024-01-09"],
+        "region": ["N", "S", "N", "S", "N"],
+        "sales": [10, 20, 30, 40, 50],
+    }),
+    "regions": pd.DataFrame({"region": ["N", "S"], "manager": ["Ann", "Bo"]}),
+    "targets": pd.DataFrame({"area": ["N"], "sales": [100]}),
+}
+
+
+def run(*steps, dataset="sales"):
+    plan = {"dataset": dataset, "steps": list(steps)}
+    validate_plan(plan)
+    return execute_plan(plan, lambda name: DATASETS[name])
+
+
+def test_filter_uses_the_data_filter_syntax():
+    result = run({"op": "filter", "where": ["sales:gt:15", "region:eq:N"]})
+
+    assert result["sales"].tolist() == [30, 50]
+    assert result.index.tolist() == [0, 1]
+
+
+def test_groupby_with_named_aggregations():
+    result = run({"op": "groupby", "by": "region", "agg": {"sales": "sum", "days": ["date", "count"]}})
+
+    assert result.to_dict("records") == [
+        {"region": "N", "sales": 90, "days": 3},
+        {"region": "S", "sales": 60, "days": 2},
+    ]
+
+
+def test_resample_buckets_dates_and_formats_them_back():
+    result = run({"op": "resample", "on": "date", "freq": "W", "agg": {"sales": "sum"}})
+
+    assert result.to_dict("records") == [
+        {"date": "2024-01-07", "sales": 60},
+        {"date": "2024-01-14", "sales": 90},
+    ]
+
+
+def test_resample_by_group():
+    result = run({"op": "resample", "on": "date", "freq": "W", "by": ["region"], "agg": {"sales": "max"}})
+
+    assert result[["region", "date", "sales"]].values.tolist() == [
+        ["N", "2024-01-07", 30], ["N", "2024-01-14", 50], ["S", "2024-01-07", 20], ["S", "2024-01-14", 40],
+    ]
+
+
+def test_rolling_over_rows():
+    result = run({"op": "rolling", "columns": ["sales"], "window": 2, "agg": "sum"})
+
+    assert result["sales_sum_2"].tolist() == [10, 30, 50, 70, 90]
+    assert result["sales"].tolist() == DATASETS["sales"]["sales"].tolist()
+
+
+def test_rolling_over_time_per_group_keeps_row_order():
+    result = run({"op": "rolling", "columns": ["sales"], "window": "2D", "on": "date", "by": ["region"], "agg": "sum"})
+
+    assert result["sales_sum_2D"].tolist() == [10, 20, 30, 40, 50]
+    assert run({"op": "rolling", "columns": ["sales"], "window": "7D", "on": "date", "agg": "sum"})[
+        "sales_sum_7D"
+    ].tolist() == [10, 30, 60, 90, 120]
+
+
+def test_join_on_shared_columns():
+    result = run({"op": "join", "dataset": "regions", "on": "region"}, {"op": "sort", "by": ["date"]})
+
+    assert result["manager"].tolist() == ["Ann", "Bo", "Ann", "Bo", "Ann"]
+
+
+def test_join_with_differently_named_keys_suffixes_clashing_columns():
+    result = run({"op": "join", "dataset": "targets", "left_on": ["region"], "right_on": ["area"], "how": "left"})
+
+    assert result["sales"].tolist() == [10, 20, 30, 40, 50]
+    assert result["sales_targets"].fillna(0).tolist() == [100, 0, 100, 0, 100]
+
+
+def test_sort_project_and_limit():
+    result = run(
+        {"op": "sort", "by": ["sales"], "descending": True},
+        {"op": "project", "columns": ["region", "sales"]},
+        {"op": "limit", "n": 2},
+    )
+
+    assert result.to_dict("records") == [{"region": "N", "sales": 50}, {"region": "S", "sales": 40}]
+
+
+@pytest.mark.parametrize("step", [
+    {"op": "groupby", "by": ["missing"], "agg": {"sales": "sum"}},
+    {"op": "groupby", "by": ["region"], "agg": {"sales": "explode"}},
+    {"op": "resample", "on": "region", "freq": "W", "agg": {"sales": "sum"}},
+    {"op": "resample", "on": "date", "freq": "fortnightly", "agg": {"sales": "sum"}},
+    {"op": "rolling", "columns": ["sales"], "window": 0},
+    {"op": "rolling", "columns": ["sales"], "window": "7D"},
+    {"op": "join", "dataset": "regions", "left_on": ["region"], "right_on": ["region", "manager"]},
+    {"op": "limit", "n": -1},
+])
+def test_invalid_steps_raise_query_errors(step):
+    with pytest.raises(QueryError):
+        run(step)
+
+
+def test_validate_plan_lists_datasets_and_rejects_unknown_ops():
+    plan = {"dataset": "sales", "steps": [{"op": "join", "dataset": "regions", "on": "region"}]}
+
+    assert validate_plan(plan) == ["sales", "regions"]
+    with pytest.raises(QueryError):
+        validate_plan({"dataset": "sales", "steps": [{"op": "pivot"}]})
+
+
+def test_result_key_changes_with_dataset_versions():
+    plan = {"dataset": "sales", "steps": [{"op": "limit", "n": 1}]}
+
+    assert result_key(plan, {"sales": "1"}) == result_key(dict(plan), {"sales": "1"})
+    assert result_key(plan, {"sales": "1"}) != result_key(plan, {"sales": "2"})
@@ -0,0 +1,306 @@
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from storage import ArrowStorage, CSVStorage, StorageError
+
+
+@pytest.fixture(params=["csv", "arrow"])
+def storage(request):
+    return CSVStorage(compact_segments=100) if request.param == "csv" else ArrowStorage(compact_segments=100)
+
+
+@pytest.fixture
+def dataset(tmp_path, storage):
+    csv_file = tmp_path / "sales.csv"
+    storage.write(csv_file, pd.DataFrame({"month": ["Jan", "Feb", "Mar"], "sales": [10, 20, 30]}))
+    return csv_file
+
+
+def rows(storage, csv_file):
+    return storage.read(csv_file).to_dict("records")
+
+
+def run_threads(target, count):
+    errors = []
+
+    def guarded():
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=guarded) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_append_adds_rows_at_the_end(storage, dataset):
+    before = storage.version(dataset)
+    result = storage.append(dataset, pd.DataFrame({"sales": [40], "month": ["Apr"]}))
+
+    assert result["rows_written"] == 1
+    assert result["version"] == storage.version(dataset) != before
+    assert rows(storage, dataset)[-1] == {"month": "Apr", "sales": 40}
+    assert len(rows(storage, dataset)) == 4
+
+
+def test_append_rejects_rows_with_other_columns(storage, dataset):
+    with pytest.raises(StorageError):
+        storage.append(dataset, pd.DataFrame({"month": ["Apr"], "profit": [1]}))
+
+
+def test_upsert_replaces_matching_rows_in_place_and_appends_new_keys(storage, dataset):
+    storage.upsert(dataset, pd.DataFrame({"month": ["Apr", "Feb"], "sales": [40, 25]}), ["month"])
+
+    assert rows(storage, dataset) == [
+        {"month": "Jan", "sales": 10},
+        {"month": "Feb", "sales": 25},
+        {"month": "Mar", "sales": 30},
+        {"month": "Apr", "sales": 40},
+    ]
+
+
+def test_upsert_keeps_the_last_row_of_duplicate_keys(storage, dataset):
+    storage.upsert(dataset, pd.DataFrame({"month": ["Jan", "Jan"], "sales": [11, 12]}), ["month"])
+
+    assert rows(storage, dataset)[0] == {"month": "Jan", "sales": 12}
+    assert len(rows(storage, dataset)) == 3
+
+
+def test_upsert_with_composite_keys(storage, tmp_path):
+    csv_file = tmp_path / "regions.csv"
+    storage.write(csv_file, pd.DataFrame({"region": ["N", "N", "S"], "month": ["Jan", "Feb", "Jan"], "sales": [1, 2, 3]}))
+    storage.upsert(csv_file, pd.DataFrame({"region": ["S", "S"], "month": ["Jan", "Feb"], "sales": [30, 40]}), ["region", "month"])
+
+    assert storage.read(csv_file)["sales"].tolist() == [1, 2, 30, 40]
+
+
+def test_upsert_needs_known_key_columns(storage, dataset):
+    with pytest.raises(StorageError):
+        storage.upsert(dataset, pd.DataFrame({"month": ["Jan"], "sales": [1]}), ["region"])
+    with pytest.raises(StorageError):
+        storage.upsert(dataset, pd.DataFrame({"month": ["Jan"], "sales": [1]}), [])
+
+
+def test_appends_and_upserts_apply_in_order(storage, dataset):
+    storage.append(dataset, pd.DataFrame({"month": ["Apr"], "sales": [40]}))
+    storage.upsert(dataset, pd.DataFrame({"month": ["Apr"], "sales": [41]}), ["month"])
+    storage.append(dataset, pd.DataFrame({"month": ["Apr"], "sales": [42]}))
+
+    assert storage.read(dataset)["sales"].tolist() == [10, 20, 30, 41, 42]
+
+
+def test_compaction_keeps_contents_and_version(storage, dataset):
+    storage.append(dataset, pd.DataFrame({"month": ["Apr"], "sales": [40]}))
+    storage.upsert(dataset, pd.DataFrame({"month": ["Jan"], "sales": [11]}), ["month"])
+    version, before = storage.version(dataset), rows(storage, dataset)
+
+    assert storage.compact(dataset)
+    assert storage.version(dataset) == version
+    assert rows(storage, dataset) == before
+    assert not storage.compact(dataset)
+
+
+def test_segments_are_compacted_automatically(tmp_path):
+    storage = CSVStorage(compact_segments=3)
+    csv_file = tmp_path / "t.csv"
+    storage.write(csv_file, pd.DataFrame({"a": [0]}))
+    results = [storage.append(csv_file, pd.DataFrame({"a": [i]})) for i in range(1, 4)]
+
+    assert [result["compacted"] for result in results] == [False, False, True]
+    assert storage.read(csv_file)["a"].tolist() == [0, 1, 2, 3]
+
+
+def test_write_discards_the_log(storage, dataset):
+    storage.append(dataset, pd.DataFrame({"month": ["Apr"], "sales": [40]}))
+    storage.write(dataset, pd.DataFrame({"month": ["May"], "sales": [50]}))
+
+    assert rows(storage, dataset) == [{"month": "May", "sales": 50}]
+
+
+def test_install_replaces_the_dataset_and_its_log(storage, dataset, tmp_path):
+    storage.append(dataset, pd.DataFrame({"month": ["Apr"], "sales": [40]}))
+    upload = tmp_path / "upload.tmp"
+    pd.DataFrame({"month": ["May"], "sales": [50]}).to_csv(upload, index=False)
+
+    storage.install(dataset, upload)
+
+    assert not upload.exists()
+    assert rows(storage, dataset) == [{"month": "May", "sales": 50}]
+
+
+def test_install_waits_for_writes_in_progress(storage, dataset, tmp_path):
+    upload = tmp_path / "upload.tmp"
+    pd.DataFrame({"month": ["May"], "sales": [50]}).to_csv(upload, index=False)
+    installer = threading.Thread(target=storage.install, args=(dataset, upload))
+
+    with storage._locked(dataset):
+        installer.start()
+        installer.join(0.2)
+        assert installer.is_alive()
+    installer.join()
+
+    assert rows(storage, dataset) == [{"month": "May", "sales": 50}]
+
+
+def test_changes_since_lists_logged_writes(storage, dataset):
+    start = storage.version(dataset)
+    storage.append(dataset, pd.DataFrame({"month": ["Apr"], "sales": [40]}))
+    middle = storage.version(dataset)
+    storage.upsert(dataset, pd.DataFrame({"month": ["Jan"], "sales": [11]}), ["month"])
+
+    version, changes = storage.changes_since(dataset, start)
+    assert version == storage.version(dataset)
+    assert [keys for keys, _ in changes] == [None, ["month"]]
+    assert [len(frame) for _, frame in storage.changes_since(dataset, middle)[1]] == [1]
+    assert storage.changes_since(dataset, version) == (version, [])
+
+
+def test_changes_since_survive_compaction_only_from_its_version(storage, dataset):
+    start = storage.version(dataset)
+    storage.append(dataset, pd.DataFrame({"month": ["Apr"], "sales": [40]}))
+    compacted = storage.version(dataset)
+    storage.compact(dataset)
+    storage.append(dataset, pd.DataFrame({"month": ["May"], "sales": [50]}))
+
+    assert storage.changes_since(dataset, start)[1] is None
+    assert [frame["month"].tolist() for _, frame in storage.changes_since(dataset, compacted)[1]] == [["May"]]
+
+
+def test_concurrent_appends_get_distinct_versions(storage, dataset):
+    versions = []
+    errors = run_threads(
+        lambda: versions.append(storage.append(dataset, pd.DataFrame({"month": ["X"], "sales": [1]}))["version"]), 8
+    )
+
+    assert errors == []
+    assert len(set(versions)) == 8
+    assert len(storage.read(dataset)) == 11
+
+
+def test_read_overtaken_by_a_compaction_applies_the_log_once(storage, dataset, monkeypatch):
+    for month in range(10):
+        storage.append(dataset, pd.DataFrame({"month": [f"M{month}"], "sales": [month]}))
+    expected = rows(storage, dataset)
+    read_base, write_manifest = storage._read_base, storage._write_manifest
+    base_written, read_done = threading.Event(), threading.Event()
+    compactor = threading.Thread(target=storage.compact, args=(dataset,))
+
+    def pause_before_commit(csv_file, manifest):
+        # The compaction has replaced the base file but not yet the manifest or the segments
+        if threading.current_thread() is compactor:
+            base_written.set()
+            read_done.wait(5)
+        write_manifest(csv_file, manifest)
+
+    def compact_after_manifest(csv_file, columns=None):
+        # The reader has loaded the manifest the compaction is about to replace
+        if not compactor.is_alive() and not base_written.is_set():
+            compactor.start()
+            assert base_written.wait(5)
+        return read_base(csv_file, columns)
+
+    monkeypatch.setattr(storage, "_write_manifest", pause_before_commit)
+    monkeypatch.setattr(storage, "_read_base", compact_after_manifest)
+    try:
+        result = rows(storage, dataset)
+    finally:
+        read_done.set()
+        compactor.join()
+
+    assert result == expected
+    assert rows(storage, dataset) == expected
+
+
+def test_concurrent_cold_reads_share_one_columnar_copy(tmp_path):
+    csv_file = tmp_path / "big.csv"
+    pd.DataFrame({"a": range(200_000), "b": [0.5] * 200_000}).to_csv(csv_file, index=False)
+    storage = ArrowStorage()
+    lengths = []
+    errors = run_threads(lambda: lengths.append(len(storage.read(csv_file))), 4)
+
+    assert errors == []
+    assert lengths == [200_000] * 4
+    assert sorted(path.name for path in (tmp_path / ".store").iterdir()) == ["big.arrow"]
+    assert os.stat(storage.columnar_path(csv_file)).st_mode & 0o777 == 0o644
+
+
+def test_columnar_copy_follows_a_csv_replaced_with_an_older_mtime(tmp_path):
+    older = tmp_path / "older.csv"
+    pd.DataFrame({"a": [1, 2, 3]}).to_csv(older, index=False)
+    time.sleep(0.01)
+    storage = ArrowStorage()
+    csv_file = tmp_path / "t.csv"
+    storage.write(csv_file, pd.DataFrame({"a": [10, 20]}))
+    assert storage.read(csv_file)["a"].tolist() == [10, 20]
+
+    shutil.copy2(older, csv_file)
+
+    assert storage.read(csv_file)["a"].tolist() == [1, 2, 3]
+
+
+def test_concurrent_snapshot_writes_of_one_version(storage, dataset):
+    df = storage.read(dataset)
+    version = storage.version(dataset)
+    errors = run_threads(lambda: storage.write_snapshot(dataset, version, df), 6)
+
+    snapshot_dir = storage.snapshot_path(dataset, version)
+    assert errors == []
+    assert list(snapshot_dir.parent.iterdir()) == [snapshot_dir]
+    assert storage.read_snapshot(snapshot_dir).equals(df)
+
+
+def test_snapshots_share_the_dataset_files(storage, dataset):
+    storage.upsert(dataset, pd.DataFrame({"month": ["Jan"], "sales": [11]}), ["month"])
+    storage.append(dataset, pd.DataFrame({"month": ["Apr"], "sales": [40]}))
+    version, df = storage.version(dataset), storage.read(dataset)
+
+    snapshot_dir = storage.snapshot_path(dataset, version)
+    assert storage.write_snapshot(dataset, version, df) == snapshot_dir
+
+    shared = {path.stat().st_ino for path in storage.log_dir(dataset).glob(f"*{storage.frame_suffix}")}
+    shared.add(storage._base_file(dataset).stat().st_ino)
+    assert {path.stat().st_ino for path in snapshot_dir.glob(f"*{storage.frame_suffix}")} == shared
+    assert storage.read_snapshot(snapshot_dir).equals(df)
+
+
+def test_snapshots_outlive_rewrites_of_the_dataset(storage, dataset):
+    storage.append(dataset, pd.DataFrame({"month": ["Apr"], "sales": [40]}))
+    version, df = storage.version(dataset), storage.read(dataset)
+    snapshot_dir = storage.write_snapshot(dataset, version, df)
+
+    storage.compact(dataset)
+    storage.write(dataset, pd.DataFrame({"month": ["May"], "sales": [50]}))
+
+    assert storage.read_snapshot(snapshot_dir).equals(df)
+
+
+def test_snapshot_of_a_version_the_dataset_moved_past_stores_its_rows(storage, dataset):
+    version, df = storage.version(dataset), storage.read(dataset)
+    storage.append(dataset, pd.DataFrame({"month": ["Apr"], "sales": [40]}))
+
+    snapshot_dir = storage.write_snapshot(dataset, version, df)
+
+    assert storage.read_snapshot(snapshot_dir).equals(df)
+    assert snapshot_dir.stat().st_mode & 0o777 == 0o755
+
+
+def test_prune_snapshots_keeps_referenced_and_recent_ones(storage, dataset, tmp_path):
+    storage.append(dataset, pd.DataFrame({"month": ["Apr"], "sales": [40]}))
+    old_version = storage.version(dataset)
+    storage.write_snapshot(dataset, old_version, storage.read(dataset))
+    storage.append(dataset, pd.DataFrame({"month": ["May"], "sales": [50]}))
+    new_version = storage.version(dataset)
+    storage.write_snapshot(dataset, new_version, storage.read(dataset))
+
+    assert storage.prune_snapshots(tmp_path, []) == 0
+    assert storage.prune_snapshots(tmp_path, [(dataset.stem, new_version)], min_age_seconds=0) == 1
+    assert [path.name for path in storage.snapshot_path(dataset, new_version).parent.iterdir()] == [new_version]